@@ -5,6 +5,7 @@ from app.api.scrape_routes import router as scrape_router
 from app.api.embeddings_routes import router as embeddings_router
 from app.api.feedback import router as feedback_router
 from app.api.analytics import router as analytics_router
+from app.api.jobs_routes import router as jobs_router
 
 api_router = APIRouter(prefix="/api")
 
@@ -13,3 +14,4 @@ api_router.include_router(scrape_router)
 api_router.include_router(embeddings_router)
 api_router.include_router(feedback_router)
 api_router.include_router(analytics_router)
+api_router.include_router(jobs_router)
@@ -1,51 +1,69 @@
-from fastapi import APIRouter, Depends
+import os
+import time
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_session
-from app.db.crud import (
-    get_total_analyses,
-    get_total_errors,
-    get_errors_by_language,
-    get_avg_analysis_time,
-    get_total_feedback,
-    get_successful_feedback,
-    get_language_breakdown,
-)
+from app.db.crud import get_analytics_rollups, get_stage_percentiles
+from app.schemas.job import JobResponse
 from app.services.cache import CacheService
-from app.services.cost_tracker import get_total_cost, get_daily_costs, get_cost_breakdown
+from app.services.cache_warmup import CACHE_WARMUP_HOURS, CACHE_WARMUP_TOP
+from app.services.job_runner import job_runner
+from app.services.cost_tracker import (
+    get_total_cost,
+    get_daily_costs,
+    get_cost_breakdown,
+    get_routing_breakdown,
+    get_routing_reasons,
+    get_recent_routing_decisions,
+)
+from app.services.rate_limiter import chat_limiter, embedding_limiter
+from app.services.supabase_vector_store import get_vector_store
 
 router = APIRouter()
 cache = CacheService()
 
+# The dashboard polls overview/language-breakdown; they read the rollup
+# tables, and this short per-process cache absorbs bursts of polls
+ANALYTICS_CACHE_SECONDS = float(os.getenv("ANALYTICS_CACHE_SECONDS", 10))
+_response_cache = {}
+
 
 @router.get("/analytics/overview")
 async def get_analytics_overview(session: AsyncSession = Depends(get_session)):
     """
     Get overall system analytics
     """
-    total_analyses = await get_total_analyses(session)
-    total_errors = await get_total_errors(session)
-    errors_by_language = await get_errors_by_language(session)
-    avg_analysis_time = await get_avg_analysis_time(session)
-    total_feedback = await get_total_feedback(session)
-    successful_feedback = await get_successful_feedback(session)
+    cached = _cached_response("overview")
+    if cached is not None:
+        return cached
 
-    return {
-        "total_analyses": total_analyses,
-        "total_errors_parsed": total_errors,
-        "avg_analysis_time_ms": int(avg_analysis_time),
-        "errors_by_language": [
-            {"language": lang or "unknown", "count": count}
-            for lang, count in errors_by_language
-        ],
-        "feedback": {
-            "total": total_feedback,
-            "successful": successful_feedback,
-            "success_rate": (
-                successful_feedback / total_feedback if total_feedback > 0 else 0
+    rollups = await get_analytics_rollups(session)
+    counters = rollups["counters"]
+    total_feedback = counters.get("feedback", 0)
+    successful_feedback = counters.get("feedback_worked", 0)
+
+    return _store_response(
+        "overview",
+        {
+            "total_analyses": counters.get("analyses", 0),
+            "total_errors_parsed": counters.get("parsed_errors", 0),
+            "avg_analysis_time_ms": int(
+                counters.get("analysis_time_ms", 0) / max(counters.get("timed_analyses", 0), 1)
             ),
+            "errors_by_language": [
+                {"language": row["language"] or "unknown", "count": row["error_count"]}
+                for row in rollups["languages"]
+            ],
+            "feedback": {
+                "total": total_feedback,
+                "successful": successful_feedback,
+                "success_rate": (
+                    successful_feedback / total_feedback if total_feedback > 0 else 0
+                ),
+            },
         },
-    }
+    )
 
 
 @router.get("/analytics/language-breakdown")
@@ -53,16 +71,41 @@ async def get_language_breakdown_endpoint(session: AsyncSession = Depends(get_se
     """
     Get detailed breakdown by programming language
     """
-    breakdown = await get_language_breakdown(session)
+    cached = _cached_response("language-breakdown")
+    if cached is not None:
+        return cached
+
+    rollups = await get_analytics_rollups(session)
+
+    return _store_response(
+        "language-breakdown",
+        [
+            {
+                "language": row["language"] or "unknown",
+                "total_errors": row["error_count"],
+                "avg_confidence": round(
+                    row["confidence_sum"] / row["confidence_count"]
+                    if row["confidence_count"]
+                    else 0,
+                    1,
+                ),
+            }
+            for row in rollups["languages"]
+        ],
+    )
 
-    return [
-        {
-            "language": lang or "unknown",
-            "total_errors": total,
-            "avg_confidence": round(avg_conf or 0, 1),
-        }
-        for lang, total, avg_conf in breakdown
-    ]
+
+def _cached_response(name: str):
+    """A response computed less than ANALYTICS_CACHE_SECONDS ago, if any"""
+    entry = _response_cache.get(name)
+    if entry and time.monotonic() - entry[0] < ANALYTICS_CACHE_SECONDS:
+        return entry[1]
+    return None
+
+
+def _store_response(name: str, response):
+    _response_cache[name] = (time.monotonic(), response)
+    return response
 
 
 @router.get("/analytics/cache-stats")
@@ -73,6 +116,55 @@ async def get_cache_stats():
     return cache.get_stats()
 
 
+@router.post("/analytics/cache-warmup", response_model=JobResponse, status_code=202)
+async def warm_up_cache(
+    top: int = Query(default=CACHE_WARMUP_TOP, ge=1, le=5000),
+    hours: int = Query(default=CACHE_WARMUP_HOURS, ge=1, le=24 * 90),
+    search: bool = True,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Re-cache the stored analyses of the most frequent recent errors (no LLM
+    calls). Runs as a background job - poll GET /api/jobs/{id} for progress.
+    """
+    return await job_runner.submit(
+        session, "cache_warmup", {"top": top, "hours": hours, "search": search}
+    )
+
+
+@router.get("/analytics/rate-limits")
+async def get_rate_limit_stats():
+    """
+    Get upstream rate limiter statistics (queue wait time, throttle events)
+    """
+    return {
+        "chat": chat_limiter.get_stats(),
+        "embedding": embedding_limiter.get_stats(),
+    }
+
+
+@router.get("/analytics/vector-store")
+async def get_vector_store_stats():
+    """
+    Get vector store size, embedding dimensions and, during a dimension
+    migration, how often shadow reads agree with the served results
+    """
+    return await get_vector_store().get_stats()
+
+
+@router.get("/analytics/latency")
+async def get_latency_percentiles(
+    hours: int = 24, session: AsyncSession = Depends(get_session)
+):
+    """
+    p50/p95/p99 of each /analyze stage and the total, in milliseconds
+    """
+    return {
+        "window_hours": hours,
+        "stages": await get_stage_percentiles(session, hours),
+    }
+
+
 @router.get("/analytics/costs")
 async def get_costs_overview(
     days: int = 30, session: AsyncSession = Depends(get_session)
@@ -89,3 +181,18 @@ async def get_costs_overview(
         "breakdown": breakdown,
         "daily": daily,
     }
+
+
+@router.get("/analytics/routing")
+async def get_routing_overview(
+    days: int = 30, session: AsyncSession = Depends(get_session)
+):
+    """
+    Get analysis cost and latency per model routing tier, the most common
+    reasons for each tier and the latest decisions with their signals
+    """
+    return {
+        "tiers": await get_routing_breakdown(session, days),
+        "reasons": await get_routing_reasons(session, days),
+        "recent": await get_recent_routing_decisions(session),
+    }
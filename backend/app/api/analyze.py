@@ -1,88 +1,105 @@
+import asyncio
 import logging
-import time
-from fastapi import APIRouter, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+import os
+from typing import Dict, List, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 
-from app.db.session import get_session
-from app.db.crud import create_parsed_error, create_analysis
+from app.db.session import get_unit_of_work, sessionLocal
+from app.db.unit_of_work import UnitOfWork
+from app.db.crud import create_parsed_error, create_analysis, record_analysis_timing
 from app.services.parser import ErrorParser
-from app.services.supabase_vector_store import SupabaseVectorStore
+from app.services.supabase_vector_store import (
+    RELEVANCE_THRESHOLD,
+    get_vector_store,
+    relevant_results,
+)
 from app.services.cache import CacheService
 from app.services.llm_analyzer import LLMAnalyzer
+from app.services.model_router import ModelRouter
+from app.services.resilience import Deadline
+from app.services.stage_timer import StageTimer
+from app.services.metrics import BACKGROUND_ERRORS, DB_QUERIES
 from app.schemas.search import SearchRequest, SearchResult
-from app.schemas.analysis import AnalysisResponse
+from app.schemas.analysis import AnalysisResponse, Solution
 
 
 router = APIRouter()
 
 parser = ErrorParser()
-vc = SupabaseVectorStore()
+vc = get_vector_store()
 llm = LLMAnalyzer()
+router_policy = ModelRouter()
 cache = CacheService()
 
+# Total latency budget for /analyze, and the least time worth giving the LLM
+ANALYZE_DEADLINE_MS = int(os.getenv("ANALYZE_DEADLINE_MS", 25000))
+LLM_MIN_BUDGET_MS = int(os.getenv("LLM_MIN_BUDGET_MS", 3000))
+# Let a timed-out LLM call finish in the background and populate the cache
+BACKGROUND_COMPLETION = os.getenv("ANALYZE_BACKGROUND_COMPLETION", "true").lower() == "true"
+
+# Stale cache entries are refreshed in the background, one worker per entry
+# (lock) and at most this many at once per process, so a namespace change
+# can't turn into a burst of LLM calls
+CACHE_REVALIDATE_CONCURRENCY = int(os.getenv("CACHE_REVALIDATE_CONCURRENCY", 4))
+CACHE_REVALIDATE_LOCK_SECONDS = int(os.getenv("CACHE_REVALIDATE_LOCK_SECONDS", 300))
+
+# Keeps references to background completions so they aren't garbage collected
+_background_tasks = set()
+_revalidations = set()
+
 
 @router.post("/analyze")
 async def analyze_error(
-    request: SearchRequest, session: AsyncSession = Depends(get_session)
+    request: SearchRequest,
+    background_tasks: BackgroundTasks,
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ):
-    start_time = time.time()
+    # Per-stage times go back in a Server-Timing header and are stored with the analysis
+    timer = StageTimer()
+    deadline = Deadline(ANALYZE_DEADLINE_MS)
 
     # Check cache first
-    cached_analysis = cache.get_analysis(request.query)
+    with timer.stage("cache"):
+        cached_analysis, stale = cache.get_analysis(request.query)
     if cached_analysis:
-        analysis_time_ms = int((time.time() - start_time) * 1000)
+        # from an older model/prompt/knowledge base: serve it now, refresh it for next time
+        if stale:
+            _schedule_revalidation(request.query)
+        analysis_time_ms = timer.total_ms()
         logging.info(f"Returning cached analysis in {analysis_time_ms}ms")
         cached_analysis["analysis_time_ms"] = analysis_time_ms
-        return AnalysisResponse(**cached_analysis)
+        return _respond(
+            AnalysisResponse(**cached_analysis), timer, uow, "stale" if stale else "hit"
+        )
 
     # Parse error log to extract meaningful search terms
-    parsed_error = parser.parse(request.query)
+    with timer.stage("parse"):
+        parsed_error = parser.parse(request.query)
 
     # Create better search query from parsed error
-    if (
-        parsed_error
-        and parsed_error.get("error_type")
-        and parsed_error.get("error_message")
-    ):
-        search_query = f"{parsed_error['error_type']}: {parsed_error['error_message']}"
+    search_query = _search_query(parsed_error)
+    if search_query:
         # Search knowledge base (with cache)
-        cached_search = cache.get_search_results(search_query)
+        with timer.stage("cache"):
+            cached_search = cache.get_search_results(
+                search_query, index_version=vc.model_version
+            )
     else:
         search_query = request.query
         cached_search = None
 
     if cached_search:
-        search_results = cached_search
-    else:
-        # Perform vector search in Supabase
-        results = await vc.search(
-            search_query, n_results=min(request.limit, 3)
-        )  # Max 3 for faster response
-
-        # Filter results by relevance threshold (distance < 0.6 means relevant)
-        RELEVANCE_THRESHOLD = 0.6
+        search_results = [SearchResult(**result) for result in cached_search]
+    elif deadline.expired():
+        logging.warning("Deadline reached before vector search - skipping retrieval")
         search_results = []
-        for doc, meta, distance in zip(
-            results["documents"][0], results["metadatas"][0], results["distances"][0]
-        ):
-            # Only include results that are actually relevant
-            if distance < RELEVANCE_THRESHOLD:
-                search_results.append(
-                    SearchResult(
-                        title=meta["title"],
-                        url=meta["url"],
-                        content=doc[:500],  # First 500 chars
-                        tags=(
-                            meta["tags"].split(", ")
-                            if isinstance(meta["tags"], str)
-                            else meta["tags"]
-                        ),
-                        votes=meta["votes"],
-                        distance=distance,
-                    )
-                )
-        # Cache search results
-        cache.set_search_results(search_query, search_results)
+    else:
+        # Perform vector search in Supabase (max 3 for faster response)
+        search_results = await _search(
+            search_query, min(request.limit, 3), timer, uow.session, deadline.remaining()
+        )
 
     logging.info(
         f"Found {len(search_results)} relevant results (threshold: {RELEVANCE_THRESHOLD})"
@@ -93,49 +110,92 @@ async def analyze_error(
 
     # If parser failed, create a minimal parsed_error structure
     if not parsed_error:
-        parsed_error = {
-            "error_type": "Unknown",
-            "error_message": request.query,
-            "language": "unknown",
-            "file_path": None,
-            "line_number": None,
-            "raw_error_log": request.query,
-        }
-
-    # Store parsed error in database
-    db_error = await create_parsed_error(session, parsed_error)
-
-    llm_response = await llm.analyze_error(parsed_error, search_results_dicts, session)
-
-    # Store analysis in database
-    analysis_data = {
-        "parsed_error_id": db_error.id,
-        "root_cause": llm_response.get("root_cause", ""),
-        "reasoning": llm_response.get("reasoning", ""),
-        "solutions": llm_response.get("solutions", []),
-        "sources_used": len(search_results),
-    }
-    db_analysis = await create_analysis(session, analysis_data)
+        parsed_error = _unparsed_error(request.query)
 
-    # Cache the analysis result
-    cache.set_analysis(
-        request.query,
-        {
-            "error_type": parsed_error.get("error_type"),
-            "error_message": parsed_error.get("error_message"),
-            "language": parsed_error.get("language", "unknown"),
-            "file_path": parsed_error.get("file_path"),
-            "line_number": parsed_error.get("line_number"),
-            "root_cause": llm_response.get("root_cause", ""),
-            "reasoning": llm_response.get("reasoning", ""),
-            "solutions": llm_response.get("solutions", []),
-            "sources_used": len(search_results),
-            "analysis_id": db_analysis.id,
-        },
+    # Reads are done: don't hold a pooled connection while waiting on the LLM
+    await uow.release()
+
+    # Queued in the unit of work; written with everything else in one commit
+    db_error = await create_parsed_error(uow.session, parsed_error)
+
+    # Skip the LLM entirely when it is known to be failing or can't finish in time
+    degraded_reason = None
+    llm_task = None
+    # (the breaker is asked last: allow() takes its half-open trial slot,
+    # which the LLM call then reports back on)
+    if deadline.remaining() * 1000 < LLM_MIN_BUDGET_MS:
+        degraded_reason = "deadline_exceeded"
+    elif not llm.breaker.allow():
+        degraded_reason = "llm_unavailable"
+    else:
+        route = router_policy.route(parsed_error, search_results_dicts)
+        llm_task = asyncio.create_task(_run_llm(parsed_error, search_results_dicts, route))
+        try:
+            # shield() keeps the call running if we stop waiting for it
+            with timer.stage("llm"):
+                llm_response, llm_uow = await asyncio.wait_for(
+                    asyncio.shield(llm_task), timeout=deadline.remaining()
+                )
+            uow.merge(llm_uow)
+        except asyncio.TimeoutError:
+            degraded_reason = "deadline_exceeded"
+            # a call left running reports its own outcome when it finishes;
+            # a cancelled one releases its slot, so the timeout is counted here
+            if not BACKGROUND_COMPLETION:
+                llm.breaker.record_failure()
+                llm_task.cancel()
+                llm_task = None
+        except Exception as e:
+            logging.error(f"LLM analysis failed, returning degraded response: {e}")
+            degraded_reason = "llm_error"
+
+    if degraded_reason:
+        with timer.stage("db"):
+            await uow.commit()
+        if degraded_reason == "deadline_exceeded" and llm_task is not None:
+            # started after the commit, which assigns db_error.id
+            task = asyncio.create_task(
+                _complete_in_background(
+                    llm_task,
+                    request.query,
+                    parsed_error,
+                    db_error.id,
+                    len(search_results),
+                    timer,
+                )
+            )
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+
+        analysis_time_ms = timer.total_ms()
+        logging.warning(
+            f"Returning degraded analysis ({degraded_reason}) in {analysis_time_ms}ms"
+        )
+        return _respond(
+            _degraded_response(
+                parsed_error, search_results_dicts, degraded_reason, analysis_time_ms
+            ),
+            timer,
+            uow,
+        )
+
+    # Store the parsed error, analysis and cost records in one transaction
+    db_analysis = await create_analysis(
+        uow.session,
+        {"parsed_error": db_error, **_analysis_data(llm_response, len(search_results))},
     )
+    with timer.stage("db"):
+        await uow.commit()
+
+    # Cache the analysis result
+    with timer.stage("cache"):
+        cache.set_analysis(
+            request.query,
+            _cached_payload(parsed_error, llm_response, len(search_results), db_analysis.id),
+        )
 
     # Calculate analysis time
-    analysis_time_ms = int((time.time() - start_time) * 1000)
+    analysis_time_ms = timer.total_ms()
     logging.info(f"Analysis completed in {analysis_time_ms}ms")
 
     # Combine parsed error info with LLM analysis
@@ -153,4 +213,274 @@ async def analyze_error(
         analysis_time_ms=analysis_time_ms,
     )
 
-    return analysis_result
+    response = _respond(analysis_result, timer, uow)
+    # The full breakdown (serialization included) is only known now, so it
+    # is stored once the response has been sent
+    background_tasks.add_task(
+        _record_timing, db_analysis.id, timer.total_ms(), timer.to_dict()
+    )
+    return response
+
+
+def _respond(
+    result: AnalysisResponse, timer: StageTimer, uow: UnitOfWork, cache_status: str = "miss"
+) -> JSONResponse:
+    """
+    Serialize the response (timed as its own stage) and add the
+    Server-Timing header, the number of database queries it took and
+    whether it came from the cache (hit, stale or miss)
+    """
+    with timer.stage("serialize"):
+        response = JSONResponse(jsonable_encoder(result))
+    response.headers["Server-Timing"] = timer.server_timing()
+    response.headers["X-Cache"] = cache_status
+    response.headers["X-DB-Queries"] = str(uow.queries)
+    DB_QUERIES.labels("analyze").observe(uow.queries)
+    return response
+
+
+def _search_query(parsed_error: Optional[Dict]) -> Optional[str]:
+    """A cleaner search query than the raw log, when the parser found the error"""
+    if parsed_error and parsed_error.get("error_type") and parsed_error.get("error_message"):
+        return f"{parsed_error['error_type']}: {parsed_error['error_message']}"
+    return None
+
+
+def _unparsed_error(raw_query: str) -> Dict:
+    """Minimal parsed_error structure for logs the parser couldn't handle"""
+    return {
+        "error_type": "Unknown",
+        "error_message": raw_query,
+        "language": "unknown",
+        "file_path": None,
+        "line_number": None,
+        "raw_error_log": raw_query,
+    }
+
+
+async def _search(
+    search_query: str,
+    n_results: int,
+    timer: StageTimer,
+    session=None,
+    timeout: Optional[float] = None,
+) -> List[SearchResult]:
+    """Relevant knowledge-base results; cached unless the search timed out"""
+    try:
+        results = await asyncio.wait_for(
+            vc.search(search_query, n_results=n_results, timer=timer, session=session),
+            timeout=timeout,
+        )
+    except asyncio.TimeoutError:
+        logging.warning("Vector search exceeded the deadline - continuing without sources")
+        return []
+
+    # Only include results that are actually relevant
+    search_results = relevant_results(results)
+    with timer.stage("cache"):
+        cache.set_search_results(search_query, search_results, index_version=vc.model_version)
+    return search_results
+
+
+def _schedule_revalidation(raw_query: str):
+    if len(_revalidations) >= CACHE_REVALIDATE_CONCURRENCY:
+        return
+    if not cache.acquire_lock(
+        f"revalidate:{cache.fingerprint(raw_query)}", CACHE_REVALIDATE_LOCK_SECONDS
+    ):
+        return  # another worker is already refreshing it
+    task = asyncio.create_task(_revalidate(raw_query))
+    _revalidations.add(task)
+    task.add_done_callback(_revalidations.discard)
+
+
+async def _revalidate(raw_query: str):
+    """Re-run an analysis that was served stale and cache it in the current namespace"""
+    timer = StageTimer()
+    try:
+        parsed_error = parser.parse(raw_query) or _unparsed_error(raw_query)
+        search_query = _search_query(parsed_error) or raw_query
+        cached_search = cache.get_search_results(search_query, index_version=vc.model_version)
+        if cached_search:
+            search_results = [SearchResult(**result) for result in cached_search]
+        else:
+            search_results = await _search(search_query, 3, timer)
+        search_results_dicts = [result.dict() for result in search_results]
+
+        route = router_policy.route(parsed_error, search_results_dicts)
+        # taken right before the call, which always reports back on it
+        if not llm.breaker.allow():
+            return
+        with timer.stage("llm"):
+            llm_response, llm_uow = await _run_llm(parsed_error, search_results_dicts, route)
+
+        async with sessionLocal() as session:
+            uow = UnitOfWork(session)
+            uow.merge(llm_uow)
+            db_error = await create_parsed_error(session, parsed_error)
+            db_analysis = await create_analysis(
+                session,
+                {
+                    "parsed_error": db_error,
+                    **_analysis_data(llm_response, len(search_results), timer),
+                },
+            )
+            await uow.commit()
+    except Exception as e:
+        logging.warning(f"Could not refresh a stale cached analysis: {e}")
+        BACKGROUND_ERRORS.labels("revalidate", type(e).__name__).inc()
+        return
+
+    cache.set_analysis(
+        raw_query,
+        _cached_payload(parsed_error, llm_response, len(search_results), db_analysis.id),
+    )
+    logging.info(f"Stale analysis refreshed as {db_analysis.id}")
+
+
+async def _record_timing(analysis_id: int, analysis_time: int, stage_timings: Dict):
+    try:
+        async with sessionLocal() as timing_session:
+            await record_analysis_timing(
+                timing_session, analysis_id, analysis_time, stage_timings
+            )
+    except Exception as e:
+        logging.warning(f"Could not store timings for analysis {analysis_id}: {e}")
+        BACKGROUND_ERRORS.labels("record_timing", type(e).__name__).inc()
+
+
+async def _run_llm(parsed_error: Dict, search_results: List[Dict], route: Dict):
+    """
+    Run the LLM with its own session so the call can outlive the request
+    (the request session is closed once the degraded response is sent).
+
+    Its cost record is only queued; returns (analysis, unit of work) and
+    whoever uses the analysis commits the record with its own writes.
+    """
+    async with sessionLocal() as llm_session:
+        llm_uow = UnitOfWork(llm_session)
+        try:
+            return (
+                await llm.analyze_error(parsed_error, search_results, llm_session, route),
+                llm_uow,
+            )
+        except Exception:
+            # a failed call may still have been billed
+            await llm_uow.commit()
+            raise
+
+
+async def _complete_in_background(
+    llm_task: asyncio.Task,
+    raw_query: str,
+    parsed_error: Dict,
+    parsed_error_id: int,
+    sources_used: int,
+    timer: StageTimer,
+):
+    """Finish a timed-out analysis, then store and cache it for the next request"""
+    # nothing awaits this task, so every failure is logged and counted here
+    try:
+        with timer.stage("llm"):
+            llm_response, llm_uow = await llm_task
+    except Exception as e:
+        logging.error(f"Background analysis failed: {e}")
+        BACKGROUND_ERRORS.labels("complete_analysis", type(e).__name__).inc()
+        return
+
+    try:
+        async with sessionLocal() as bg_session:
+            bg_uow = UnitOfWork(bg_session)
+            bg_uow.merge(llm_uow)
+            db_analysis = await create_analysis(
+                bg_session,
+                {
+                    "parsed_error_id": parsed_error_id,
+                    **_analysis_data(llm_response, sources_used, timer),
+                },
+            )
+            await bg_uow.commit()
+
+        cache.set_analysis(
+            raw_query,
+            _cached_payload(parsed_error, llm_response, sources_used, db_analysis.id),
+        )
+    except Exception as e:
+        logging.exception(f"Could not store background analysis of error {parsed_error_id}")
+        BACKGROUND_ERRORS.labels("store_analysis", type(e).__name__).inc()
+        return
+    logging.info(f"Background analysis {db_analysis.id} completed and cached")
+
+
+def _analysis_data(
+    llm_response: Dict, sources_used: int, timer: Optional[StageTimer] = None
+) -> Dict:
+    data = {
+        "root_cause": llm_response.get("root_cause", ""),
+        "reasoning": llm_response.get("reasoning", ""),
+        "solutions": llm_response.get("solutions", []),
+        "sources_used": sources_used,
+        # lets the cache warm-up tell which stored analyses are current
+        "cache_namespace": cache.namespace() if cache.enabled else None,
+    }
+    # without a timer, record_analysis_timing fills these in afterwards
+    if timer is not None:
+        data["analysis_time"] = timer.total_ms()
+        data["stage_timings"] = timer.to_dict()
+    return data
+
+
+def _cached_payload(
+    parsed_error: Dict, llm_response: Dict, sources_used: int, analysis_id: int
+) -> Dict:
+    return {
+        "error_type": parsed_error.get("error_type"),
+        "error_message": parsed_error.get("error_message"),
+        "language": parsed_error.get("language", "unknown"),
+        "file_path": parsed_error.get("file_path"),
+        "line_number": parsed_error.get("line_number"),
+        "root_cause": llm_response.get("root_cause", ""),
+        "reasoning": llm_response.get("reasoning", ""),
+        "solutions": llm_response.get("solutions", []),
+        "sources_used": sources_used,
+        "analysis_id": analysis_id,
+    }
+
+
+# Explanations shown to the user for each degradation reason
+DEGRADED_REASONS = {
+    "llm_unavailable": "The AI analysis service is failing repeatedly and is paused for a moment.",
+    "deadline_exceeded": "The AI analysis did not finish within the response time limit.",
+    "llm_error": "The AI analysis service returned an error.",
+}
+
+
+def _degraded_response(
+    parsed_error: Dict, search_results: List[Dict], reason: str, analysis_time_ms: int
+) -> AnalysisResponse:
+    """Retrieval-only response: the parsed error plus the closest Stack Overflow posts"""
+    solutions = [
+        Solution(
+            title=result["title"],
+            explanation=result["content"],
+            code="",
+            confidence=round(max(0.0, 1 - result["distance"]), 2),
+            source_urls=[result["url"]],
+        )
+        for result in search_results[:3]
+    ]
+
+    return AnalysisResponse(
+        error_type=parsed_error.get("error_type"),
+        error_message=parsed_error.get("error_message"),
+        language=parsed_error.get("language", "unknown"),
+        file_path=parsed_error.get("file_path"),
+        line_number=parsed_error.get("line_number"),
+        root_cause="AI analysis unavailable - showing the closest Stack Overflow matches instead.",
+        reasoning=DEGRADED_REASONS.get(reason, reason),
+        solutions=solutions,
+        sources_used=len(search_results),
+        analysis_time_ms=analysis_time_ms,
+        degraded=True,
+        degraded_reason=reason,
+    )
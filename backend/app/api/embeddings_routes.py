@@ -1,31 +1,26 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.scripts.create_embeddings import create_embeddings
+from app.db import get_session
+from app.schemas.job import JobResponse
+from app.services.job_runner import job_runner
 
 router = APIRouter()
 
 
-@router.post("/embeddings/create")
-async def create_embeddings_endpoint():
+@router.post("/embeddings/create", response_model=JobResponse, status_code=202)
+async def create_embeddings_endpoint(session: AsyncSession = Depends(get_session)):
     """
-    Create embeddings for all Stack Overflow posts in the database.
+    Create embeddings for new or changed Stack Overflow posts in the database.
 
     This will:
-    1. Fetch all posts from the database
+    1. Select posts that are new, changed, or embedded with an older model
     2. Generate embeddings using OpenAI
-    3. Store them in ChromaDB vector store
+    3. Store them in the Supabase pgvector store
 
-    **Note**: This processes posts in batches of 500 for efficiency.
+    **Note**: Unchanged posts are skipped, and an interrupted run resumes
+    where it stopped. Runs as a background job - poll GET /api/jobs/{id}
+    for progress. While a run is queued or running, that job is returned
+    instead of starting another.
     """
-    try:
-        await create_embeddings()
-        return {
-            "status": "success",
-            "message": "Embeddings created successfully for all posts"
-        }
-    except Exception as e:
-        return {
-            "status": "error",
-            "message": f"Failed to create embeddings: {str(e)}",
-            "error": str(e)
-        }
+    return await job_runner.submit(session, "embeddings", {})
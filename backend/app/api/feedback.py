@@ -1,11 +1,12 @@
-from app.db import get_session, Feedback
+from app.db import get_session
 from app.schemas.feedback import FeedbackRequest, FeedbackResponse
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func, Integer, select
-from app.db.crud import create_feedback
+from app.db.crud import create_feedback, get_feedback_stats
+from app.services.cache import CacheService
 
 router = APIRouter()
+cache = CacheService()
 
 
 @router.post("/feedback", response_model=FeedbackResponse)
@@ -13,42 +14,28 @@ async def submit_feedback(
     feedback: FeedbackRequest, session: AsyncSession = Depends(get_session)
 ):
     result = await create_feedback(feedback, session)
+    # once stored: keep analyses that worked cached longer, recompute ones that didn't
+    cache.apply_feedback(feedback.analysis_id, feedback.worked)
     return result
 
 
 @router.get("/analytics/feedback-stats")
-async def get_feedback_stats(session: AsyncSession = Depends(get_session)):
+async def feedback_stats(session: AsyncSession = Depends(get_session)):
     """
     Get overall feedback statistics
     """
-    # Total feedback
-    total_result = await session.execute(select(func.count(Feedback.id)))
-    total = total_result.scalar()
-
-    # Successful solutions
-    successful_result = await session.execute(
-        select(func.count(Feedback.id)).where(Feedback.worked == True)
-    )
-    successful = successful_result.scalar()
-
-    # Success rate by solution index
-    solution_stats_query = select(
-        Feedback.solution_index,
-        func.count(Feedback.id).label('total'),
-        func.sum(func.cast(Feedback.worked, Integer)).label('successful')
-    ).group_by(Feedback.solution_index)
-
-    solution_stats_result = await session.execute(solution_stats_query)
-    solution_stats = solution_stats_result.all()
-
-    solution_breakdown = []
-    for idx, total_count, success_count in solution_stats:
-        solution_breakdown.append({
-            'solution_index': idx,
-            'total_feedback': total_count,
-            'successful': success_count or 0,
-            'success_rate': (success_count or 0) / total_count if total_count > 0 else 0
-        })
+    stats = await get_feedback_stats(session)
+    total, successful = stats["total"], stats["successful"]
+
+    solution_breakdown = [
+        {
+            'solution_index': row['solution_index'],
+            'total_feedback': row['total_feedback'],
+            'successful': row['successful'],
+            'success_rate': row['successful'] / row['total_feedback'] if row['total_feedback'] > 0 else 0
+        }
+        for row in stats["solutions"]
+    ]
 
     return {
         'total_feedback': total,
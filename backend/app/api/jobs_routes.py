@@ -0,0 +1,27 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_session
+from app.db.crud import get_job, list_jobs
+from app.schemas.job import JobResponse
+
+router = APIRouter()
+
+
+@router.get("/jobs", response_model=List[JobResponse])
+async def get_jobs(
+    limit: int = Query(default=20, ge=1, le=100),
+    session: AsyncSession = Depends(get_session),
+):
+    """List the most recent scrape and embedding jobs"""
+    return await list_jobs(session, limit)
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job_status(job_id: int, session: AsyncSession = Depends(get_session)):
+    """Get a job's status, progress counters and (when finished) its result"""
+    job = await get_job(session, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
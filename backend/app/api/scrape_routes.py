@@ -1,14 +1,16 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas.scrape import ScrapeRequest, ScrapeResponse
-from app.scripts.scrape_stackoverflow import scrape_stackoverflow
-from app.scripts.batch_scrape import scrape_all_tags
+from app.db import get_session
+from app.schemas.scrape import ScrapeRequest
+from app.schemas.job import JobResponse
+from app.services.job_runner import job_runner
 
 router = APIRouter()
 
 
-@router.post("/scrape/batch")
-async def batch_scrape():
+@router.post("/scrape/batch", response_model=JobResponse, status_code=202)
+async def batch_scrape(session: AsyncSession = Depends(get_session)):
     """
     Scrape multiple Stack Overflow tags in one go.
 
@@ -22,45 +24,23 @@ async def batch_scrape():
     - FastAPI: 100 posts
 
     Total: 2,050 posts across 7 tags
+
+    Runs as a background job - poll GET /api/jobs/{id} for progress.
     """
-    try:
-        result = await scrape_all_tags()
-        return {
-            "status": "success",
-            "message": f"Batch scrape completed: {result['total_scraped']}/{result['total_target']} posts",
-            "total_scraped": result['total_scraped'],
-            "total_target": result['total_target'],
-            "tags_count": result['tags_count']
-        }
-    except Exception as e:
-        return {
-            "status": "error",
-            "message": f"Batch scrape failed: {str(e)}",
-            "error": str(e)
-        }
+    return await job_runner.submit(session, "scrape_batch", {})
 
 
-@router.post("/scrape", response_model=ScrapeResponse)
-async def scrape_posts(request: ScrapeRequest):
+@router.post("/scrape", response_model=JobResponse, status_code=202)
+async def scrape_posts(request: ScrapeRequest, session: AsyncSession = Depends(get_session)):
     """
     Scrape Stack Overflow posts for a specific tag.
 
     You can specify any tag and the number of posts you want to scrape (1-1000).
 
     **Common tags**: python, javascript, react, typescript, node.js, django, fastapi, java, go, rust
+
+    Runs as a background job - poll GET /api/jobs/{id} for progress.
     """
-    try:
-        await scrape_stackoverflow(request.tag, request.limit)
-        return ScrapeResponse(
-            status="success",
-            message=f"Successfully scraped {request.limit} posts for tag: {request.tag}",
-            tag=request.tag,
-            posts_scraped=request.limit
-        )
-    except Exception as e:
-        return ScrapeResponse(
-            status="error",
-            message=f"Failed to scrape posts",
-            tag=request.tag,
-            error=str(e)
-        )
+    return await job_runner.submit(
+        session, "scrape", {"tag": request.tag, "limit": request.limit}
+    )
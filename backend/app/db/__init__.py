@@ -1,16 +1,24 @@
 from .base import Base
-from .models import ParsedError, StackOverFlowPost, Feedback, CostTracking  # noqa: F401
-from .session import init_db, get_session, sessionLocal, engine  # noqa: F401
+from .models import ParsedError, StackOverFlowPost, Feedback, CostTracking, PipelineCheckpoint, Job, AnalyticsCounter, LanguageRollup, CostRollupHourly  # noqa: F401
+from .session import init_db, get_session, get_unit_of_work, sessionLocal, engine  # noqa: F401
+from .unit_of_work import UnitOfWork  # noqa: F401
 
 
 __all__ = [
     "Base",
     "init_db",
     "get_session",
+    "get_unit_of_work",
+    "UnitOfWork",
     "sessionLocal",
     "engine",
     "ParsedError",
     "StackOverFlowPost",
     "Feedback",
     "CostTracking",
+    "PipelineCheckpoint",
+    "Job",
+    "AnalyticsCounter",
+    "LanguageRollup",
+    "CostRollupHourly",
 ]
@@ -1,11 +1,38 @@
-from app.db.crud.stackoverflow_crud import post_exists, create_post, get_all_posts
-from app.db.crud.error_crud import create_parsed_error, create_analysis
+from app.db.crud.stackoverflow_crud import (
+    post_exists,
+    existing_question_ids,
+    create_post,
+    bulk_create_posts,
+    get_all_posts,
+    count_posts,
+    iter_posts_to_embed,
+)
+from app.db.crud.checkpoint_crud import get_checkpoint, save_checkpoint, clear_checkpoint
+from app.db.crud.job_crud import (
+    create_job,
+    get_active_job,
+    get_job,
+    list_jobs,
+    claim_next_job,
+    update_job,
+)
+from app.db.crud.error_crud import (
+    create_parsed_error,
+    create_analysis,
+    record_analysis_timing,
+    get_frequent_errors,
+)
 from app.db.crud.feedback_crud import create_feedback
 from app.db.crud.cost_crud import (
     create_cost_record,
     total_cost,
     cost_breakdown,
     daily_costs,
+    routing_breakdown,
+    routing_reasons,
+    recent_routing_decisions,
+    seed_cost_rollups,
+    compact_cost_records,
 )
 from app.db.crud.analytics_crud import (
     get_total_analyses,
@@ -15,19 +42,49 @@ from app.db.crud.analytics_crud import (
     get_total_feedback,
     get_successful_feedback,
     get_language_breakdown,
+    record_parsed_error_rollup,
+    record_analysis_rollup,
+    record_analysis_time_rollup,
+    record_feedback_rollup,
+    get_analytics_rollups,
+    get_overview_from_tables,
+    get_feedback_stats,
+    get_stage_percentiles,
+    rebuild_analytics_rollups,
+    seed_analytics_rollups,
 )
 
 __all__ = [
     "post_exists",
+    "existing_question_ids",
     "create_post",
+    "bulk_create_posts",
     "get_all_posts",
+    "count_posts",
+    "iter_posts_to_embed",
+    "get_checkpoint",
+    "save_checkpoint",
+    "clear_checkpoint",
+    "create_job",
+    "get_active_job",
+    "get_job",
+    "list_jobs",
+    "claim_next_job",
+    "update_job",
     "create_parsed_error",
     "create_analysis",
+    "record_analysis_timing",
+    "get_frequent_errors",
     "create_feedback",
     "create_cost_record",
     "total_cost",
     "cost_breakdown",
     "daily_costs",
+    "routing_breakdown",
+    "routing_reasons",
+    "recent_routing_decisions",
+    "seed_cost_rollups",
+    "compact_cost_records",
     "get_total_analyses",
     "get_total_errors",
     "get_errors_by_language",
@@ -35,4 +92,14 @@ __all__ = [
     "get_total_feedback",
     "get_successful_feedback",
     "get_language_breakdown",
+    "record_parsed_error_rollup",
+    "record_analysis_rollup",
+    "record_analysis_time_rollup",
+    "record_feedback_rollup",
+    "get_analytics_rollups",
+    "get_overview_from_tables",
+    "get_feedback_stats",
+    "get_stage_percentiles",
+    "rebuild_analytics_rollups",
+    "seed_analytics_rollups",
 ]
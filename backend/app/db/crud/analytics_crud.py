@@ -1,8 +1,11 @@
+from datetime import datetime, timedelta
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func, select
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.db import Feedback
-from app.db.models import ParsedError, Analysis
+from app.db.models import ParsedError, Analysis, AnalyticsCounter, LanguageRollup
 
 
 async def get_total_analyses(session: AsyncSession) -> int:
@@ -55,3 +58,250 @@ async def get_language_breakdown(session: AsyncSession) -> list:
     ).group_by(ParsedError.language)
     result = await session.execute(query)
     return result.all()
+
+
+# Rollups: counters maintained on every insert so the dashboard endpoints
+# read a handful of rows instead of scanning parsed_errors/analyses/feedback
+
+
+async def _bump_counters(session: AsyncSession, amounts: dict):
+    """Add to named counters (created at 0) without committing"""
+    statement = pg_insert(AnalyticsCounter).values(
+        [{"name": name, "value": value} for name, value in amounts.items()]
+    )
+    await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[AnalyticsCounter.name],
+            set_={"value": AnalyticsCounter.value + statement.excluded.value},
+        )
+    )
+
+
+async def record_parsed_error_rollup(
+    session: AsyncSession, language: Optional[str], confidence: Optional[int]
+):
+    """Count a new parsed error; runs in the caller's transaction"""
+    await _bump_counters(session, {"parsed_errors": 1})
+    statement = pg_insert(LanguageRollup).values(
+        language=language or "",
+        error_count=1,
+        confidence_sum=confidence or 0,
+        confidence_count=0 if confidence is None else 1,
+    )
+    await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[LanguageRollup.language],
+            set_={
+                "error_count": LanguageRollup.error_count + 1,
+                "confidence_sum": LanguageRollup.confidence_sum + statement.excluded.confidence_sum,
+                "confidence_count": LanguageRollup.confidence_count
+                + statement.excluded.confidence_count,
+            },
+        )
+    )
+
+
+async def record_analysis_rollup(session: AsyncSession, analysis_time: Optional[int]):
+    """Count a new analysis and its time; runs in the caller's transaction"""
+    amounts = {"analyses": 1}
+    if analysis_time is not None:
+        amounts.update(analysis_time_ms=analysis_time, timed_analyses=1)
+    await _bump_counters(session, amounts)
+
+
+async def record_analysis_time_rollup(session: AsyncSession, analysis_time: int):
+    """Count the time of an analysis stored without one; runs in the caller's transaction"""
+    await _bump_counters(session, {"analysis_time_ms": analysis_time, "timed_analyses": 1})
+
+
+async def record_feedback_rollup(session: AsyncSession, worked: bool):
+    """Count a new feedback entry; runs in the caller's transaction"""
+    await _bump_counters(session, {"feedback": 1, "feedback_worked": 1 if worked else 0})
+
+
+# Dashboard payloads in one statement each: CTEs gather every figure and
+# FILTER clauses replace the separate "count where" queries
+
+
+ROLLUPS_SQL = text(
+    """
+    WITH counters AS (
+        SELECT coalesce(jsonb_object_agg(name, value), '{}'::jsonb) AS counters
+        FROM analytics_counters
+    ),
+    languages AS (
+        SELECT coalesce(
+            jsonb_agg(to_jsonb(language_rollups) ORDER BY error_count DESC), '[]'::jsonb
+        ) AS languages
+        FROM language_rollups
+    )
+    SELECT counters.counters, languages.languages FROM counters, languages
+"""
+)
+
+
+async def get_analytics_rollups(session: AsyncSession) -> dict:
+    """Current counters ({name: value}) and per-language rollups (list of dicts)"""
+    row = (await session.execute(ROLLUPS_SQL)).one()
+    return {"counters": row.counters, "languages": row.languages}
+
+
+OVERVIEW_FROM_TABLES_SQL = text(
+    """
+    WITH analysis_totals AS (
+        SELECT
+            count(*) AS analyses,
+            coalesce(sum(analysis_time), 0) AS analysis_time_ms,
+            count(analysis_time) AS timed_analyses
+        FROM analyses
+    ),
+    feedback_totals AS (
+        SELECT count(*) AS feedback, count(*) FILTER (WHERE worked) AS feedback_worked
+        FROM feedback
+    ),
+    languages AS (
+        SELECT
+            coalesce(language, '') AS language,
+            count(*) AS error_count,
+            coalesce(sum(confidence_score), 0) AS confidence_sum,
+            count(confidence_score) AS confidence_count
+        FROM parsed_errors
+        GROUP BY coalesce(language, '')
+    )
+    SELECT
+        analysis_totals.*,
+        feedback_totals.*,
+        (SELECT coalesce(sum(error_count), 0) FROM languages) AS parsed_errors,
+        (
+            SELECT coalesce(jsonb_agg(to_jsonb(languages) ORDER BY error_count DESC), '[]'::jsonb)
+            FROM languages
+        ) AS languages
+    FROM analysis_totals, feedback_totals
+"""
+)
+
+
+async def get_overview_from_tables(session: AsyncSession) -> dict:
+    """
+    Everything the overview needs, computed from the base tables in one
+    statement. Same shape as get_analytics_rollups.
+    """
+    row = (await session.execute(OVERVIEW_FROM_TABLES_SQL)).one()
+    counters = {
+        name: int(getattr(row, name))
+        for name in (
+            "parsed_errors",
+            "analyses",
+            "analysis_time_ms",
+            "timed_analyses",
+            "feedback",
+            "feedback_worked",
+        )
+    }
+    return {"counters": counters, "languages": row.languages}
+
+
+FEEDBACK_STATS_SQL = text(
+    """
+    WITH by_solution AS (
+        SELECT
+            solution_index,
+            count(*) AS total_feedback,
+            count(*) FILTER (WHERE worked) AS successful
+        FROM feedback
+        GROUP BY solution_index
+    )
+    SELECT
+        coalesce(sum(total_feedback), 0) AS total,
+        coalesce(sum(successful), 0) AS successful,
+        coalesce(
+            jsonb_agg(to_jsonb(by_solution) ORDER BY solution_index NULLS FIRST), '[]'::jsonb
+        ) AS solutions
+    FROM by_solution
+"""
+)
+
+
+async def get_feedback_stats(session: AsyncSession) -> dict:
+    """Feedback totals and per-solution-index counts in one statement"""
+    row = (await session.execute(FEEDBACK_STATS_SQL)).one()
+    return {"total": int(row.total), "successful": int(row.successful), "solutions": row.solutions}
+
+
+STAGE_PERCENTILES_SQL = text(
+    """
+    WITH recent AS (
+        SELECT analysis_time, stage_timings
+        FROM analyses
+        WHERE created_at >= :since AND analysis_time IS NOT NULL
+    ),
+    stage_values AS (
+        SELECT stage.key AS stage, stage.value::float AS duration_ms
+        FROM recent, json_each_text(recent.stage_timings) AS stage
+        WHERE recent.stage_timings IS NOT NULL
+        UNION ALL
+        SELECT 'total', analysis_time::float FROM recent
+    )
+    SELECT
+        stage,
+        count(*) AS count,
+        percentile_cont(ARRAY[0.5, 0.95, 0.99]) WITHIN GROUP (ORDER BY duration_ms) AS percentiles
+    FROM stage_values
+    GROUP BY stage
+"""
+)
+
+
+async def get_stage_percentiles(session: AsyncSession, hours: int = 24) -> dict:
+    """
+    p50/p95/p99 of each /analyze stage (and the total) in milliseconds,
+    over analyses created in the last `hours`
+    """
+    since = datetime.utcnow() - timedelta(hours=hours)
+    result = await session.execute(STAGE_PERCENTILES_SQL, {"since": since})
+    return {
+        row.stage: {
+            "count": row.count,
+            "p50": round(row.percentiles[0], 1),
+            "p95": round(row.percentiles[1], 1),
+            "p99": round(row.percentiles[2], 1),
+        }
+        for row in result
+    }
+
+
+# EXCLUSIVE blocks the rollup upserts (and other rebuilds) but not reads. Taken
+# first, it waits for in-flight requests to commit, so their rows are in the
+# rebuild's scan; requests arriving later bump the rebuilt counters once it
+# commits. Every row is counted exactly once.
+LOCK_ROLLUPS_SQL = text("LOCK TABLE analytics_counters, language_rollups IN EXCLUSIVE MODE")
+
+
+async def rebuild_analytics_rollups(session: AsyncSession):
+    """
+    Recompute every rollup from the base tables (one full scan each).
+    Used to seed the rollups for existing data and to repair them.
+    """
+    await session.execute(LOCK_ROLLUPS_SQL)
+    overview = await get_overview_from_tables(session)
+
+    await session.execute(delete(AnalyticsCounter))
+    await session.execute(delete(LanguageRollup))
+    session.add_all(
+        [AnalyticsCounter(name=name, value=value) for name, value in overview["counters"].items()]
+        + [LanguageRollup(**language) for language in overview["languages"]]
+    )
+    await session.commit()
+
+
+async def seed_analytics_rollups(session: AsyncSession):
+    """
+    Build the rollups once if they have never been built. Safe when several
+    workers start at once: the lock makes the others wait, then see the seed.
+    """
+    await session.execute(LOCK_ROLLUPS_SQL)
+    seeded = await session.execute(select(func.count()).select_from(AnalyticsCounter))
+    if not seeded.scalar():
+        await rebuild_analytics_rollups(session)
+    else:
+        await session.commit()
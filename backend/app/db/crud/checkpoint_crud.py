@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import PipelineCheckpoint
+
+
+async def get_checkpoint(session: AsyncSession, name: str) -> Optional[dict]:
+    """Get the saved state for a pipeline, or None if it has none"""
+    result = await session.execute(
+        select(PipelineCheckpoint.value).where(PipelineCheckpoint.name == name)
+    )
+    return result.scalar()
+
+
+async def save_checkpoint(session: AsyncSession, name: str, value: dict):
+    """Create or replace the saved state for a pipeline"""
+    stmt = insert(PipelineCheckpoint).values(
+        name=name, value=value, updated_at=datetime.utcnow()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PipelineCheckpoint.name],
+        set_={"value": stmt.excluded.value, "updated_at": stmt.excluded.updated_at},
+    )
+    await session.execute(stmt)
+    await session.commit()
+
+
+async def clear_checkpoint(session: AsyncSession, name: str):
+    """Remove a pipeline's saved state once it has completed"""
+    await session.execute(delete(PipelineCheckpoint).where(PipelineCheckpoint.name == name))
+    await session.commit()
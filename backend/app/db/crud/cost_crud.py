@@ -1,7 +1,10 @@
 from datetime import datetime, timedelta
-from app.db import CostTracking
+from app.db import CostTracking, CostRollupHourly
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func, select, cast, Date
+from sqlalchemy import delete, func, select, cast, text, Date
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.db.unit_of_work import save
 
 
 async def create_cost_record(
@@ -12,6 +15,10 @@ async def create_cost_record(
     prompt_tokens: int = 0,
     completion_tokens: int = 0,
     total_tokens: int = 0,
+    route_tier: str = None,
+    latency_ms: int = None,
+    route_reason: str = None,
+    route_signals: dict = None,
 ) -> CostTracking:
     record = CostTracking(
         operation=operation,
@@ -20,18 +27,65 @@ async def create_cost_record(
         prompt_tokens=prompt_tokens,
         completion_tokens=completion_tokens,
         total_tokens=total_tokens,
+        route_tier=route_tier,
+        latency_ms=latency_ms,
+        route_reason=route_reason,
+        route_signals=route_signals,
     )
-    session.add(record)
-    await session.commit()
-    await session.refresh(record)
+    await save(session, record, lambda s: _bump_cost_rollup(s, record))
     return record
 
 
+async def _bump_cost_rollup(session: AsyncSession, record: CostTracking):
+    """Add a cost record to its hourly rollup row in the caller's transaction"""
+    statement = pg_insert(CostRollupHourly).values(
+        hour=(record.created_at or datetime.utcnow()).replace(minute=0, second=0, microsecond=0),
+        operation=record.operation,
+        model=record.model,
+        route_tier=record.route_tier or "",
+        count=1,
+        cost=record.cost or 0.0,
+        prompt_tokens=record.prompt_tokens or 0,
+        completion_tokens=record.completion_tokens or 0,
+        total_tokens=record.total_tokens or 0,
+        latency_ms_sum=record.latency_ms or 0,
+        latency_count=0 if record.latency_ms is None else 1,
+    )
+    excluded = statement.excluded
+    await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=["hour", "operation", "model", "route_tier"],
+            set_={
+                column: getattr(CostRollupHourly, column) + getattr(excluded, column)
+                for column in (
+                    "count",
+                    "cost",
+                    "prompt_tokens",
+                    "completion_tokens",
+                    "total_tokens",
+                    "latency_ms_sum",
+                    "latency_count",
+                )
+            },
+        )
+    )
+
+
+def _since_hour(days: int) -> datetime:
+    """Start of the hour `days` ago; rollups are queried by whole hours"""
+    since = datetime.utcnow() - timedelta(days=days)
+    return since.replace(minute=0, second=0, microsecond=0)
+
+
+# The report queries below read cost_rollups_hourly (a few rows per hour)
+# instead of scanning cost_tracking; its primary key starts with `hour`,
+# so the time filter is an index range scan
+
+
 # Get total cost for last N days
 async def total_cost(session: AsyncSession, days: int = 30):
-    since = datetime.utcnow() - timedelta(days=days)
     result = await session.execute(
-        select(func.sum(CostTracking.cost)).filter(CostTracking.created_at >= since)
+        select(func.sum(CostRollupHourly.cost)).filter(CostRollupHourly.hour >= _since_hour(days))
     )
     total = result.scalar()
     return total or 0.0
@@ -41,24 +95,22 @@ async def cost_breakdown(session: AsyncSession, days: int = 30) -> list:
     """
     Get cost breakdown by operation
     """
-    since = datetime.utcnow() - timedelta(days=days)
-
     result = await session.execute(
         select(
-            CostTracking.operation,
-            func.count(CostTracking.id).label("count"),
-            func.sum(CostTracking.cost).label("total_cost"),
-            func.sum(CostTracking.total_tokens).label("total_tokens"),
+            CostRollupHourly.operation,
+            func.sum(CostRollupHourly.count).label("count"),
+            func.sum(CostRollupHourly.cost).label("total_cost"),
+            func.sum(CostRollupHourly.total_tokens).label("total_tokens"),
         )
-        .filter(CostTracking.created_at >= since)
-        .group_by(CostTracking.operation)
+        .filter(CostRollupHourly.hour >= _since_hour(days))
+        .group_by(CostRollupHourly.operation)
     )
     breakdown = result.all()
 
     return [
         {
             "operation": op,
-            "count": count,
+            "count": int(count),
             "total_cost": float(total_cost or 0),
             "total_tokens": int(total_tokens or 0),
         }
@@ -70,19 +122,167 @@ async def daily_costs(session: AsyncSession, days: int = 7) -> list:
     """
     Get daily cost summary
     """
-    since = datetime.utcnow() - timedelta(days=days)
+    day = cast(CostRollupHourly.hour, Date)
+    result = await session.execute(
+        select(day.label("date"), func.sum(CostRollupHourly.cost).label("cost"))
+        .filter(CostRollupHourly.hour >= _since_hour(days))
+        .group_by(day)
+        .order_by(day)
+    )
+    daily = result.all()
 
+    return [
+        {"date": date.isoformat(), "cost": float(cost or 0)} for date, cost in daily
+    ]
+
+
+async def routing_breakdown(session: AsyncSession, days: int = 30) -> list:
+    """
+    Get analysis cost and latency by routing tier and model
+    """
     result = await session.execute(
         select(
-            cast(CostTracking.created_at, Date).label("date"),
-            func.sum(CostTracking.cost).label("cost"),
+            CostRollupHourly.route_tier,
+            CostRollupHourly.model,
+            func.sum(CostRollupHourly.count).label("count"),
+            func.sum(CostRollupHourly.cost).label("total_cost"),
+            func.sum(CostRollupHourly.latency_ms_sum).label("latency_ms_sum"),
+            func.sum(CostRollupHourly.latency_count).label("latency_count"),
+            func.sum(CostRollupHourly.completion_tokens).label("completion_tokens"),
         )
-        .filter(CostTracking.created_at >= since)
-        .group_by(cast(CostTracking.created_at, Date))
-        .order_by(cast(CostTracking.created_at, Date))
+        .filter(CostRollupHourly.hour >= _since_hour(days))
+        .filter(CostRollupHourly.operation == "analysis")
+        .group_by(CostRollupHourly.route_tier, CostRollupHourly.model)
     )
-    daily = result.all()
+    rows = result.all()
 
     return [
-        {"date": date.isoformat(), "cost": float(cost or 0)} for date, cost in daily
+        {
+            "tier": tier or "unrouted",
+            "model": model,
+            "count": int(count),
+            "total_cost": float(total_cost or 0),
+            "avg_cost": float(total_cost or 0) / int(count) if count else 0.0,
+            "avg_latency_ms": int(latency_ms_sum / latency_count) if latency_count else 0,
+            "avg_completion_tokens": int(completion_tokens / count) if count else 0,
+        }
+        for tier, model, count, total_cost, latency_ms_sum, latency_count, completion_tokens in rows
+    ]
+
+
+async def routing_reasons(session: AsyncSession, days: int = 30, limit: int = 20) -> list:
+    """
+    Get the most common routing reasons per tier. Read from the raw
+    cost_tracking rows, so it only covers the retention window.
+    """
+    result = await session.execute(
+        select(
+            CostTracking.route_tier,
+            CostTracking.route_reason,
+            func.count().label("count"),
+            func.avg(CostTracking.latency_ms).label("avg_latency_ms"),
+        )
+        .filter(CostTracking.created_at >= datetime.utcnow() - timedelta(days=days))
+        .filter(CostTracking.operation == "analysis")
+        .filter(CostTracking.route_reason.isnot(None))
+        .group_by(CostTracking.route_tier, CostTracking.route_reason)
+        .order_by(func.count().desc())
+        .limit(limit)
+    )
+
+    return [
+        {
+            "tier": tier,
+            "reason": reason,
+            "count": int(count),
+            "avg_latency_ms": int(avg_latency_ms or 0),
+        }
+        for tier, reason, count, avg_latency_ms in result.all()
+    ]
+
+
+async def recent_routing_decisions(session: AsyncSession, limit: int = 20) -> list:
+    """
+    Get the latest routed analyses with the signals behind each decision
+    """
+    result = await session.execute(
+        select(CostTracking)
+        .filter(CostTracking.operation == "analysis")
+        .filter(CostTracking.route_tier.isnot(None))
+        .order_by(CostTracking.created_at.desc())
+        .limit(limit)
+    )
+
+    return [
+        {
+            "created_at": record.created_at.isoformat() if record.created_at else None,
+            "tier": record.route_tier,
+            "model": record.model,
+            "reason": record.route_reason,
+            "signals": record.route_signals,
+            "latency_ms": record.latency_ms,
+            "cost": record.cost,
+        }
+        for record in result.scalars().all()
     ]
+
+
+async def seed_cost_rollups(session: AsyncSession):
+    """
+    Build the hourly rollups from cost_tracking once, if they are empty.
+    Only safe before compaction has ever run: deleted raw rows can't be
+    counted again, so the rollups are never rebuilt after that.
+
+    Workers starting together seed one at a time: the lock (which also holds
+    back rollup upserts until the seed commits) makes the others wait and
+    then find the table seeded.
+    """
+    await session.execute(text("LOCK TABLE cost_rollups_hourly IN EXCLUSIVE MODE"))
+    seeded = await session.execute(select(func.count()).select_from(CostRollupHourly))
+    if seeded.scalar():
+        await session.commit()
+        return
+    await session.execute(
+        text(
+            """
+            INSERT INTO cost_rollups_hourly (
+                hour, operation, model, route_tier, count, cost, prompt_tokens,
+                completion_tokens, total_tokens, latency_ms_sum, latency_count
+            )
+            SELECT
+                date_trunc('hour', created_at), operation, model, coalesce(route_tier, ''),
+                count(*), coalesce(sum(cost), 0), coalesce(sum(prompt_tokens), 0),
+                coalesce(sum(completion_tokens), 0), coalesce(sum(total_tokens), 0),
+                coalesce(sum(latency_ms), 0), count(latency_ms)
+            FROM cost_tracking
+            WHERE created_at IS NOT NULL
+            GROUP BY 1, 2, 3, 4
+            ON CONFLICT (hour, operation, model, route_tier) DO NOTHING
+        """
+        )
+    )
+    await session.commit()
+
+
+async def compact_cost_records(
+    session: AsyncSession, retention_days: int, batch_size: int = 10_000
+) -> int:
+    """
+    Delete raw cost_tracking rows older than `retention_days`, batch_size
+    rows per transaction so locks and WAL stay small. Their costs remain in
+    the hourly rollups. Returns the number of rows deleted.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = 0
+    while True:
+        oldest = (
+            select(CostTracking.id)
+            .filter(CostTracking.created_at < cutoff)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        result = await session.execute(delete(CostTracking).where(CostTracking.id.in_(oldest)))
+        await session.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
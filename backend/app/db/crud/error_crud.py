@@ -1,5 +1,13 @@
+from datetime import datetime, timedelta
 from app.db.models.error import ParsedError, Analysis
+from sqlalchemy import text, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.unit_of_work import save
+from app.db.crud.analytics_crud import (
+    record_parsed_error_rollup,
+    record_analysis_rollup,
+    record_analysis_time_rollup,
+)
 
 
 async def create_parsed_error(
@@ -23,16 +31,100 @@ async def create_parsed_error(
     }
 
     parsed_error = ParsedError(**error_data)
-    session.add(parsed_error)
-    await session.commit()
-    await session.refresh(parsed_error)
+    await save(
+        session,
+        parsed_error,
+        lambda s: record_parsed_error_rollup(
+            s, error_data["language"], error_data["confidence_score"]
+        ),
+    )
     return parsed_error
 
 
 async def create_analysis(session: AsyncSession, analysis_data: dict) -> Analysis:
-    """Create a new analysis in the database"""
+    """
+    Create a new analysis in the database
+
+    Pass `parsed_error` (the ParsedError object) instead of
+    `parsed_error_id` when both are written in the same unit of work.
+    """
     analysis = Analysis(**analysis_data)
-    session.add(analysis)
-    await session.commit()
-    await session.refresh(analysis)
+    await save(
+        session,
+        analysis,
+        lambda s: record_analysis_rollup(s, analysis_data.get("analysis_time")),
+    )
     return analysis
+
+
+async def record_analysis_timing(
+    session: AsyncSession, analysis_id: int, analysis_time: int, stage_timings: dict
+):
+    """
+    Store the total and per-stage times of an analysis.
+
+    /analyze only knows these once the response is serialized, after the
+    row is written, so they are added afterwards. Only the first call for
+    an analysis counts towards the average-time rollup.
+    """
+    result = await session.execute(
+        update(Analysis)
+        .where(Analysis.id == analysis_id, Analysis.analysis_time.is_(None))
+        .values(analysis_time=analysis_time, stage_timings=stage_timings)
+    )
+    if result.rowcount:
+        await record_analysis_time_rollup(session, analysis_time)
+    await session.commit()
+
+
+# The fingerprint is md5 of the raw log, the same digest CacheService keys analyses by
+FREQUENT_ERRORS_SQL = text(
+    """
+    WITH recent AS (
+        SELECT id, md5(raw_error_log) AS fingerprint
+        FROM parsed_errors
+        WHERE created_at >= :since
+    ),
+    top AS (
+        SELECT fingerprint, count(*) AS occurrences
+        FROM recent
+        GROUP BY fingerprint
+        ORDER BY occurrences DESC
+        LIMIT :limit
+    )
+    SELECT DISTINCT ON (top.fingerprint)
+        top.fingerprint,
+        top.occurrences,
+        pe.error_type,
+        pe.error_message,
+        pe.language,
+        pe.file_name,
+        pe.line_number,
+        a.id AS analysis_id,
+        a.root_cause,
+        a.reasoning,
+        a.solutions,
+        a.sources_used,
+        a.cache_namespace
+    FROM top
+    JOIN recent ON recent.fingerprint = top.fingerprint
+    JOIN parsed_errors pe ON pe.id = recent.id
+    JOIN analyses a ON a.parsed_error_id = recent.id
+    -- an analysis users reported as not working isn't put back in the cache
+    WHERE NOT EXISTS (
+        SELECT 1 FROM feedback f WHERE f.analysis_id = a.id AND NOT f.worked
+    )
+    ORDER BY top.fingerprint, a.id DESC
+"""
+)
+
+
+async def get_frequent_errors(session: AsyncSession, hours: int = 24, limit: int = 100) -> list:
+    """
+    The `limit` most frequent error logs of the last `hours`, each with its
+    latest analysis that has no negative feedback, most frequent first.
+    Logs without such an analysis are left out.
+    """
+    since = datetime.utcnow() - timedelta(hours=hours)
+    result = await session.execute(FREQUENT_ERRORS_SQL, {"since": since, "limit": limit})
+    return sorted(result.all(), key=lambda row: row.occurrences, reverse=True)
@@ -1,10 +1,10 @@
 from app.db import Base, Feedback
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.unit_of_work import save
+from app.db.crud.analytics_crud import record_feedback_rollup
 
 
 async def create_feedback(feedback_request, session):
     feedback = Feedback(**feedback_request.model_dump())
-    session.add(feedback)
-    await session.commit()
-    await session.refresh(feedback)
+    await save(session, feedback, lambda s: record_feedback_rollup(s, feedback.worked))
     return feedback
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Job
+
+
+async def create_job(session: AsyncSession, kind: str, params: dict) -> Job:
+    """Queue a new job"""
+    job = Job(kind=kind, params=params, status="queued", progress={})
+    session.add(job)
+    await session.commit()
+    await session.refresh(job)
+    return job
+
+
+async def get_active_job(session: AsyncSession, kind: str) -> Optional[Job]:
+    """The oldest queued or running job of a kind, if any"""
+    result = await session.execute(
+        select(Job)
+        .where(Job.kind == kind, Job.status.in_(("queued", "running")))
+        .order_by(Job.id)
+        .limit(1)
+    )
+    return result.scalar()
+
+
+async def get_job(session: AsyncSession, job_id: int) -> Optional[Job]:
+    """Get a job by id"""
+    return await session.get(Job, job_id)
+
+
+async def list_jobs(session: AsyncSession, limit: int = 20) -> list:
+    """Get the most recent jobs"""
+    result = await session.execute(select(Job).order_by(Job.id.desc()).limit(limit))
+    return result.scalars().all()
+
+
+async def claim_next_job(session: AsyncSession, stale_after_seconds: int) -> Optional[Job]:
+    """
+    Atomically claim the oldest runnable job: a queued one, or a running one
+    whose worker stopped sending heartbeats (it was interrupted).
+
+    FOR UPDATE SKIP LOCKED lets several workers/processes poll the same
+    table without claiming the same job twice.
+    """
+    stale_before = datetime.utcnow() - timedelta(seconds=stale_after_seconds)
+    result = await session.execute(
+        select(Job)
+        .where(
+            or_(
+                Job.status == "queued",
+                (Job.status == "running") & (Job.heartbeat_at < stale_before),
+            )
+        )
+        .order_by(Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job = result.scalar()
+    if job is None:
+        return None
+
+    now = datetime.utcnow()
+    job.status = "running"
+    job.attempts += 1
+    job.started_at = job.started_at or now
+    job.heartbeat_at = now
+    await session.commit()
+    return job
+
+
+async def update_job(session: AsyncSession, job_id: int, **fields):
+    """Update job fields; every update also refreshes the heartbeat"""
+    await session.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .values(heartbeat_at=datetime.utcnow(), **fields)
+    )
+    await session.commit()
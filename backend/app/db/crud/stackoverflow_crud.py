@@ -1,6 +1,8 @@
+from typing import AsyncIterator, Dict, List, Set
 from app.db import StackOverFlowPost, get_session
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, exists
+from sqlalchemy import select, exists, any_, bindparam, func, text, Integer
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 
 
 async def post_exists(session: AsyncSession, question_id: int) -> bool:
@@ -10,6 +12,20 @@ async def post_exists(session: AsyncSession, question_id: int) -> bool:
     return result.scalar()
 
 
+async def existing_question_ids(session: AsyncSession, question_ids: List[int]) -> Set[int]:
+    """Return which of the given question ids are already stored, in one query"""
+    if not question_ids:
+        return set()
+
+    # Binds the whole list as one array parameter: WHERE question_id = ANY(:ids)
+    ids = bindparam("ids", value=list(question_ids), type_=ARRAY(Integer))
+    stmt = select(StackOverFlowPost.question_id).where(
+        StackOverFlowPost.question_id == any_(ids)
+    )
+    result = await session.execute(stmt)
+    return set(result.scalars().all())
+
+
 async def create_post(session: AsyncSession, post_data: dict) -> StackOverFlowPost:
     """Create a new Stack Overflow post in the database"""
     post = StackOverFlowPost(**post_data)
@@ -18,8 +34,101 @@ async def create_post(session: AsyncSession, post_data: dict) -> StackOverFlowPo
     await session.refresh(post)
     return post
 
+
+async def bulk_create_posts(session: AsyncSession, posts: List[dict]) -> Dict[str, int]:
+    """
+    Insert many posts in one statement, skipping question ids that already exist
+    (INSERT ... ON CONFLICT (question_id) DO NOTHING).
+
+    Returns {"inserted": n, "skipped": m}.
+    """
+    if not posts:
+        return {"inserted": 0, "skipped": 0}
+
+    stmt = (
+        insert(StackOverFlowPost)
+        .values(posts)
+        .on_conflict_do_nothing(index_elements=[StackOverFlowPost.question_id])
+        .returning(StackOverFlowPost.question_id)
+    )
+    result = await session.execute(stmt)
+    inserted = len(result.fetchall())
+    await session.commit()
+
+    return {"inserted": inserted, "skipped": len(posts) - inserted}
+
+
 async def get_all_posts(session: AsyncSession):
     """Get all Stack Overflow posts from the database"""
     stmt = select(StackOverFlowPost)
     result = await session.execute(stmt)
-    return result.scalars().all() 
\ No newline at end of file
+    return result.scalars().all()
+
+
+async def count_posts(session: AsyncSession) -> int:
+    """Get the number of Stack Overflow posts in the knowledge base"""
+    result = await session.execute(select(func.count(StackOverFlowPost.id)))
+    return result.scalar() or 0
+
+
+# md5 of everything the embedding text is built from; stored on each
+# embeddings row so unchanged posts can be skipped on the next run
+POST_CONTENT_HASH_SQL = """
+    md5(concat_ws(chr(31), coalesce(p.title, ''), coalesce(p.question_body, ''), coalesce(p.answer_body, '')))
+"""
+
+
+async def iter_posts_to_embed(
+    session: AsyncSession,
+    embedding_model: str,
+    after_question_id: int = 0,
+    page_size: int = 500,
+) -> AsyncIterator:
+    """
+    Stream posts whose embedding is missing, stale (content changed) or was
+    built with a different embedding model, ordered by question_id.
+
+    Uses keyset pagination (question_id > last seen, LIMIT page_size) rather
+    than loading every post, so memory stays bounded by one page whatever the
+    corpus size. Unlike a server-side cursor this also works through the
+    Supabase transaction pooler. Only the columns the embedding pipeline
+    needs are selected, plus the post's current content_hash.
+    """
+    query = text(
+        f"""
+        SELECT
+            p.question_id, p.title, p.question_body, p.answer_body, p.tags, p.votes, p.url,
+            {POST_CONTENT_HASH_SQL} AS content_hash
+        FROM stackoverflow_posts p
+        -- chunk 0 is written last for each post, so it marks a complete post
+        LEFT JOIN embeddings e ON e.id = 'so_' || p.question_id || '#0'
+        WHERE p.question_id > :after_question_id
+          AND (
+            e.id IS NULL
+            OR e.content_hash IS DISTINCT FROM {POST_CONTENT_HASH_SQL}
+            OR e.embedding_model IS DISTINCT FROM :embedding_model
+          )
+        ORDER BY p.question_id
+        LIMIT :page_size
+    """
+    )
+
+    while True:
+        result = await session.execute(
+            query,
+            {
+                "after_question_id": after_question_id,
+                "embedding_model": embedding_model,
+                "page_size": page_size,
+            },
+        )
+        rows = result.fetchall()
+        if not rows:
+            return
+
+        for row in rows:
+            yield row
+
+        after_question_id = rows[-1].question_id
+        if len(rows) < page_size:
+            return
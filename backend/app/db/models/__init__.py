@@ -1,4 +1,18 @@
 from .error import ParsedError, Feedback, Analysis, CostTracking
 from .stackoverflow import StackOverFlowPost
+from .pipeline import PipelineCheckpoint
+from .job import Job
+from .analytics import AnalyticsCounter, LanguageRollup, CostRollupHourly
 
-__all__ = ["ParsedError", "StackOverFlowPost", "Feedback", "Analysis", "CostTracking"]
+__all__ = [
+    "ParsedError",
+    "StackOverFlowPost",
+    "Feedback",
+    "Analysis",
+    "CostTracking",
+    "PipelineCheckpoint",
+    "Job",
+    "AnalyticsCounter",
+    "LanguageRollup",
+    "CostRollupHourly",
+]
@@ -0,0 +1,64 @@
+from app.db.base import Base
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, BigInteger, Float, DateTime
+from datetime import datetime
+
+
+class AnalyticsCounter(Base):
+    """
+    Running totals for the analytics dashboard, bumped in the same
+    transaction as the row they count so they never drift
+    """
+
+    __tablename__ = "analytics_counters"
+
+    # e.g. 'parsed_errors', 'analyses', 'analysis_time_ms', 'feedback', 'feedback_worked'
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    value: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<AnalyticsCounter(name={self.name}, value={self.value})>"
+
+
+class LanguageRollup(Base):
+    """Per-language parsed error count with a running confidence average"""
+
+    __tablename__ = "language_rollups"
+
+    # '' for errors whose language wasn't detected
+    language: Mapped[str] = mapped_column(String, primary_key=True)
+    error_count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    # AVG(confidence_score) = confidence_sum / confidence_count (NULL scores are skipped)
+    confidence_sum: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    confidence_count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<LanguageRollup(language={self.language}, errors={self.error_count})>"
+
+
+class CostRollupHourly(Base):
+    """
+    cost_tracking summed per hour, operation, model and routing tier.
+    Bumped with every cost record, so raw rows can be deleted after
+    COST_RAW_RETENTION_DAYS without losing the cost history.
+    """
+
+    __tablename__ = "cost_rollups_hourly"
+
+    hour: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    operation: Mapped[str] = mapped_column(String, primary_key=True)
+    model: Mapped[str] = mapped_column(String, primary_key=True)
+    # '' when the record has no routing tier (embeddings, unrouted analyses)
+    route_tier: Mapped[str] = mapped_column(String, primary_key=True)
+
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    cost: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    prompt_tokens: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    completion_tokens: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    total_tokens: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    # AVG(latency_ms) = latency_ms_sum / latency_count (records without latency are skipped)
+    latency_ms_sum: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    latency_count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CostRollupHourly(hour={self.hour}, operation={self.operation}, cost=${self.cost:.4f})>"
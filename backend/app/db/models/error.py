@@ -1,6 +1,6 @@
 from typing import Optional
 from app.db.base import Base
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy import String, Integer, JSON, Text, Boolean, Float, DateTime
 from datetime import datetime, timezone
 
@@ -40,6 +40,11 @@ class Analysis(Base):
 
     # Link to parsed error
     parsed_error_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    # write-only link (no FK in the schema): lets one flush insert the parsed
+    # error first and fill parsed_error_id in from it
+    parsed_error: Mapped[Optional[ParsedError]] = relationship(
+        primaryjoin="foreign(Analysis.parsed_error_id) == ParsedError.id", lazy="raise"
+    )
 
     # Analysis results
     root_cause: Mapped[str] = mapped_column(Text, nullable=False)
@@ -49,6 +54,10 @@ class Analysis(Base):
     # Metadata
     sources_used: Mapped[int] = mapped_column(Integer, nullable=True)
     analysis_time: Mapped[int] = mapped_column(Integer, nullable=True)  # milliseconds
+    # milliseconds per pipeline stage, e.g. {"cache": 1.2, "embedding": 180.4, "llm": 4210.0}
+    stage_timings: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    # cache namespace (models, prompt, knowledge-base generation) it was produced under
+    cache_namespace: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
 
     def __repr__(self):
@@ -101,6 +110,13 @@ class CostTracking(Base):
     # Model used
     model: Mapped[str] = mapped_column()
 
+    # Routing tier ('fast' / 'thorough') and upstream latency, for analyses
+    route_tier: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    latency_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    # Why the router chose the tier, and the signals it compared
+    route_reason: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    route_signals: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+
     # Metadata
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
@@ -0,0 +1,37 @@
+from typing import Optional
+from app.db.base import Base
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, Integer, JSON, Text, DateTime
+from datetime import datetime
+
+
+class Job(Base):
+    """A long-running operation (scrape, embedding run) executed by the job runner"""
+
+    __tablename__ = "jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+
+    # What to run: 'scrape', 'scrape_batch', 'embeddings'
+    kind: Mapped[str] = mapped_column(String, nullable=False)
+    params: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+
+    # 'queued' -> 'running' -> 'succeeded' / 'failed'
+    status: Mapped[str] = mapped_column(String, nullable=False, default="queued", index=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # Progress counters (e.g. posts_added, embedded), the state needed to resume
+    # after an interruption, the final result and the last error
+    progress: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+    checkpoint: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    result: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    # Timestamps; heartbeat_at shows a running job's worker is still alive
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<Job(id={self.id}, kind={self.kind}, status={self.status})>"
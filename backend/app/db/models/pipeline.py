@@ -0,0 +1,21 @@
+from app.db.base import Base
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, JSON, DateTime
+from datetime import datetime
+
+
+class PipelineCheckpoint(Base):
+    """Resumable progress marker for long-running data pipelines"""
+
+    __tablename__ = "pipeline_checkpoints"
+
+    # Pipeline name, e.g. 'create_embeddings'
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    # Pipeline-specific state, e.g. {"model": ..., "last_question_id": ...}
+    value: Mapped[dict] = mapped_column(JSON, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    def __repr__(self):
+        return f"<PipelineCheckpoint(name={self.name}, value={self.value})>"
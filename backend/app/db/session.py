@@ -1,9 +1,14 @@
+import os
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from app.core import config
 from app.db import Base
+from app.db.unit_of_work import UnitOfWork
 
 DB_URL = config.DATABASE_URL
-engine = create_async_engine(DB_URL, echo=True)
+# Statement logging; turn off when measuring performance (it dominates CPU)
+SQL_ECHO = os.getenv("SQL_ECHO", "true").lower() == "true"
+engine = create_async_engine(DB_URL, echo=SQL_ECHO)
 
 sessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
@@ -14,8 +19,48 @@ async def get_session() -> AsyncSession:
         yield session
 
 
+# Dependency for routes whose writes should go out in one transaction
+async def get_unit_of_work() -> UnitOfWork:
+    async with sessionLocal() as session:
+        yield UnitOfWork(session)
+
+
+# create_all only creates missing tables, so columns added to existing
+# tables are patched in here (each statement must be idempotent)
+SCHEMA_PATCHES = [
+    "ALTER TABLE cost_tracking ADD COLUMN IF NOT EXISTS route_tier VARCHAR",
+    "ALTER TABLE cost_tracking ADD COLUMN IF NOT EXISTS latency_ms INTEGER",
+    "ALTER TABLE cost_tracking ADD COLUMN IF NOT EXISTS route_reason TEXT",
+    "ALTER TABLE cost_tracking ADD COLUMN IF NOT EXISTS route_signals JSON",
+    # retention compaction deletes raw cost rows by age
+    "CREATE INDEX IF NOT EXISTS cost_tracking_created_at_idx ON cost_tracking (created_at)",
+    # per-stage /analyze timings, and the time-window index latency analytics use
+    "ALTER TABLE analyses ADD COLUMN IF NOT EXISTS stage_timings JSON",
+    "CREATE INDEX IF NOT EXISTS analyses_created_at_idx ON analyses (created_at)",
+    # cache warm-up: recent errors by frequency, and their analyses
+    "CREATE INDEX IF NOT EXISTS parsed_errors_created_at_idx ON parsed_errors (created_at)",
+    "CREATE INDEX IF NOT EXISTS analyses_parsed_error_id_idx ON analyses (parsed_error_id)",
+    "ALTER TABLE analyses ADD COLUMN IF NOT EXISTS cache_namespace VARCHAR",
+    "CREATE INDEX IF NOT EXISTS feedback_analysis_id_idx ON feedback (analysis_id)",
+    # embeddings is managed outside the ORM (pgvector); track what each row was built from
+    "ALTER TABLE IF EXISTS embeddings ADD COLUMN IF NOT EXISTS content_hash TEXT",
+    "ALTER TABLE IF EXISTS embeddings ADD COLUMN IF NOT EXISTS embedding_model TEXT",
+    # long posts are stored as several chunk rows that share a parent_id
+    "ALTER TABLE IF EXISTS embeddings ADD COLUMN IF NOT EXISTS parent_id TEXT",
+    """
+    DO $$ BEGIN
+        IF to_regclass('embeddings') IS NOT NULL THEN
+            CREATE INDEX IF NOT EXISTS embeddings_parent_id_idx ON embeddings (parent_id);
+        END IF;
+    END $$
+    """,
+]
+
+
 # need to shift to main.py later
 # create tables on startup if not exist
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        for statement in SCHEMA_PATCHES:
+            await conn.execute(text(statement))
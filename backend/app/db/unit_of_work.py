@@ -0,0 +1,94 @@
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.pool import Pool
+
+_KEY = "unit_of_work"
+
+# A statement run against the session at commit time, after the flush (e.g. a rollup upsert)
+Write = Callable[[AsyncSession], Awaitable]
+
+
+class UnitOfWork:
+    """
+    One session and one transaction for everything a request writes.
+
+    CRUD functions given `uow.session` queue their objects and rollup
+    updates here instead of committing (see `save`). `commit()` adds them
+    all, flushes once, runs the queued updates and commits, so SQLAlchemy
+    orders the INSERTs and fills foreign keys in from relationships, and no
+    refresh SELECTs are needed. Reads go through the same session;
+    `release()` hands its connection back to the pool in between, so it
+    isn't held while the request waits on the LLM.
+
+    `queries` counts every statement sent on the session's connections.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.queries = 0
+        self._objects: List = []
+        self._writes: List[Write] = []
+        session.info[_KEY] = self
+        event.listen(session.sync_session, "after_begin", self._tag_connection)
+
+    @classmethod
+    def of(cls, session: AsyncSession) -> Optional["UnitOfWork"]:
+        return session.info.get(_KEY)
+
+    def add(self, obj, *writes: Write):
+        self._objects.append(obj)
+        self._writes.extend(writes)
+
+    def merge(self, other: "UnitOfWork"):
+        """Take over the writes queued on another unit of work (e.g. the LLM call's)"""
+        self._objects.extend(other._objects)
+        self._writes.extend(other._writes)
+        other._objects, other._writes = [], []
+
+    async def release(self):
+        """End the read-only transaction so the connection goes back to the pool"""
+        if self.session.in_transaction():
+            await self.session.rollback()
+
+    async def commit(self):
+        if self._objects or self._writes:
+            self.session.add_all(self._objects)
+            await self.session.flush()
+            for write in self._writes:
+                await write(self.session)
+            self._objects, self._writes = [], []
+        await self.session.commit()
+
+    def _tag_connection(self, session, transaction, connection):
+        connection.info[_KEY] = self
+
+
+async def save(session: AsyncSession, obj, *writes: Write):
+    """
+    Add `obj` and run `writes` in the caller's transaction, then commit;
+    within a unit of work both are queued for its single commit instead.
+    """
+    uow = UnitOfWork.of(session)
+    if uow is not None:
+        uow.add(obj, *writes)
+        return
+    session.add(obj)
+    for write in writes:
+        await write(session)
+    await session.commit()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    uow = conn.info.get(_KEY)
+    if uow is not None:
+        uow.queries += 1
+
+
+@event.listens_for(Pool, "checkin")
+def _untag_connection(dbapi_connection, connection_record):
+    if connection_record is not None:
+        connection_record.info.pop(_KEY, None)
@@ -3,15 +3,22 @@ import os
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
-from app.db import init_db
+from app.db import init_db, sessionLocal
+from app.db.session import engine
+from app.db.crud import seed_analytics_rollups, seed_cost_rollups
 from app.api import api_router
+from app.services.job_runner import job_runner
+from app.services.job_handlers import register_job_handlers
+from app.services.cache_warmup import queue_startup_warmup
+from app.services.metrics import DB_POOL_CONNECTIONS, MetricsMiddleware, metrics
 
 # Load environment variables
 load_dotenv()
 
 # Configure logging for the entire application
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 
 app = FastAPI(title="DebugAI API", version="1.0.0")
 
@@ -30,8 +37,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # let the frontend read per-stage /analyze timings, query counts and cache status
+    expose_headers=["Server-Timing", "X-DB-Queries", "X-Cache"],
 )
 
+# Outermost, so the latency it records includes the other middleware
+app.add_middleware(MetricsMiddleware)
+
 # Include API routes
 app.include_router(api_router)
 
@@ -40,6 +52,22 @@ app.include_router(api_router)
 @app.on_event("startup")
 async def on_startup():
     await init_db()
+    # first start after the rollup tables were added: count existing rows once
+    async with sessionLocal() as session:
+        await seed_analytics_rollups(session)
+        await seed_cost_rollups(session)
+    # handlers are needed to queue jobs; workers only start if JOB_WORKERS is set
+    register_job_handlers(job_runner)
+    job_runner.start()
+    # refill a cold cache from stored analyses before common errors reach the LLM
+    async with sessionLocal() as session:
+        await queue_startup_warmup(session)
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # interrupted jobs are resumed from their checkpoint by the next worker
+    await job_runner.stop()
 
 
 @app.get("/")
@@ -47,6 +75,23 @@ async def root():
     return {"message": "Welcome to DebugAI API with Supabase"}
 
 
+def _collect_pool_metrics():
+    pool = engine.sync_engine.pool
+    DB_POOL_CONNECTIONS.labels("checked_out").set(pool.checkedout())
+    DB_POOL_CONNECTIONS.labels("idle").set(pool.checkedin())
+    DB_POOL_CONNECTIONS.labels("overflow").set(max(pool.overflow(), 0))
+    DB_POOL_CONNECTIONS.labels("size").set(pool.size())
+
+
+metrics.add_collector(_collect_pool_metrics)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus scrape target"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint for monitoring and load balancers"""
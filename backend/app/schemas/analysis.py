@@ -27,3 +27,7 @@ class AnalysisResponse(BaseModel):
     sources_used: int
     analysis_id: Optional[int] = None
     analysis_time_ms: Optional[int] = None
+
+    # Set when the LLM was skipped and solutions are raw knowledge-base matches
+    degraded: bool = False
+    degraded_reason: Optional[str] = None
@@ -1,5 +1,4 @@
 from pydantic import BaseModel, Field
-from typing import Optional
 
 
 class ScrapeRequest(BaseModel):
@@ -14,10 +13,3 @@ class ScrapeRequest(BaseModel):
     class Config:
         json_schema_extra = {"example": {"tag": "python", "limit": 500}}
 
-
-class ScrapeResponse(BaseModel):
-    status: str
-    message: str
-    tag: str
-    posts_scraped: Optional[int] = None
-    error: Optional[str] = None
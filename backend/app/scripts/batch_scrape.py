@@ -1,12 +1,34 @@
 import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional
+import httpx
 from app.scripts.scrape_stackoverflow import scrape_stackoverflow
+from app.services.quota_governor import QuotaGovernor
 import asyncio
 
+# Tags scraped at the same time; their API calls share one QuotaGovernor
+SCRAPE_TAG_CONCURRENCY = int(os.getenv("SCRAPE_TAG_CONCURRENCY", 3))
 
-async def scrape_all_tags():
+
+async def scrape_all_tags(
+    completed: Optional[Dict[str, int]] = None,
+    on_tag_done: Optional[Callable[[str, int], Awaitable]] = None,
+    concurrency: int = SCRAPE_TAG_CONCURRENCY,
+):
     """
     Scrape multiple tags to build comprehensive knowledge base
+
+    Tags run concurrently (up to `concurrency` at once) over one HTTP
+    connection pool. A shared QuotaGovernor caps the total request rate,
+    applies `backoff` to every task and stops them all when the daily
+    quota runs out.
+
+    `completed` maps tags finished by an earlier, interrupted run to the
+    posts they added; those tags are skipped. `on_tag_done(tag, posts_added)`
+    is awaited after each tag.
     """
+    completed = dict(completed or {})
     tags_to_scrape = [
         ("python", 500),
         ("javascript", 500),
@@ -17,25 +39,89 @@ async def scrape_all_tags():
         ("fastapi", 100),
     ]
 
-    total_scraped = 0
     total_target = sum(limit for _, limit in tags_to_scrape)
+    tags = {
+        tag: {"posts_added": posts_added, "resumed": True}
+        for tag, posts_added in completed.items()
+    }
+
+    logging.info(
+        f"Starting batch scrape: {len(tags_to_scrape)} tags, target: {total_target} posts, "
+        f"{concurrency} at a time"
+    )
+
+    governor = QuotaGovernor.from_env()
+    semaphore = asyncio.Semaphore(concurrency)
+    start_time = time.time()
+
+    async def scrape_tag(client, tag, limit):
+        async with semaphore:
+            if governor.exhausted:
+                tags[tag] = {"posts_added": 0, "error": "quota exhausted"}
+                return
+            # pages are committed as they go, so a failed tag still keeps its count
+            progress = {"posts_added": 0, "posts_skipped": 0}
 
-    logging.info(f"Starting batch scrape: {len(tags_to_scrape)} tags, target: {total_target} posts")
+            async def on_page(page, stats):
+                progress.update(
+                    posts_added=stats["posts_added"], posts_skipped=stats["posts_skipped"]
+                )
 
-    for tag, limit in tags_to_scrape:
-        try:
-            logging.info(f"Scraping {tag}: {limit} posts")
-            await scrape_stackoverflow(tag, limit)
-            total_scraped += limit
-            # Wait between tags to be polite to API
-            await asyncio.sleep(2)
-        except Exception as e:
-            logging.error(f"Error scraping {tag}: {e}")
-            continue
+            try:
+                logging.info(f"Scraping {tag}: {limit} posts")
+                stats = await scrape_stackoverflow(
+                    tag, limit, client=client, governor=governor, on_page=on_page
+                )
+            except Exception as e:
+                logging.error(f"Error scraping {tag}: {e}")
+                tags[tag] = {**progress, "target": limit, "error": str(e)}
+                return
 
-    logging.info(f"Batch scrape complete: {total_scraped}/{total_target} posts")
+            tags[tag] = {
+                "posts_added": stats["posts_added"],
+                "posts_skipped": stats["posts_skipped"],
+                "target": limit,
+                "requests": stats["requests"],
+                "elapsed_seconds": stats["elapsed_seconds"],
+            }
+            completed[tag] = stats["posts_added"]
+            if on_tag_done:
+                await on_tag_done(tag, stats["posts_added"])
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        await asyncio.gather(
+            *(
+                scrape_tag(client, tag, limit)
+                for tag, limit in tags_to_scrape
+                if tag not in completed
+            )
+        )
+
+    total_scraped = sum(result["posts_added"] for result in tags.values())
+    elapsed = round(time.time() - start_time, 2)
+    logging.info(
+        f"Batch scrape complete: {total_scraped}/{total_target} posts in {elapsed}s "
+        f"({governor.requests} API requests, quota remaining: {governor.quota_remaining})"
+    )
     return {
         "total_scraped": total_scraped,
         "total_target": total_target,
-        "tags_count": len(tags_to_scrape)
+        "tags_count": len(tags_to_scrape),
+        "tags": tags,
+        "elapsed_seconds": elapsed,
+        **governor.get_stats(),
     }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(message)s")
+
+    parser = argparse.ArgumentParser(description="Scrape the default set of Stack Overflow tags")
+    parser.add_argument(
+        "--concurrency", type=int, default=SCRAPE_TAG_CONCURRENCY, help="Tags scraped at once"
+    )
+    args = parser.parse_args()
+
+    asyncio.run(scrape_all_tags(concurrency=args.concurrency))
@@ -0,0 +1,135 @@
+"""
+Compare the dashboard query strategies on a populated database:
+
+    legacy   six sequential COUNT/AVG/GROUP BY round trips (the old overview)
+    single   the same figures from the base tables in one CTE/FILTER statement
+    rollups  one statement over the rollup tables (what the endpoint serves)
+
+    python -m app.scripts.bench_analytics --seed 200000   # local DB only
+    python -m app.scripts.bench_analytics --runs 50
+"""
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import time
+
+from sqlalchemy import insert
+
+from app.db import get_session, init_db, ParsedError, Feedback
+from app.db.models import Analysis
+from app.db.crud import (
+    get_total_analyses,
+    get_total_errors,
+    get_errors_by_language,
+    get_avg_analysis_time,
+    get_total_feedback,
+    get_successful_feedback,
+    get_analytics_rollups,
+    get_overview_from_tables,
+    rebuild_analytics_rollups,
+)
+
+
+async def seed(count: int):
+    """Insert `count` parsed errors, analyses and feedback rows, then rebuild the rollups"""
+    languages = ["python", "javascript", "typescript", None]
+    async for session in get_session():
+        for start in range(0, count, 5000):
+            size = min(5000, count - start)
+            errors = await session.execute(
+                insert(ParsedError).returning(ParsedError.id),
+                [
+                    {
+                        "raw_error_log": "Traceback ...",
+                        "error_type": "KeyError",
+                        "error_message": "'x'",
+                        "language": random.choice(languages),
+                        "confidence_score": random.choice([None, 40, 70, 90]),
+                    }
+                    for _ in range(size)
+                ],
+            )
+            error_ids = errors.scalars().all()
+            analyses = await session.execute(
+                insert(Analysis).returning(Analysis.id),
+                [
+                    {
+                        "parsed_error_id": error_id,
+                        "root_cause": "missing key",
+                        "reasoning": "benchmark",
+                        "solutions": [],
+                        "analysis_time": random.randint(500, 9000),
+                    }
+                    for error_id in error_ids
+                ],
+            )
+            await session.execute(
+                insert(Feedback),
+                [
+                    {
+                        "analysis_id": analysis_id,
+                        "solution_index": random.choice([0, 1, 2, None]),
+                        "worked": random.random() < 0.6,
+                    }
+                    for analysis_id in analyses.scalars().all()
+                    if random.random() < 0.3
+                ],
+            )
+            await session.commit()
+            logging.info(f"Seeded {start + size}/{count} rows")
+        await rebuild_analytics_rollups(session)
+
+
+async def legacy(session):
+    await get_total_analyses(session)
+    await get_total_errors(session)
+    await get_errors_by_language(session)
+    await get_avg_analysis_time(session)
+    await get_total_feedback(session)
+    await get_successful_feedback(session)
+
+
+async def single(session):
+    await get_overview_from_tables(session)
+
+
+async def rollups(session):
+    await get_analytics_rollups(session)
+
+
+async def run(runs: int):
+    async for session in get_session():
+        for name, strategy in (("legacy", legacy), ("single", single), ("rollups", rollups)):
+            await strategy(session)  # warm up
+            timings = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                await strategy(session)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            print(
+                f"{name:8} mean={statistics.mean(timings):.2f}ms "
+                f"p50={statistics.median(timings):.2f}ms "
+                f"p95={timings[int(len(timings) * 0.95) - 1]:.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(message)s")
+
+    parser = argparse.ArgumentParser(description="Benchmark analytics dashboard queries")
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Insert N synthetic rows first (local DB only)"
+    )
+    parser.add_argument("--runs", type=int, default=30, help="Timed runs per strategy")
+    args = parser.parse_args()
+
+    async def main():
+        if args.seed:
+            await init_db()
+            await seed(args.seed)
+        await run(args.runs)
+
+    asyncio.run(main())
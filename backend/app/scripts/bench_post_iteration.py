@@ -0,0 +1,98 @@
+"""
+Compare peak memory of loading every post at once (get_all_posts) with
+streaming only the embedding columns (iter_posts_to_embed).
+
+ru_maxrss is a per-process high-water mark, so run each mode in its own
+process against the same corpus:
+
+    python -m app.scripts.bench_post_iteration --seed 20000   # local DB only
+    python -m app.scripts.bench_post_iteration --mode all
+    python -m app.scripts.bench_post_iteration --mode stream
+"""
+import argparse
+import asyncio
+import logging
+import random
+import resource
+import time
+from datetime import datetime
+
+from app.db import get_session, init_db
+from app.db.crud import bulk_create_posts, get_all_posts, iter_posts_to_embed
+
+# Embedding model name no row has, so every post counts as needing embedding
+BENCHMARK_MODEL = "__benchmark__"
+
+
+def _peak_rss_mb() -> float:
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+async def seed_corpus(count: int, body_chars: int = 4000):
+    """Insert `count` synthetic posts with realistic HTML body sizes"""
+    words = ["error", "import", "module", "undefined", "async", "await", "list", "dict"]
+
+    def body():
+        text = " ".join(random.choice(words) for _ in range(body_chars // 7))
+        return f"<p>{text}</p><pre><code>{text[:500]}</code></pre>"
+
+    async for session in get_session():
+        for start in range(0, count, 500):
+            posts = [
+                {
+                    "question_id": 10_000_000 + i,
+                    "title": f"Benchmark question {i}",
+                    "question_body": body(),
+                    "answer_body": body(),
+                    "tags": ["python", "benchmark"],
+                    "votes": i % 100,
+                    "url": f"https://stackoverflow.com/q/{10_000_000 + i}",
+                    "created_at": datetime.utcnow(),
+                }
+                for i in range(start, min(start + 500, count))
+            ]
+            result = await bulk_create_posts(session, posts)
+            logging.info(f"Seeded {start + result['inserted']}/{count} posts")
+
+
+async def run(mode: str):
+    baseline = _peak_rss_mb()
+    start = time.time()
+    rows = 0
+
+    async for session in get_session():
+        if mode == "all":
+            posts = await get_all_posts(session)
+            for post in posts:
+                rows += 1
+        else:
+            async for post in iter_posts_to_embed(session, BENCHMARK_MODEL):
+                rows += 1
+
+    elapsed = time.time() - start
+    peak = _peak_rss_mb()
+    print(
+        f"mode={mode} rows={rows} elapsed={elapsed:.2f}s "
+        f"rows/s={rows / max(elapsed, 0.001):.0f} "
+        f"peak_rss={peak}MB (+{peak - baseline:.1f}MB over startup)"
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(message)s")
+
+    parser = argparse.ArgumentParser(description="Benchmark post iteration memory")
+    parser.add_argument("--mode", choices=["all", "stream"], default="stream")
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Insert N synthetic posts first (local DB only)"
+    )
+    args = parser.parse_args()
+
+    async def main():
+        if args.seed:
+            await init_db()
+            await seed_corpus(args.seed)
+        else:
+            await run(args.mode)
+
+    asyncio.run(main())
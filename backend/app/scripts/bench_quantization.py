@@ -0,0 +1,92 @@
+"""
+Compare quantized vector indexes with full-precision search.
+
+For each mode this builds its index if needed, then reports the index size,
+query latency and recall@k against exact (sequential scan) results. Stored
+chunk embeddings are used as queries, so no embedding API calls are made:
+
+    python -m app.scripts.bench_quantization --queries 100 --k 5
+    python -m app.scripts.bench_quantization --modes halfvec binary
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.db import get_session
+from app.services.supabase_vector_store import QUANTIZATION_MODES, SupabaseVectorStore
+
+
+async def _relation_mb(session, name: str) -> float:
+    result = await session.execute(
+        text("SELECT coalesce(pg_total_relation_size(to_regclass(:name)), 0)"), {"name": name}
+    )
+    return round(result.scalar() / 1024 / 1024, 1)
+
+
+async def _timed_search(vs, session, embedding, k, mode):
+    start = time.perf_counter()
+    rows = await vs.search_by_embedding(session, embedding, k, quantization=mode)
+    return (time.perf_counter() - start) * 1000, [row.id for row in rows]
+
+
+async def run(modes, queries: int, k: int):
+    vs = SupabaseVectorStore()
+
+    async for session in get_session():
+        result = await session.execute(
+            text(
+                f"SELECT {vs.column}::text FROM embeddings WHERE {vs.column} IS NOT NULL "
+                "ORDER BY random() LIMIT :n"
+            ),
+            {"n": queries},
+        )
+        samples = [row[0] for row in result]
+
+        # ground truth: exact distances without any index
+        await session.execute(text("SET enable_indexscan = off"))
+        exact = []
+        for embedding in samples:
+            _, ids = await _timed_search(vs, session, embedding, k, "none")
+            exact.append(set(ids))
+        await session.execute(text("SET enable_indexscan = on"))
+
+        print(f"table embeddings: {await _relation_mb(session, 'embeddings')} MB, {len(samples)} queries, k={k}")
+        for mode in modes:
+            if mode in QUANTIZATION_MODES:
+                logging.info(f"Ensuring {mode} index exists (first build can take a while)")
+                await vs.create_quantized_index(session, mode)
+                index_mb = await _relation_mb(session, vs.quantized_index_name(mode))
+            else:
+                index_mb = await _relation_mb(session, "embeddings_embedding_idx")
+
+            latencies, recalls = [], []
+            for embedding, truth in zip(samples, exact):
+                ms, ids = await _timed_search(vs, session, embedding, k, mode)
+                latencies.append(ms)
+                recalls.append(len(truth & set(ids)) / max(len(truth), 1))
+
+            latencies.sort()
+            print(
+                f"mode={mode:8} index={index_mb}MB "
+                f"p50={statistics.median(latencies):.1f}ms "
+                f"p95={latencies[int(len(latencies) * 0.95) - 1]:.1f}ms "
+                f"recall@{k}={statistics.mean(recalls):.3f}"
+            )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(message)s")
+
+    parser = argparse.ArgumentParser(description="Benchmark quantized vector search")
+    parser.add_argument(
+        "--modes", nargs="*", default=["none", *QUANTIZATION_MODES], help="Modes to compare"
+    )
+    parser.add_argument("--queries", type=int, default=100, help="Number of sample queries")
+    parser.add_argument("--k", type=int, default=5, help="Results per query")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.modes, args.queries, args.k))
@@ -0,0 +1,167 @@
+"""
+Compare Redis memory per cached key as plain JSON (before the cache codec)
+and as codec bytes (after).
+
+Samples analysis:* and search:* keys from REDIS_URL, writes each value
+back in both encodings under temporary keys and reports MEMORY USAGE,
+value size and decode time per namespace:
+
+    python -m app.scripts.cache_memory_report --sample 200
+
+Without REDIS_URL (or with --offline) a synthetic analysis and search
+payload is measured instead, reporting value sizes and decode times only.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import time
+import uuid
+
+from app.services.cache_codec import CacheCodec
+
+NAMESPACES = {
+    "analysis": ("encode_analysis", "decode_analysis"),
+    "search": ("encode_search_results", "decode_search_results"),
+}
+
+
+def _sample_payloads():
+    solution = {
+        "title": "Initialise the value before use",
+        "explanation": "The attribute is only set on one branch of the constructor. " * 4,
+        "code": "def __init__(self, items=None):\n    self.items = items or []\n" * 3,
+        "confidence": 0.82,
+        "source_urls": ["https://stackoverflow.com/questions/1", "https://stackoverflow.com/q/2"],
+    }
+    analysis = {
+        "error_type": "AttributeError",
+        "error_message": "'NoneType' object has no attribute 'items'",
+        "language": "python",
+        "file_path": "app/services/orders.py",
+        "line_number": 42,
+        "root_cause": "The order lookup returns None for unknown ids and the caller doesn't check. " * 2,
+        "reasoning": "The traceback ends at the first attribute access on the lookup result. " * 5,
+        "solutions": [solution] * 3,
+        "sources_used": 3,
+        "analysis_id": 1234,
+    }
+    search = [
+        {
+            "title": "AttributeError: 'NoneType' object has no attribute",
+            "url": f"https://stackoverflow.com/questions/{n}",
+            "content": "You are calling a method on a function result that returned None. " * 12,
+            "tags": ["python", "attributeerror", "nonetype"],
+            "votes": 120 - n,
+            "distance": 0.31 + n / 100,
+        }
+        for n in range(3)
+    ]
+    return {"analysis": [analysis], "search": [search]}
+
+
+def _decode_us(decode, data, repeat: int = 200) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        decode(data)
+    return (time.perf_counter() - start) / repeat * 1_000_000
+
+
+def _memory_usage(client, value: bytes) -> int:
+    key = f"cache-memory-report:{uuid.uuid4().hex}"
+    client.set(key, value, ex=60)
+    try:
+        return client.memory_usage(key, samples=0)
+    finally:
+        client.delete(key)
+
+
+def _fetch_payloads(client, codec: CacheCodec, sample: int):
+    payloads = {}
+    for namespace, (_, decode_name) in NAMESPACES.items():
+        values = []
+        for key in client.scan_iter(match=f"{namespace}:*", count=500):
+            raw = client.get(key)
+            if raw is None:
+                continue
+            try:
+                values.append(getattr(codec, decode_name)(raw))
+            except Exception as e:
+                logging.warning(f"Skipping {key!r}: {e}")
+            if len(values) >= sample:
+                break
+        payloads[namespace] = values
+    return payloads
+
+
+def report(codec: CacheCodec, payloads, client=None):
+    rows = []
+    for namespace, (encode_name, decode_name) in NAMESPACES.items():
+        values = payloads.get(namespace) or []
+        if not values:
+            continue
+        stats = {"json_bytes": [], "codec_bytes": [], "json_us": [], "codec_us": []}
+        if client is not None:
+            stats.update(json_memory=[], codec_memory=[])
+
+        for value in values:
+            before = json.dumps(value).encode()
+            after = getattr(codec, encode_name)(value)
+            stats["json_bytes"].append(len(before))
+            stats["codec_bytes"].append(len(after))
+            stats["json_us"].append(_decode_us(json.loads, before))
+            stats["codec_us"].append(_decode_us(getattr(codec, decode_name), after))
+            if client is not None:
+                stats["json_memory"].append(_memory_usage(client, before))
+                stats["codec_memory"].append(_memory_usage(client, after))
+
+        row = {"namespace": namespace, "keys": len(values)}
+        row.update({name: round(statistics.mean(series), 1) for name, series in stats.items()})
+        row["saved_pct"] = round(100 * (1 - row["codec_bytes"] / row["json_bytes"]), 1)
+        if client is not None:
+            row["saved_memory_pct"] = round(
+                100 * (1 - row["codec_memory"] / row["json_memory"]), 1
+            )
+        rows.append(row)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cache memory per key: JSON vs cache codec")
+    parser.add_argument("--sample", type=int, default=200, help="Keys sampled per namespace")
+    parser.add_argument("--offline", action="store_true", help="Measure synthetic payloads only")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    codec = CacheCodec.from_env()
+    client = None
+    if os.getenv("REDIS_URL") and not args.offline:
+        import redis
+
+        client = redis.from_url(os.getenv("REDIS_URL"), decode_responses=False)
+        payloads = _fetch_payloads(client, codec, args.sample)
+        if not any(payloads.values()):
+            logging.warning("No cached keys found - measuring synthetic payloads")
+            payloads = _sample_payloads()
+    else:
+        payloads = _sample_payloads()
+
+    rows = report(codec, payloads, client)
+    if args.json:
+        print(json.dumps({"codec": codec.describe(), "namespaces": rows}, indent=2))
+    else:
+        print(f"codec: {codec.describe()}")
+        for row in rows:
+            line = (
+                f"{row['namespace']:<9} keys={row['keys']:<5} "
+                f"value {row['json_bytes']:.0f}B -> {row['codec_bytes']:.0f}B "
+                f"({row['saved_pct']}% smaller), "
+                f"decode {row['json_us']}us -> {row['codec_us']}us"
+            )
+            if client is not None:
+                line += (
+                    f", MEMORY USAGE {row['json_memory']:.0f}B -> {row['codec_memory']:.0f}B "
+                    f"({row['saved_memory_pct']}% smaller)"
+                )
+            print(line)
@@ -0,0 +1,39 @@
+"""
+Delete raw cost_tracking rows older than the retention period. Their costs
+stay in cost_rollups_hourly, which the cost analytics read. Run it daily,
+e.g. from cron:
+
+    python -m app.scripts.compact_costs
+    python -m app.scripts.compact_costs --retention-days 30
+"""
+import argparse
+import asyncio
+import logging
+import os
+
+from app.db import get_session, init_db
+from app.db.crud import compact_cost_records, seed_cost_rollups
+
+
+async def main(retention_days: int):
+    await init_db()
+    async for session in get_session():
+        # never delete raw rows that were not counted in the rollups yet
+        await seed_cost_rollups(session)
+        deleted = await compact_cost_records(session, retention_days)
+        logging.info(f"Deleted {deleted} cost records older than {retention_days} days")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(message)s")
+
+    parser = argparse.ArgumentParser(description="Compact raw cost tracking rows")
+    parser.add_argument(
+        "--retention-days",
+        type=int,
+        default=int(os.getenv("COST_RAW_RETENTION_DAYS", 90)),
+        help="Keep raw rows this many days (default: COST_RAW_RETENTION_DAYS or 90)",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(main(args.retention_days))
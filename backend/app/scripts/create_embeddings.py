@@ -1,68 +1,241 @@
 from app.db import get_session
-from app.db.crud import get_all_posts
+from app.db.crud import (
+    count_posts,
+    iter_posts_to_embed,
+    get_checkpoint,
+    save_checkpoint,
+    clear_checkpoint,
+)
 from app.services.supabase_vector_store import SupabaseVectorStore
+from app.services.embedding_batcher import TokenBatchPacker, run_batches
+from app.services.chunker import TextChunker, clean_html
+from app.services.cost_tracker import CostTracker
+from app.services.cache import CacheService
 import logging
 import asyncio
+import os
+import resource
+import time
+from typing import Awaitable, Callable, List, Optional
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(message)s")
 
+# Name of the resumable watermark in pipeline_checkpoints
+CHECKPOINT_NAME = "create_embeddings"
 
-async def create_embeddings():
-    """Read stack over post from db and create embeddings and add to vector db"""
+cost_tracker = CostTracker()
+
+
+async def create_embeddings(
+    resume: bool = True, on_progress: Optional[Callable[[dict], Awaitable]] = None
+) -> dict:
+    """
+    Embed Stack Overflow posts that are new, changed or embedded with an
+    older model, and add them to the vector db.
+
+    Each post is cleaned of HTML and split into overlapping, token-bounded
+    chunks (question and answer separately), and every chunk gets its own
+    embeddings row linked to the post by parent_id. Search then returns the
+    chunk that matched instead of a truncated post.
+
+    Posts are streamed page by page, so memory use doesn't grow with the
+    corpus. Chunks are packed into requests by estimated token count, and
+    EMBEDDING_CONCURRENCY requests are kept in flight while earlier ones
+    are written. Progress is saved after every batch; with `resume` an
+    interrupted run continues after the last post it finished.
+
+    Returns counts of posts skipped (already up to date), embedded and
+    failed, chunks written, throughput in docs/s and tokens/s, and the
+    process's peak RSS. `on_progress(stats)` is awaited after every batch
+    is written.
+    """
 
     vs = SupabaseVectorStore()
+    packer = TokenBatchPacker.from_env()
+    chunker = TextChunker.from_env()
+    concurrency = int(os.getenv("EMBEDDING_CONCURRENCY", 4))
+    stats = {
+        "total_posts": 0,
+        "skipped": 0,
+        "embedded": 0,
+        "failed": 0,
+        "chunks": 0,
+        "batches": 0,
+        "tokens": 0,
+    }
+    start_time = time.time()
+    # posts with a chunk that failed to embed; their remaining chunks are not written
+    failed_posts = set()
 
     try:
-        # get all posts from Database
         async for session in get_session():
-            # fetch posts from db
-            posts = await get_all_posts(session)
-            logging.info(f"found {len(posts)} to embed")
-            if len(posts) == 0:
-                logging.info("No posts found to embed")
-                return
-
-            # Process posts and create embeddings
-            batch_size = 50  # Reduced to stay under 64k token limit
-            # for clarity (start, end, step)
-            for i in range(0, len(posts), batch_size):
-                batch = posts[i : i + batch_size]
-
-                # these are the values accepted by add_documents_batch
-                texts = []
-                metadatas = []
-                ids = []
-
-                for post in batch:
-                    # Truncate to ~2000 chars per post to avoid token limits
-                    # 50 posts × 500 tokens (~2000 chars) = 25,000 tokens (well under 64k limit)
-                    question_body = post.question_body[:1000] if post.question_body else ""
-                    answer_body = post.answer_body[:1000] if post.answer_body else ""
-                    combined_text = f"Title:{post.title} Question:{question_body} Answer:{answer_body}".strip()
-                    metadata = {
-                        "source": "stackoverflow",
-                        "question_id": post.question_id,
-                        "url": post.url,
-                        "tags": ", ".join(post.tags),
-                        "votes": post.votes,
-                        "title": post.title,
-                    }
+            stats["total_posts"] = await count_posts(session)
+
+            # continue from the watermark of an interrupted run with the same model
+            after_question_id = 0
+            checkpoint = await get_checkpoint(session, CHECKPOINT_NAME)
+            if resume and checkpoint and checkpoint.get("model") == vs.model_version:
+                after_question_id = checkpoint["last_question_id"]
+                logging.info(f"Resuming embedding run after question {after_question_id}")
+
+            # stream only posts that need (re-)embedding, packed by token count
+            async def batches():
+                async for post in iter_posts_to_embed(
+                    session, vs.model_version, after_question_id
+                ):
+                    for doc in _post_chunks(post, chunker):
+                        batch = packer.add(doc)
+                        if batch:
+                            yield batch
+                batch = packer.flush()
+                if batch:
+                    yield batch
 
-                    doc_id = f"so_{post.question_id}"
+            async def embed(batch):
+                return await vs.embed_texts([doc["text"] for doc in batch])
 
-                    texts.append(combined_text)
-                    metadatas.append(metadata)
-                    ids.append(doc_id)
+            async def write(batch, result):
+                # runs while the next batches are still being embedded
+                stats["batches"] += 1
+                if isinstance(result, Exception):
+                    # failed posts keep their old hash and are picked up by the next run
+                    logging.error(f"Batch {stats['batches']} failed: {result}")
+                    failed_posts.update(doc["question_id"] for doc in batch)
+                else:
+                    embeddings, tokens = result
+                    # drop the rest of a post once one of its chunks has failed
+                    rows = [
+                        (doc, embedding)
+                        for doc, embedding in zip(batch, embeddings)
+                        if doc["question_id"] not in failed_posts
+                    ]
+                    docs = [doc for doc, _ in rows]
+                    await vs.upsert_embeddings(
+                        session,
+                        [doc["id"] for doc in docs],
+                        [doc["text"] for doc in docs],
+                        [embedding for _, embedding in rows],
+                        [doc["metadata"] for doc in docs],
+                        [doc["content_hash"] for doc in docs],
+                        [doc["parent_id"] for doc in docs],
+                    )
+                    # chunk 0 comes last, so these posts are now complete
+                    finished = {
+                        doc["parent_id"]: doc["metadata"]["chunks"]
+                        for doc in docs
+                        if doc["metadata"]["chunk"] == 0
+                    }
+                    await vs.delete_stale_chunks(session, finished)
+                    await cost_tracker.track_embedding(session, tokens)
+                    stats["embedded"] += len(finished)
+                    stats["chunks"] += len(docs)
+                    stats["tokens"] += tokens
+                    logging.info(
+                        f"Batch {stats['batches']}: {len(docs)} chunks, {tokens} tokens"
+                    )
+                stats["failed"] = len(failed_posts)
 
-                logging.info(
-                    f"Processing batch {i//batch_size + 1}/{(len(posts)-1)//batch_size + 1}..."
+                # only move the watermark past posts whose last chunk was handled
+                last = batch[-1]
+                last_done = last["question_id"] - (0 if last["metadata"]["chunk"] == 0 else 1)
+                await save_checkpoint(
+                    session,
+                    CHECKPOINT_NAME,
+                    {"model": vs.model_version, "last_question_id": last_done},
                 )
-                await vs.add_documents_batch(texts, metadatas, ids)
+                if on_progress:
+                    await on_progress(stats)
+
+            await run_batches(batches(), embed, write, concurrency)
 
-    except Exception as e:
+            stats["skipped"] = stats["total_posts"] - stats["embedded"] - stats["failed"]
+            if stats["batches"] == 0:
+                logging.info("No posts found to embed")
+
+            # run finished - the next run starts from the beginning again
+            await clear_checkpoint(session, CHECKPOINT_NAME)
+
+    except Exception:
+        # re-raised so a job run is recorded as failed (and resumed from the watermark)
         logging.exception("Error creating embeddings")
+        raise
+    finally:
+        # new knowledge: cached analyses and searches move to a new namespace
+        # (old analyses are still served stale while they are refreshed)
+        if stats["embedded"]:
+            CacheService().bump_kb_generation()
+
+    elapsed = max(time.time() - start_time, 0.001)
+    stats["elapsed_seconds"] = round(elapsed, 2)
+    stats["docs_per_second"] = round(stats["embedded"] / elapsed, 2)
+    stats["tokens_per_second"] = round(stats["tokens"] / elapsed, 1)
+    stats["peak_rss_mb"] = _peak_rss_mb()
+    logging.info(
+        f"Embedding run complete: {stats['embedded']} embedded ({stats['chunks']} chunks), "
+        f"{stats['skipped']} skipped, {stats['failed']} failed in {stats['elapsed_seconds']}s "
+        f"({stats['docs_per_second']} docs/s, {stats['tokens_per_second']} tokens/s, "
+        f"peak RSS {stats['peak_rss_mb']} MB)"
+    )
+    return stats
+
+
+def _post_chunks(post, chunker: TextChunker) -> List[dict]:
+    """
+    Split one post into the chunk documents that get embedded.
+
+    The title is repeated in every chunk so each one stands on its own.
+    Chunk 0 is returned last: writes happen in order, so once chunk 0 (the
+    row iter_posts_to_embed checks) is stored, the whole post is.
+    """
+    sections = [
+        ("Question", clean_html(post.question_body)),
+        ("Answer", clean_html(post.answer_body)),
+    ]
+    texts = [
+        f"Title: {post.title}\n{label}: {chunk}"
+        for label, body in sections
+        for chunk in chunker.split(body)
+    ] or [f"Title: {post.title}"]
+
+    parent_id = f"so_{post.question_id}"
+    docs = [
+        {
+            "id": f"{parent_id}#{i}",
+            "parent_id": parent_id,
+            "question_id": post.question_id,
+            "text": chunk_text,
+            "content_hash": post.content_hash,
+            "metadata": {
+                "source": "stackoverflow",
+                "question_id": post.question_id,
+                "url": post.url,
+                "tags": ", ".join(post.tags),
+                "votes": post.votes,
+                "title": post.title,
+                "chunk": i,
+                "chunks": len(texts),
+            },
+        }
+        for i, chunk_text in enumerate(texts)
+    ]
+    return docs[1:] + docs[:1]
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident memory of this process in MB (ru_maxrss is KB on Linux)"""
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
 
 
 if __name__ == "__main__":
-    asyncio.run(create_embeddings())
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Create embeddings for Stack Overflow posts")
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Ignore the saved watermark and scan every post",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(create_embeddings(resume=not args.no_resume))
@@ -0,0 +1,161 @@
+"""
+Local stand-in for the OpenAI-compatible chat and embeddings API, so the
+app can be load-tested without spending tokens.
+
+    python -m app.scripts.fake_openai --port 9100 --chat-latency-ms 1500 --embedding-latency-ms 80
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:9100 (any
+GITHUB_TOKEN works). Latency is the given mean +/- `--jitter`; chat replies
+are a valid provide_analysis tool call and usage reports the configured
+token counts. Embeddings are deterministic per input text.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import struct
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+
+# Overridden from the command line
+settings = {
+    "chat_latency_ms": 1500,
+    "embedding_latency_ms": 80,
+    "jitter": 0.2,
+    "prompt_tokens": 1200,
+    "completion_tokens": 450,
+    "error_rate": 0.0,
+}
+
+app = FastAPI(title="Fake OpenAI")
+
+
+def fake_embedding(text: str, dimensions: int = 1536) -> list:
+    """Unit vector seeded by the text, so equal inputs get equal embeddings"""
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "big")
+    rng = random.Random(seed)
+    vector = [rng.gauss(0, 1) for _ in range(dimensions)]
+    norm = sum(value * value for value in vector) ** 0.5
+    return [value / norm for value in vector]
+
+
+async def _delay(mean_ms: float):
+    jitter = settings["jitter"]
+    await asyncio.sleep(max(0.0, mean_ms * random.uniform(1 - jitter, 1 + jitter)) / 1000)
+
+
+def _maybe_fail():
+    if random.random() < settings["error_rate"]:
+        raise HTTPException(status_code=500, detail={"error": {"message": "injected failure"}})
+
+
+@app.post("/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+    dimensions = body.get("dimensions", 1536)
+    await _delay(settings["embedding_latency_ms"])
+    _maybe_fail()
+
+    data = []
+    for index, text in enumerate(inputs):
+        vector = fake_embedding(str(text), dimensions)
+        # the SDK asks for base64 float32 unless a format is given
+        if body.get("encoding_format") == "base64":
+            vector = base64.b64encode(struct.pack(f"<{dimensions}f", *vector)).decode()
+        data.append({"object": "embedding", "index": index, "embedding": vector})
+
+    tokens = sum(max(1, len(str(text)) // 4) for text in inputs)
+    return {
+        "object": "list",
+        "data": data,
+        "model": body.get("model", "text-embedding-3-small"),
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    }
+
+
+@app.post("/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    await _delay(settings["chat_latency_ms"])
+    _maybe_fail()
+
+    analysis = {
+        "root_cause": "The value is missing because it was never initialised on this code path.",
+        "reasoning": "The traceback points at the first access; the caller does not set it.",
+        "solutions": [
+            {
+                "title": f"Fix {n + 1}",
+                "explanation": "Initialise the value before use, or guard the access.",
+                "code": "value = value or default",
+                "confidence": round(0.9 - n * 0.15, 2),
+                "source_urls": ["https://stackoverflow.com/questions/1"],
+            }
+            for n in range(3)
+        ],
+    }
+    prompt_tokens = settings["prompt_tokens"]
+    completion_tokens = settings["completion_tokens"]
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o-mini"),
+        "choices": [
+            {
+                "index": 0,
+                "finish_reason": "tool_calls",
+                "message": {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [
+                        {
+                            "id": f"call_{uuid.uuid4().hex[:24]}",
+                            "type": "function",
+                            "function": {
+                                "name": "provide_analysis",
+                                "arguments": json.dumps(analysis),
+                            },
+                        }
+                    ],
+                },
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible API for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--chat-latency-ms", type=float, default=settings["chat_latency_ms"])
+    parser.add_argument(
+        "--embedding-latency-ms", type=float, default=settings["embedding_latency_ms"]
+    )
+    parser.add_argument("--jitter", type=float, default=settings["jitter"], help="+/- fraction")
+    parser.add_argument("--prompt-tokens", type=int, default=settings["prompt_tokens"])
+    parser.add_argument("--completion-tokens", type=int, default=settings["completion_tokens"])
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Fraction of calls answered with a 500"
+    )
+    args = parser.parse_args()
+
+    settings.update(
+        chat_latency_ms=args.chat_latency_ms,
+        embedding_latency_ms=args.embedding_latency_ms,
+        jitter=args.jitter,
+        prompt_tokens=args.prompt_tokens,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
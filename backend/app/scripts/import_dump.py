@@ -0,0 +1,108 @@
+"""
+Load Stack Overflow posts from a Stack Exchange data dump instead of the API.
+
+Download stackoverflow.com-Posts.7z from the public data dump, extract
+Posts.xml and run:
+
+    python -m app.scripts.import_dump Posts.xml --tags python javascript --min-score 5
+    python -m app.scripts.import_dump Posts.xml --tags fastapi --embed
+
+The file is streamed; only questions whose accepted answer is further on
+in the file are held in memory.
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Iterable, Optional
+
+from app.db import get_session, init_db
+from app.db.crud import bulk_create_posts
+from app.services.stackexchange_dump import iter_dump_posts
+from app.scripts.create_embeddings import create_embeddings
+
+# Rows per INSERT ... ON CONFLICT DO NOTHING (8 params each, well under asyncpg's limit)
+IMPORT_BATCH_SIZE = 1000
+
+
+async def import_dump(
+    path: str,
+    tags: Optional[Iterable[str]] = None,
+    min_score: int = 0,
+    limit: Optional[int] = None,
+    embed: bool = False,
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> dict:
+    """
+    Bulk-load question + accepted answer pairs from a Posts.xml dump.
+
+    Posts already in stackoverflow_posts are skipped. With `embed`, the
+    embedding pipeline runs afterwards and picks up exactly the new posts.
+    Returns counts and throughput in posts/s.
+    """
+    stats = {"posts_added": 0, "posts_skipped": 0, "missing_answers": 0, "batches": 0}
+    start_time = time.time()
+
+    async def flush(session, posts):
+        result = await bulk_create_posts(session, posts)
+        stats["posts_added"] += result["inserted"]
+        stats["posts_skipped"] += result["skipped"]
+        stats["batches"] += 1
+        logging.info(
+            f"Imported batch {stats['batches']}: {stats['posts_added']} added, "
+            f"{stats['posts_skipped']} skipped"
+        )
+
+    async for session in get_session():
+        batch = []
+        seen = 0
+        for post in iter_dump_posts(path, tags=tags, min_score=min_score, stats=stats):
+            batch.append(post)
+            seen += 1
+            if len(batch) >= batch_size:
+                await flush(session, batch)
+                batch = []
+            if limit and seen >= limit:
+                break
+        if batch:
+            await flush(session, batch)
+
+    elapsed = max(time.time() - start_time, 0.001)
+    stats["elapsed_seconds"] = round(elapsed, 2)
+    stats["posts_per_second"] = round(stats["posts_added"] / elapsed, 2)
+    logging.info(
+        f"Dump import complete: {stats['posts_added']} added, {stats['posts_skipped']} "
+        f"skipped, {stats['missing_answers']} without their accepted answer "
+        f"in {stats['elapsed_seconds']}s ({stats['posts_per_second']} posts/s)"
+    )
+
+    if embed:
+        stats["embeddings"] = await create_embeddings()
+
+    return stats
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(message)s")
+
+    parser = argparse.ArgumentParser(description="Import posts from a Stack Exchange data dump")
+    parser.add_argument("path", help="Path to the extracted Posts.xml")
+    parser.add_argument("--tags", nargs="*", help="Only questions with any of these tags")
+    parser.add_argument("--min-score", type=int, default=0, help="Minimum question score")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after N posts")
+    parser.add_argument(
+        "--embed", action="store_true", help="Create embeddings for the new posts afterwards"
+    )
+    args = parser.parse_args()
+
+    async def main():
+        await init_db()
+        await import_dump(
+            args.path,
+            tags=args.tags,
+            min_score=args.min_score,
+            limit=args.limit,
+            embed=args.embed,
+        )
+
+    asyncio.run(main())
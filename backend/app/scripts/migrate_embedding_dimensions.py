@@ -0,0 +1,215 @@
+"""
+Move vector search to another embedding size (text-embedding-3 `dimensions`).
+
+Each size is stored in its own column (embedding_<dims>; 1536 stays in
+`embedding`), so the serving column is untouched until the cutover:
+
+    1. python -m app.scripts.migrate_embedding_dimensions backfill --dimensions 512
+       Adds embedding_512 and re-embeds every chunk into it. Resumable; run it
+       again right before the cutover to pick up rows written meanwhile.
+    2. Set EMBEDDING_SHADOW_DIMENSIONS=512 (dual reads). Searches keep serving
+       the current column and also query the new one in the background;
+       GET /api/analytics/vector-store shows how well they agree.
+    3. python -m app.scripts.migrate_embedding_dimensions report --dimensions 256 512 1536
+       Size, latency and recall@k of each backfilled size against 1536.
+    4. python -m app.scripts.migrate_embedding_dimensions cutover --dimensions 512
+       then set EMBEDDING_DIMENSIONS=512 and restart.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+from typing import List
+
+from sqlalchemy import text
+
+from app.db import get_session
+from app.services.cost_tracker import CostTracker
+from app.services.embedding_batcher import TokenBatchPacker, run_batches
+from app.services.supabase_vector_store import NATIVE_DIMENSIONS, SupabaseVectorStore
+
+cost_tracker = CostTracker()
+
+
+async def backfill(dimensions: int, page_size: int = 500) -> dict:
+    """Embed every row that has no vector in the target column yet"""
+    vs = SupabaseVectorStore(dimensions=dimensions)
+    packer = TokenBatchPacker.from_env()
+    concurrency = int(os.getenv("EMBEDDING_CONCURRENCY", 4))
+    stats = {"dimensions": dimensions, "rows": 0, "failed": 0, "tokens": 0}
+    start_time = time.time()
+
+    async for session in get_session():
+        await session.execute(
+            text(
+                f"ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS {vs.column} vector({dimensions})"
+            )
+        )
+        # rows written after the cutover only fill the new column
+        await session.execute(text("ALTER TABLE embeddings ALTER COLUMN embedding DROP NOT NULL"))
+        await session.commit()
+
+        async def batches():
+            # keyset pagination over rows still missing the new vector
+            after_id = ""
+            while True:
+                result = await session.execute(
+                    text(
+                        f"""
+                        SELECT id, content FROM embeddings
+                        WHERE {vs.column} IS NULL AND id > :after_id
+                        ORDER BY id
+                        LIMIT :page_size
+                    """
+                    ),
+                    {"after_id": after_id, "page_size": page_size},
+                )
+                rows = result.fetchall()
+                for row in rows:
+                    batch = packer.add({"id": row.id, "text": row.content})
+                    if batch:
+                        yield batch
+                if len(rows) < page_size:
+                    break
+                after_id = rows[-1].id
+            batch = packer.flush()
+            if batch:
+                yield batch
+
+        async def embed(batch):
+            return await vs.embed_texts([doc["text"] for doc in batch])
+
+        async def write(batch, result):
+            if isinstance(result, Exception):
+                logging.error(f"Backfill batch failed: {result}")
+                stats["failed"] += len(batch)
+                return
+            embeddings, tokens = result
+            await session.execute(
+                text(
+                    f"UPDATE embeddings SET {vs.column} = CAST(:embedding AS vector) WHERE id = :id"
+                ),
+                [
+                    {"id": doc["id"], "embedding": f"[{','.join(map(str, embedding))}]"}
+                    for doc, embedding in zip(batch, embeddings)
+                ],
+            )
+            await session.commit()
+            await cost_tracker.track_embedding(session, tokens)
+            stats["rows"] += len(batch)
+            stats["tokens"] += tokens
+            logging.info(f"Backfilled {stats['rows']} rows into {vs.column}")
+
+        await run_batches(batches(), embed, write, concurrency)
+
+    stats["elapsed_seconds"] = round(time.time() - start_time, 2)
+    logging.info(f"Backfill complete: {stats}")
+    return stats
+
+
+async def report(dimensions_list: List[int], queries: int = 50, k: int = 5):
+    """
+    Compare embedding sizes on our corpus. Post titles are used as queries;
+    the exact (sequential scan) results at 1536 dimensions are the ground truth.
+    """
+    dimensions_list = sorted(set(dimensions_list) | {NATIVE_DIMENSIONS})
+    stores = {d: SupabaseVectorStore(dimensions=d) for d in dimensions_list}
+
+    async for session in get_session():
+        result = await session.execute(
+            text(
+                """
+                SELECT metadata->>'title' FROM embeddings
+                WHERE metadata->>'title' IS NOT NULL AND coalesce(metadata->>'chunk', '0') = '0'
+                ORDER BY random() LIMIT :n
+            """
+            ),
+            {"n": queries},
+        )
+        titles = [row[0] for row in result]
+
+        query_vectors = {}
+        for d, vs in stores.items():
+            embeddings, tokens = await vs.embed_texts(titles)
+            await cost_tracker.track_embedding(session, tokens)
+            query_vectors[d] = [f"[{','.join(map(str, e))}]" for e in embeddings]
+
+        await session.execute(text("SET enable_indexscan = off"))
+        truth = []
+        for vector in query_vectors[NATIVE_DIMENSIONS]:
+            rows = await stores[NATIVE_DIMENSIONS].search_by_embedding(
+                session, vector, k, quantization="none"
+            )
+            truth.append({row.document_id for row in rows})
+        await session.execute(text("SET enable_indexscan = on"))
+
+        print(f"{len(titles)} queries, k={k}, ground truth: exact search at {NATIVE_DIMENSIONS}")
+        for d, vs in stores.items():
+            size = await session.execute(
+                text(
+                    f"SELECT count({vs.column}), coalesce(sum(pg_column_size({vs.column})), 0) "
+                    "FROM embeddings"
+                )
+            )
+            rows_with_vector, size_bytes = size.one()
+
+            latencies, recalls = [], []
+            for vector, expected in zip(query_vectors[d], truth):
+                start = time.perf_counter()
+                rows = await vs.search_by_embedding(session, vector, k)
+                latencies.append((time.perf_counter() - start) * 1000)
+                found = {row.document_id for row in rows}
+                recalls.append(len(found & expected) / max(len(expected), 1))
+
+            print(
+                f"dims={d:5} rows={rows_with_vector} vectors={size_bytes / 1024 / 1024:.1f}MB "
+                f"p50={statistics.median(latencies):.1f}ms recall@{k}={statistics.mean(recalls):.3f}"
+            )
+
+
+async def cutover(dimensions: int):
+    """Mark backfilled rows as current for the new size so they aren't re-embedded"""
+    serving = SupabaseVectorStore()
+    target = SupabaseVectorStore(dimensions=dimensions)
+
+    async for session in get_session():
+        result = await session.execute(
+            text(
+                f"""
+                UPDATE embeddings SET embedding_model = :new_version
+                WHERE {target.column} IS NOT NULL AND embedding_model = :old_version
+            """
+            ),
+            {"new_version": target.model_version, "old_version": serving.model_version},
+        )
+        await session.commit()
+        missing = await session.execute(
+            text(f"SELECT count(*) FROM embeddings WHERE {target.column} IS NULL")
+        )
+
+    logging.info(
+        f"Marked {result.rowcount} rows as {target.model_version}; "
+        f"{missing.scalar()} rows have no {dimensions}-dimension vector yet "
+        f"(the next embedding run fills them). "
+        f"Now set EMBEDDING_DIMENSIONS={dimensions} and restart."
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(message)s")
+
+    parser = argparse.ArgumentParser(description="Migrate embeddings to another dimension")
+    parser.add_argument("command", choices=["backfill", "report", "cutover"])
+    parser.add_argument("--dimensions", type=int, nargs="+", required=True)
+    parser.add_argument("--queries", type=int, default=50, help="report: sample queries")
+    parser.add_argument("--k", type=int, default=5, help="report: results per query")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        asyncio.run(report(args.dimensions, args.queries, args.k))
+    else:
+        command = backfill if args.command == "backfill" else cutover
+        for dimensions in args.dimensions:
+            asyncio.run(command(dimensions))
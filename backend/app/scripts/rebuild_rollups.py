@@ -0,0 +1,27 @@
+"""
+Recompute the analytics rollup tables from parsed_errors, analyses and
+feedback, e.g. after rows were changed or deleted by hand:
+
+    python -m app.scripts.rebuild_rollups
+"""
+import asyncio
+import logging
+
+from app.db import get_session, init_db
+from app.db.crud import rebuild_analytics_rollups, get_analytics_rollups
+
+
+async def main():
+    await init_db()
+    async for session in get_session():
+        await rebuild_analytics_rollups(session)
+        rollups = await get_analytics_rollups(session)
+        logging.info(
+            f"Rebuilt analytics rollups: {rollups['counters']}, "
+            f"{len(rollups['languages'])} languages"
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(message)s")
+    asyncio.run(main())
@@ -0,0 +1,35 @@
+"""
+Run job workers in their own process. The API only queues jobs (unless
+JOB_WORKERS is set), so scrapes and embedding runs never share its event
+loop:
+
+    python -m app.scripts.run_jobs --workers 2
+"""
+import argparse
+import asyncio
+import logging
+
+from app.db import init_db
+from app.services.job_runner import job_runner
+from app.services.job_handlers import register_job_handlers
+
+
+async def main(workers: int):
+    await init_db()
+    register_job_handlers(job_runner)
+    job_runner.workers = workers
+    job_runner.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await job_runner.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(message)s")
+
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument("--workers", type=int, default=2, help="Number of concurrent jobs")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.workers))
@@ -1,12 +1,16 @@
+import asyncio
 import httpx
 import time
 from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
 from dotenv import load_dotenv
 from app.db import StackOverFlowPost, get_session, init_db
 from sqlalchemy.ext.asyncio import AsyncSession
 import logging
 import os
-from app.db.crud import post_exists, create_post
+from app.db.crud import existing_question_ids, bulk_create_posts
+from app.services.quota_governor import QuotaGovernor
+from app.services.metrics import UPSTREAM_RETRIES, track_upstream
 
 # Load environment variables
 load_dotenv()
@@ -14,82 +18,182 @@ load_dotenv()
 # Get Stack Exchange API key from environment
 STACKEXCHANGE_API_KEY = os.getenv("STACKEXCHANGE_API_KEY", "").strip()
 
+# Stack Exchange API endpoint
+API_BASE_URL = "https://api.stackexchange.com/2.3"
 
-# Scraping Stack Overflow questions with answers
-async def scrape_stackoverflow(tag: str, limit: int):
-    async for session in get_session():
-        logging.info(f"Scraping Stack Overflow {tag} with {limit} posts")
-
-        # Stack Exchange API endpoint
-        base_url = "https://api.stackexchange.com/2.3/questions"
-
-        # parameters to pass
-        params = {
-            "key": STACKEXCHANGE_API_KEY,
-            "site": "stackoverflow",
-            "tagged": tag,
-            "sort": "votes",
-            "order": "desc",
-            "filter": "withbody",  # Include question body
-            "pagesize": 100,  # Max page size
-        }
-
-        posts_added = 0
-        page = 1
+# The API accepts at most 100 ids per vectorized call (/answers/{ids})
+ANSWER_BATCH_SIZE = 100
 
-        try:
-            while posts_added < limit:
-                params["page"] = page
+# Retries for 5xx responses and non-JSON bodies (proxy error pages), with
+# exponential backoff starting at STACKEXCHANGE_RETRY_SECONDS
+STACKEXCHANGE_RETRIES = int(os.getenv("STACKEXCHANGE_RETRIES", 3))
+STACKEXCHANGE_RETRY_SECONDS = float(os.getenv("STACKEXCHANGE_RETRY_SECONDS", 2))
 
-                logging.info(f"fetching page {page}")
-                response = httpx.get(base_url, params=params)
 
-                if response.status_code != 200:
-                    logging.error(f"{response.status_code}")
+class StackExchangeAPIError(Exception):
+    """Raised when the Stack Exchange API returns an error response"""
 
-                data = response.json()
-                questions = data.get("items", [])
 
-                if not questions:
-                    logging.error("No more questions found")
-                    break
+class StackExchangeUpstreamError(StackExchangeAPIError):
+    """A transient failure (5xx or a body that isn't JSON) worth retrying"""
 
-                for q in questions:
-                    if posts_added >= limit:
-                        break
 
-                    # only processing accepted answer
-                    if "accepted_answer_id" not in q:
-                        continue
+async def _api_get(
+    client: httpx.AsyncClient,
+    path: str,
+    params: Dict,
+    stats: Dict,
+    governor: QuotaGovernor,
+) -> Dict:
+    """
+    Call the Stack Exchange API through the shared governor.
 
-                    answer_id = q.get("accepted_answer_id")
-                    answer_url = (
-                        f"https://api.stackexchange.com/2.3/answers/{answer_id}"
-                    )
-                    answer_params = {
-                        "key": STACKEXCHANGE_API_KEY,
-                        "site": "stackoverflow",
-                        "filter": "withbody",
-                    }
-                    time.sleep(0.1)
-                    answer_response = httpx.get(answer_url, params=answer_params)
+    The governor spaces requests out and holds back further calls to a
+    method after a `backoff`. `quota_remaining` is also recorded in stats
+    so callers can stop before the daily quota runs out. 5xx responses and
+    bodies that aren't JSON are retried with exponential backoff.
+    """
+    method = path.split("/")[0]
+    for attempt in range(STACKEXCHANGE_RETRIES + 1):
+        await governor.acquire(method)
+        try:
+            with track_upstream("stackexchange", method):
+                response = await client.get(
+                    f"{API_BASE_URL}/{path}",
+                    params={"key": STACKEXCHANGE_API_KEY, "site": "stackoverflow", **params},
+                )
+                stats["requests"] += 1
+                data = _response_data(response)
+        except StackExchangeUpstreamError as e:
+            if attempt == STACKEXCHANGE_RETRIES:
+                raise
+            delay = STACKEXCHANGE_RETRY_SECONDS * 2**attempt
+            logging.warning(f"Stack Exchange /{method} failed ({e}), retrying in {delay}s")
+            UPSTREAM_RETRIES.labels("stackexchange").inc()
+            await asyncio.sleep(delay)
+            continue
+
+        governor.record(method, data)
+        stats["quota_remaining"] = data.get("quota_remaining")
+        return data
+
+
+def _response_data(response: httpx.Response) -> Dict:
+    """Check the status before parsing: gateway errors come back as HTML pages"""
+    if response.status_code >= 500:
+        raise StackExchangeUpstreamError(f"{response.status_code} {response.reason_phrase}")
+    try:
+        data = response.json()
+    except ValueError:
+        raise StackExchangeUpstreamError(
+            f"{response.status_code} response is not JSON: {response.text[:100]!r}"
+        )
+
+    if response.status_code != 200:
+        raise StackExchangeAPIError(
+            f"{response.status_code} {data.get('error_name')}: {data.get('error_message')}"
+        )
+    return data
+
+
+async def fetch_accepted_answers(
+    client: httpx.AsyncClient, answer_ids: List[int], stats: Dict, governor: QuotaGovernor
+) -> Dict[int, Dict]:
+    """Fetch answers by id, up to 100 per request; returns {answer_id: answer}"""
+    answers = {}
+    for i in range(0, len(answer_ids), ANSWER_BATCH_SIZE):
+        batch = answer_ids[i : i + ANSWER_BATCH_SIZE]
+        ids = ";".join(str(answer_id) for answer_id in batch)
+        data = await _api_get(
+            client,
+            f"answers/{ids}",
+            {"filter": "withbody", "pagesize": ANSWER_BATCH_SIZE},
+            stats,
+            governor,
+        )
+        for answer in data.get("items", []):
+            answers[answer["answer_id"]] = answer
+    return answers
 
-                    if answer_response.status_code != 200:
-                        continue
 
-                    answer_data = answer_response.json()
-                    if not answer_data.get("items"):
-                        continue
+# Scraping Stack Overflow questions with answers
+async def scrape_stackoverflow(
+    tag: str,
+    limit: int,
+    client: Optional[httpx.AsyncClient] = None,
+    start_page: int = 1,
+    on_page: Optional[Callable[[int, Dict], Awaitable]] = None,
+    governor: Optional[QuotaGovernor] = None,
+) -> Dict:
+    """
+    Scrape up to `limit` questions with accepted answers for a tag.
+
+    Pass `client` and `governor` to share one connection pool and one
+    request budget across several concurrent scrapes.
+    `on_page(page, stats)` is awaited after each page is stored, and
+    `start_page` continues a scrape that stopped after an earlier page.
+    Returns stats: posts added, API requests made, quota left and throughput.
+    """
+    owns_client = client is None
+    if owns_client:
+        client = httpx.AsyncClient(timeout=30)
+    governor = governor or QuotaGovernor.from_env()
+
+    stats = {
+        "tag": tag,
+        "posts_added": 0,
+        "posts_skipped": 0,
+        "requests": 0,
+        "quota_remaining": None,
+    }
+    start_time = time.time()
+
+    # parameters to pass
+    params = {
+        "tagged": tag,
+        "sort": "votes",
+        "order": "desc",
+        "filter": "withbody",  # Include question body
+        "pagesize": 100,  # Max page size
+    }
+
+    try:
+        async for session in get_session():
+            logging.info(f"Scraping Stack Overflow {tag} with {limit} posts")
+
+            page = start_page
+            # another tag's scrape may have spent the last of a shared quota
+            while stats["posts_added"] < limit and not governor.exhausted:
+                params["page"] = page
 
-                    answer = answer_data["items"][0]
+                logging.info(f"fetching page {page}")
+                data = await _api_get(client, "questions", params, stats, governor)
+                questions = data.get("items", [])
 
-                    # check the question is already exists or not in db
-                    is_exists = await post_exists(session, q.get("question_id"))
+                if not questions:
+                    logging.error("No more questions found")
+                    break
 
-                    if is_exists:
-                        logging.info(
-                            f"Question {q.get('question_id')} already exists in knowledge"
-                        )
+                # only processing questions with an accepted answer we don't have yet
+                answered = [q for q in questions if "accepted_answer_id" in q]
+                existing = await existing_question_ids(
+                    session, [q["question_id"] for q in answered]
+                )
+                if existing:
+                    logging.info(f"{len(existing)} questions already exist in knowledge")
+                    stats["posts_skipped"] += len(existing)
+                candidates = [q for q in answered if q["question_id"] not in existing]
+                candidates = candidates[: limit - stats["posts_added"]]
+
+                # one request per 100 answers instead of one per answer
+                answers = await fetch_accepted_answers(
+                    client, [q["accepted_answer_id"] for q in candidates], stats, governor
+                )
+
+                posts = []
+                for q in candidates:
+                    answer = answers.get(q["accepted_answer_id"])
+                    if not answer:
                         continue
 
                     # post data to store in db
@@ -104,12 +208,22 @@ async def scrape_stackoverflow(tag: str, limit: int):
                         "url": q.get("link"),
                         "created_at": datetime.fromtimestamp(q.get("creation_date")),
                     }
-                    await create_post(session, post)
-                    posts_added += 1
-
-                    logging.info(
-                        f"Added question {q.get('question_id')} ({posts_added}/{limit})"
-                    )
+                    posts.append(post)
+
+                # one INSERT ... ON CONFLICT DO NOTHING per page
+                result = await bulk_create_posts(session, posts)
+                stats["posts_added"] += result["inserted"]
+                stats["posts_skipped"] += result["skipped"]
+                logging.info(
+                    f"Added {result['inserted']} questions from page {page} "
+                    f"({stats['posts_added']}/{limit})"
+                )
+                if on_page:
+                    await on_page(page, stats)
+
+                if governor.exhausted:
+                    logging.warning("Stack Exchange API quota exhausted - stopping")
+                    break
 
                 # Check if we have more pages
                 if not data.get("has_more", False):
@@ -117,17 +231,27 @@ async def scrape_stackoverflow(tag: str, limit: int):
                     break
 
                 page += 1
-                time.sleep(0.1)  # Rate limiting between pages
 
-        except Exception as e:
-            logging.error(f"Error scraping Stack Overflow: {e}")
-            raise
+    except Exception as e:
+        logging.error(f"Error scraping Stack Overflow: {e}")
+        raise
+    finally:
+        if owns_client:
+            await client.aclose()
 
-        logging.info(f"Scraping completed. Total posts added: {posts_added}")
+    stats["elapsed_seconds"] = round(time.time() - start_time, 2)
+    stats["posts_per_second"] = round(
+        stats["posts_added"] / max(stats["elapsed_seconds"], 0.001), 2
+    )
+    logging.info(
+        f"Scraping completed. Total posts added: {stats['posts_added']} "
+        f"in {stats['elapsed_seconds']}s ({stats['posts_per_second']} posts/s, "
+        f"{stats['requests']} API requests, quota remaining: {stats['quota_remaining']})"
+    )
+    return stats
 
 
 if __name__ == "__main__":
-    import asyncio
     import argparse
 
     # Configure logging
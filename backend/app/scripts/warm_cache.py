@@ -0,0 +1,39 @@
+"""
+Refill the analysis and search caches from stored analyses of the most
+frequent recent errors, without calling the LLM. Run it after a Redis
+flush, or on a schedule (e.g. hourly from cron):
+
+    python -m app.scripts.warm_cache --top 200 --hours 72
+    python -m app.scripts.warm_cache --no-search   # no embedding calls either
+
+The API also queues this as a job at startup (CACHE_WARMUP_ON_STARTUP).
+"""
+import argparse
+import asyncio
+import json
+import logging
+
+from app.services.cache import CacheService
+from app.services.cache_warmup import CACHE_WARMUP_HOURS, CACHE_WARMUP_TOP, warm_cache
+from app.services.supabase_vector_store import SupabaseVectorStore
+
+
+async def main(top: int, hours: int, search: bool):
+    stats = await warm_cache(
+        CacheService(), SupabaseVectorStore() if search else None, top=top, hours=hours
+    )
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(message)s")
+
+    parser = argparse.ArgumentParser(description="Warm the Redis cache from stored analyses")
+    parser.add_argument("--top", type=int, default=CACHE_WARMUP_TOP, help="Most frequent errors")
+    parser.add_argument("--hours", type=int, default=CACHE_WARMUP_HOURS, help="Lookback window")
+    parser.add_argument(
+        "--no-search", action="store_true", help="Only re-cache analyses, not vector searches"
+    )
+    args = parser.parse_args()
+
+    asyncio.run(main(args.top, args.hours, not args.no_search))
@@ -2,13 +2,56 @@ import logging
 import redis
 import os
 import hashlib
-from typing import Optional, Dict, Any
 import json
+import time
+from typing import Optional, Dict, Any, Iterable, List, Tuple
+
+from app.services.cache_codec import CacheCodec
+from app.services.llm_analyzer import LLMAnalyzer
+from app.services.metrics import CACHE_FEEDBACK, CACHE_REQUESTS, track_upstream
+from app.services.model_router import ModelRouter
+
+# Incremented whenever the knowledge base changes (e.g. after an embeddings run)
+KB_GENERATION_KEY = "kb:generation"
+# Analysis namespaces, newest first: the current one, then older ones still served stale
+NAMESPACES_KEY = "cache:namespaces"
+# How many older namespaces to serve stale entries from while they are refreshed
+CACHE_STALE_NAMESPACES = int(os.getenv("CACHE_STALE_NAMESPACES", 2))
+# How often each process re-reads the KB generation from Redis
+CACHE_NAMESPACE_REFRESH_SECONDS = float(os.getenv("CACHE_NAMESPACE_REFRESH_SECONDS", 30))
+# TTL given to an analysis once a user reports that one of its solutions worked
+CACHE_PINNED_TTL_SECONDS = int(os.getenv("CACHE_PINNED_TTL_SECONDS", 30 * 86400))
+
+
+def config_version() -> str:
+    """Short hash of what an analysis depends on besides its input: the models and the prompt"""
+    profiles = json.dumps(ModelRouter().profiles, sort_keys=True)
+    return hashlib.sha256(f"{profiles}|{LLMAnalyzer.prompt_version()}".encode()).hexdigest()[:8]
+
+
+def namespace_name(config: str, kb_generation: int) -> str:
+    return f"{config}.kb{kb_generation}"
 
 
 class CacheService:
+    """
+    Redis cache for analyses and search results.
+
+    Analyses are keyed by a namespace built from the models, the prompt
+    hash and the knowledge-base generation, so changing any of them starts
+    a new namespace instead of needing a flush. Entries from the previous
+    CACHE_STALE_NAMESPACES namespaces are still returned, marked stale, so
+    the caller can serve them at once and refresh them in the background.
+    """
+
     def __init__(self):
         redis_url = os.getenv("REDIS_URL")
+        self.codec = CacheCodec.from_env()
+        self.config_version = config_version()
+        self.kb_generation = 0
+        self._namespace = namespace_name(self.config_version, 0)
+        self._stale_namespaces: List[str] = []
+        self._namespace_checked = float("-inf")
 
         if not redis_url:
             logging.info("Redis URL not configured - caching disabled")
@@ -16,8 +59,8 @@ class CacheService:
             self.enabled = False
         else:
             try:
-                # creating TCP connection pool
-                self.client = redis.from_url(redis_url, decode_responses=True)
+                # creating TCP connection pool; values are codec bytes, not text
+                self.client = redis.from_url(redis_url, decode_responses=False)
                 # Test connection
                 self.client.ping()
                 self.enabled = True
@@ -27,29 +70,94 @@ class CacheService:
                 self.client = None
                 self.enabled = False
 
+    @staticmethod
+    def fingerprint(data: str) -> str:
+        # md5(raw_error_log) in Postgres gives the same digest
+        return hashlib.md5(data.encode()).hexdigest()
+
     def _generate_key(self, prefix: str, data: str) -> str:
-        hash_obj = hashlib.md5(data.encode())
-        return f"{prefix}:{hash_obj.hexdigest()}"
+        return f"{prefix}:{self.fingerprint(data)}"
 
-    # Get cached analysis for an error log
-    def get_analysis(self, error_log: str) -> Optional[Dict]:
+    def namespace(self) -> str:
+        """
+        The current analysis namespace. The KB generation is re-read every
+        CACHE_NAMESPACE_REFRESH_SECONDS, and the namespace recorded at the
+        head of the shared list, so every process knows which are stale.
+        """
         if not self.enabled:
+            return self._namespace
+        now = time.monotonic()
+        if now - self._namespace_checked < CACHE_NAMESPACE_REFRESH_SECONDS:
+            return self._namespace
+        self._namespace_checked = now
+
+        try:
+            self.kb_generation = int(self.client.get(KB_GENERATION_KEY) or 0)
+            namespace = namespace_name(self.config_version, self.kb_generation)
+            pipe = self.client.pipeline()
+            pipe.lrem(NAMESPACES_KEY, 0, namespace)
+            pipe.lpush(NAMESPACES_KEY, namespace)
+            pipe.ltrim(NAMESPACES_KEY, 0, CACHE_STALE_NAMESPACES)
+            pipe.lrange(NAMESPACES_KEY, 1, -1)
+            with track_upstream("redis", "pipeline"):
+                stale = pipe.execute()[-1]
+            if namespace != self._namespace:
+                logging.info(f"Cache namespace is now {namespace}")
+            self._namespace = namespace
+            self._stale_namespaces = [name.decode() for name in stale]
+        except Exception as e:
+            logging.warning(f"Cache namespace refresh error: {e}")
+        return self._namespace
+
+    def known_namespaces(self) -> List[str]:
+        """The current namespace followed by the ones served stale"""
+        return [self.namespace(), *self._stale_namespaces]
+
+    def bump_kb_generation(self) -> Optional[int]:
+        """Start new namespaces after the knowledge base changed; old entries turn stale"""
+        if not self.enabled:
+            return None
+        try:
+            generation = self.client.incr(KB_GENERATION_KEY)
+            self._namespace_checked = float("-inf")
+            logging.info(f"Knowledge base generation is now {generation}")
+            return generation
+        except Exception as e:
+            logging.warning(f"Could not bump the knowledge base generation: {e}")
             return None
 
+    # Get cached analysis for an error log
+    def get_analysis(self, error_log: str) -> Tuple[Optional[Dict], bool]:
+        """
+        Returns (analysis, stale). A stale analysis comes from an older
+        namespace (or from before namespaces existed) and should be
+        refreshed; (None, False) is a miss. All candidates are read with
+        one MGET.
+        """
+        if not self.enabled:
+            return None, False
+
         try:
-            key = self._generate_key("analysis", error_log)
-            cached = self.client.get(key)
+            fingerprint = self.fingerprint(error_log)
+            keys = [self.analysis_key(fingerprint, name) for name in self.known_namespaces()]
+            keys.append(f"analysis:{fingerprint}")  # unversioned entries from before
+            with track_upstream("redis", "get"):
+                values = self.client.mget(keys)
 
-            if cached:
-                logging.info("Cache hit for analysis")
-                return json.loads(cached)
+            for index, cached in enumerate(values):
+                if cached:
+                    stale = index > 0
+                    CACHE_REQUESTS.labels("analysis", "stale" if stale else "hit").inc()
+                    logging.info(f"Cache {'stale hit' if stale else 'hit'} for analysis")
+                    return self.codec.decode_analysis(cached), stale
 
+            CACHE_REQUESTS.labels("analysis", "miss").inc()
             logging.info("Cache miss the analysis")
-            return None
+            return None, False
 
         except Exception as e:
             logging.warning(f"Cache get error: {e}")
-            return None
+            return None, False
 
     # Cache an analysis result
     # 24 hours default time
@@ -58,31 +166,41 @@ class CacheService:
             return None
 
         try:
-            key = self._generate_key("analysis", error_log)
-            self.client.set(
-                key, json.dumps(analysis), ex=ttl
-            )  # nx = True  1h total time to live
+            key = self.analysis_key(self.fingerprint(error_log))
+            pipe = self.client.pipeline(transaction=False)
+            pipe.set(key, self.codec.encode_analysis(analysis), ex=ttl)
+            if analysis.get("analysis_id") is not None:
+                # lets feedback on this analysis find its entry with one GET
+                pipe.set(self._id_key(analysis["analysis_id"]), key, ex=ttl)
+            with track_upstream("redis", "set"):
+                pipe.execute()
             logging.info(f"Cached analysis (TTL: {ttl}s)")
 
         except Exception as e:
             logging.info(f"Cache set error: {e}")
 
     # when get_analysis failed it uses get_search with parsed string
-    def get_search_results(self, query: str) -> Optional[Dict]:
+    def get_search_results(self, query: str, index_version: str = "") -> Optional[List[Dict]]:
         """
         Get cached search results
+
+        index_version identifies the embeddings searched (model and size), so
+        results from another embedding configuration are never reused
         """
         if not self.enabled:
             return None
 
         try:
-            key = self._generate_key("search", query)
-            cached = self.client.get(key)
+            key = self.search_key(query, index_version)
+            with track_upstream("redis", "get"):
+                cached = self.client.get(key)
 
             if cached:
+                CACHE_REQUESTS.labels("search", "hit").inc()
                 logging.info(f"Cache HIT for search")
-                return json.loads(cached)
+                return self.codec.decode_search_results(cached)
 
+            CACHE_REQUESTS.labels("search", "miss").inc()
             return None
 
         except Exception as e:
@@ -92,23 +210,128 @@ class CacheService:
     def set_search_results(
         self,
         query: str,
-        results: Dict,
+        results: Iterable,
         ttl: int = 86400,  # 2 hours default time to leave
+        index_version: str = "",
     ):
         """
-        Cache search results
+        Cache search results (SearchResult models or dicts)
         """
         if not self.enabled:
             return
 
         try:
-            key = self._generate_key("search", query)
-            self.client.set(key, json.dumps(results), ex=ttl)
+            key = self.search_key(query, index_version)
+            with track_upstream("redis", "set"):
+                self.client.set(key, self.codec.encode_search_results(results), ex=ttl)
             logging.info(f"Cached search results (TTL: {ttl}s)")
 
         except Exception as e:
             logging.info(f"Cache set error: {e}")
 
+    def analysis_key(self, fingerprint: str, namespace: Optional[str] = None) -> str:
+        return f"analysis:{namespace or self.namespace()}:{fingerprint}"
+
+    def search_key(self, query: str, index_version: str = "") -> str:
+        # results depend on the knowledge base but not on the models or prompt
+        self.namespace()
+        return self._generate_key(f"search:kb{self.kb_generation}", f"{index_version}:{query}")
+
+    def has_key(self, key: str) -> bool:
+        if not self.enabled:
+            return False
+        try:
+            with track_upstream("redis", "exists"):
+                return bool(self.client.exists(key))
+        except Exception as e:
+            logging.info(f"Cache exists error: {e}")
+            return False
+
+    def set_analyses_if_absent(
+        self, entries: List[Tuple[str, int, bytes]], ttl: int = 86400
+    ) -> int:
+        """
+        Write (key, analysis id, encoded analysis) entries in one pipeline
+        without replacing keys that exist (they are at least as fresh), and
+        index the ones written by analysis id. Returns how many were written.
+        """
+        if not self.enabled or not entries:
+            return 0
+
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key, _, value in entries:
+                pipe.set(key, value, ex=ttl, nx=True)
+            with track_upstream("redis", "pipeline"):
+                written = [entry for entry, ok in zip(entries, pipe.execute()) if ok]
+
+            pipe = self.client.pipeline(transaction=False)
+            for key, analysis_id, _ in written:
+                pipe.set(self._id_key(analysis_id), key, ex=ttl)
+            with track_upstream("redis", "pipeline"):
+                pipe.execute()
+            return len(written)
+        except Exception as e:
+            logging.info(f"Cache set error: {e}")
+            return 0
+
+    def _id_key(self, analysis_id: int) -> str:
+        return f"analysis-id:{analysis_id}"
+
+    def apply_feedback(self, analysis_id: int, worked: bool) -> Optional[str]:
+        """
+        Act on feedback for a cached analysis, found through its analysis-id
+        index entry. A solution that worked pins the entry for
+        CACHE_PINNED_TTL_SECONDS. One that didn't evicts the error's entries
+        from every namespace, so the next request recomputes it instead of
+        getting this one or an older stale copy.
+
+        Returns "pinned", "evicted" or None (not cached, or cache disabled).
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            id_key = self._id_key(analysis_id)
+            with track_upstream("redis", "get"):
+                key = self.client.get(id_key)
+            if key is None:
+                return None
+            key = key.decode()
+
+            pipe = self.client.pipeline(transaction=False)
+            if worked:
+                pipe.expire(key, CACHE_PINNED_TTL_SECONDS)
+                pipe.expire(id_key, CACHE_PINNED_TTL_SECONDS)
+                action = "pinned"
+            else:
+                fingerprint = key.rsplit(":", 1)[1]
+                pipe.delete(
+                    id_key,
+                    f"analysis:{fingerprint}",
+                    *(self.analysis_key(fingerprint, name) for name in self.known_namespaces()),
+                )
+                action = "evicted"
+            with track_upstream("redis", "pipeline"):
+                pipe.execute()
+
+            CACHE_FEEDBACK.labels(action).inc()
+            logging.info(f"Cached analysis {analysis_id} {action} after feedback")
+            return action
+        except Exception as e:
+            logging.warning(f"Cache feedback error: {e}")
+            return None
+
+    def acquire_lock(self, name: str, ttl: int) -> bool:
+        """Take a lock shared by every worker for `ttl` seconds; False if it's held"""
+        if not self.enabled:
+            return False
+        try:
+            return bool(self.client.set(f"lock:{name}", os.getpid(), ex=ttl, nx=True))
+        except Exception as e:
+            logging.info(f"Cache lock error: {e}")
+            return False
+
     def get_stats(self) -> Dict:
         """
         Get cache statistics
@@ -125,6 +348,10 @@ class CacheService:
                 "misses": info.get("keyspace_misses", 0),
                 "hit_rate": info.get("keyspace_hits", 0)
                 / max(info.get("keyspace_hits", 0) + info.get("keyspace_misses", 0), 1),
+                "codec": self.codec.describe(),
+                "namespace": self.namespace(),
+                "stale_namespaces": self._stale_namespaces,
+                "kb_generation": self.kb_generation,
             }
         except Exception as e:
             return {"enabled": True, "error": str(e)}
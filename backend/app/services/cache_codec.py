@@ -0,0 +1,184 @@
+import json
+import os
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import msgpack
+except ImportError:  # optional: compact JSON is used instead
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # optional: zlib is used instead
+    zstandard = None
+
+# First byte of every encoded value. Bump it whenever the layout or a field
+# list below changes; values written by another version decode as misses.
+CODEC_VERSION = 1
+
+# Second byte: serializer in the high nibble, compression in the low one
+SERIALIZERS = {"json": 0, "msgpack": 1}
+COMPRESSIONS = {"none": 0, "zlib": 1, "zstd": 2}
+
+# Positional layouts: field names are stored once here instead of in every value
+ANALYSIS_FIELDS = (
+    "error_type",
+    "error_message",
+    "language",
+    "file_path",
+    "line_number",
+    "root_cause",
+    "reasoning",
+    "solutions",
+    "sources_used",
+    "analysis_id",
+)
+SOLUTION_FIELDS = ("title", "explanation", "code", "confidence", "source_urls")
+SEARCH_RESULT_FIELDS = ("title", "url", "content", "tags", "votes", "distance")
+
+
+class CacheCodecError(ValueError):
+    """A cached value that can't be decoded (other codec version, missing library)"""
+
+
+def _as_dict(value) -> Dict:
+    return value.model_dump() if hasattr(value, "model_dump") else dict(value)
+
+
+def _to_row(value, fields) -> List:
+    value = _as_dict(value)
+    return [value.get(field) for field in fields]
+
+
+def _from_row(row, fields) -> Dict:
+    return dict(zip(fields, row))
+
+
+class CacheCodec:
+    """
+    Encodes cached values as a two-byte header plus a compact body.
+
+    The body is msgpack when it is installed (compact JSON otherwise) and
+    is compressed with zstd (or zlib) once it reaches `compress_min_bytes`.
+    The header records which were used, so values stay readable when the
+    settings change. Plain JSON values written before the codec existed
+    are still decoded.
+    """
+
+    def __init__(
+        self,
+        serializer: str = "auto",
+        compression: str = "auto",
+        compress_min_bytes: int = 512,
+        level: int = 3,
+    ):
+        if serializer == "auto":
+            serializer = "msgpack" if msgpack is not None else "json"
+        if compression == "auto":
+            compression = "zstd" if zstandard is not None else "zlib"
+        if serializer not in SERIALIZERS:
+            raise ValueError(f"Unknown cache serializer: {serializer}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown cache compression: {compression}")
+        if serializer == "msgpack" and msgpack is None:
+            raise ValueError("CACHE_SERIALIZER=msgpack needs the msgpack package")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("CACHE_COMPRESSION=zstd needs the zstandard package")
+
+        self.serializer = serializer
+        self.compression = compression
+        self.compress_min_bytes = compress_min_bytes
+        self.level = level
+        self._zstd = zstandard.ZstdCompressor(level=level) if compression == "zstd" else None
+
+    @classmethod
+    def from_env(cls) -> "CacheCodec":
+        return cls(
+            serializer=os.getenv("CACHE_SERIALIZER", "auto"),
+            compression=os.getenv("CACHE_COMPRESSION", "auto"),
+            compress_min_bytes=int(os.getenv("CACHE_COMPRESS_MIN_BYTES", 512)),
+        )
+
+    def encode(self, value: Any) -> bytes:
+        if self.serializer == "msgpack":
+            body = msgpack.packb(value, use_bin_type=True)
+        else:
+            body = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+        compression = "none"
+        if self.compression != "none" and len(body) >= self.compress_min_bytes:
+            if self.compression == "zstd":
+                compressed = self._zstd.compress(body)
+            else:
+                compressed = zlib.compress(body, self.level)
+            # incompressible (short or already random) bodies are kept as they are
+            if len(compressed) < len(body):
+                body, compression = compressed, self.compression
+
+        flags = SERIALIZERS[self.serializer] << 4 | COMPRESSIONS[compression]
+        return bytes((CODEC_VERSION, flags)) + body
+
+    def decode(self, data: bytes) -> Any:
+        if isinstance(data, str):
+            data = data.encode()
+        if data[:1] in (b"{", b"["):
+            return json.loads(data)  # written before the codec existed
+        if len(data) < 2 or data[0] != CODEC_VERSION:
+            raise CacheCodecError(f"Unsupported cache codec version {data[:1]!r}")
+
+        serializer, compression = data[1] >> 4, data[1] & 0x0F
+        body = data[2:]
+        if compression == COMPRESSIONS["zlib"]:
+            body = zlib.decompress(body)
+        elif compression == COMPRESSIONS["zstd"]:
+            if zstandard is None:
+                raise CacheCodecError("Value is zstd-compressed but zstandard isn't installed")
+            body = zstandard.ZstdDecompressor().decompress(body)
+        elif compression != COMPRESSIONS["none"]:
+            raise CacheCodecError(f"Unknown compression {compression}")
+
+        if serializer == SERIALIZERS["msgpack"]:
+            if msgpack is None:
+                raise CacheCodecError("Value is msgpack but msgpack isn't installed")
+            return msgpack.unpackb(body, raw=False)
+        if serializer == SERIALIZERS["json"]:
+            return json.loads(body)
+        raise CacheCodecError(f"Unknown serializer {serializer}")
+
+    def encode_analysis(self, analysis: Dict) -> bytes:
+        row = _to_row(analysis, ANALYSIS_FIELDS)
+        solutions = analysis.get("solutions") or []
+        row[ANALYSIS_FIELDS.index("solutions")] = [
+            _to_row(solution, SOLUTION_FIELDS) for solution in solutions
+        ]
+        return self.encode(row)
+
+    def decode_analysis(self, data: bytes) -> Dict:
+        value = self.decode(data)
+        if isinstance(value, dict):
+            return value  # legacy JSON object
+        analysis = _from_row(value, ANALYSIS_FIELDS)
+        analysis["solutions"] = [
+            _from_row(solution, SOLUTION_FIELDS) for solution in analysis["solutions"] or []
+        ]
+        return analysis
+
+    def encode_search_results(self, results: Iterable) -> bytes:
+        """`results` may be SearchResult models or dicts"""
+        return self.encode([_to_row(result, SEARCH_RESULT_FIELDS) for result in results])
+
+    def decode_search_results(self, data: bytes) -> List[Dict]:
+        rows = self.decode(data)
+        return [
+            row if isinstance(row, dict) else _from_row(row, SEARCH_RESULT_FIELDS)
+            for row in rows
+        ]
+
+    def describe(self) -> Dict[str, Optional[str]]:
+        return {
+            "version": CODEC_VERSION,
+            "serializer": self.serializer,
+            "compression": self.compression,
+            "compress_min_bytes": self.compress_min_bytes,
+        }
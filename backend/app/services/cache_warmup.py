@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_session
+from app.db.crud import get_frequent_errors
+from app.services.cache import CacheService
+from app.services.job_runner import job_runner
+from app.services.supabase_vector_store import SupabaseVectorStore, relevant_results
+
+# How many of the most frequent recent error logs to re-cache, from how far back
+CACHE_WARMUP_TOP = int(os.getenv("CACHE_WARMUP_TOP", 200))
+CACHE_WARMUP_HOURS = int(os.getenv("CACHE_WARMUP_HOURS", 72))
+# Also re-run their vector searches (embedding calls only, never the LLM)
+CACHE_WARMUP_SEARCH = os.getenv("CACHE_WARMUP_SEARCH", "true").lower() == "true"
+# Redis writes per pipeline, and the average write rate the job keeps under
+CACHE_WARMUP_BATCH = int(os.getenv("CACHE_WARMUP_BATCH", 50))
+CACHE_WARMUP_OPS_PER_SECOND = float(os.getenv("CACHE_WARMUP_OPS_PER_SECOND", 200))
+# Queue a warm-up when the API starts; the lock keeps a multi-worker deploy
+# (or a restart loop) from queuing more than one per lock period
+CACHE_WARMUP_ON_STARTUP = os.getenv("CACHE_WARMUP_ON_STARTUP", "true").lower() == "true"
+CACHE_WARMUP_LOCK_SECONDS = int(os.getenv("CACHE_WARMUP_LOCK_SECONDS", 600))
+
+
+def _cached_payload(row) -> Dict:
+    """The analysis cache value /analyze would have written for this row"""
+    return {
+        "error_type": row.error_type,
+        "error_message": row.error_message,
+        "language": row.language or "unknown",
+        "file_path": row.file_name,
+        "line_number": row.line_number,
+        "root_cause": row.root_cause,
+        "reasoning": row.reasoning,
+        "solutions": row.solutions,
+        "sources_used": row.sources_used,
+        "analysis_id": row.analysis_id,
+    }
+
+
+async def warm_cache(
+    cache: CacheService,
+    vector_store: Optional[SupabaseVectorStore] = None,
+    top: int = CACHE_WARMUP_TOP,
+    hours: int = CACHE_WARMUP_HOURS,
+    on_progress: Optional[Callable[[Dict], Awaitable]] = None,
+) -> Dict:
+    """
+    Re-cache the analyses of the `top` most frequent error logs of the last
+    `hours` from the database, so a cold cache (Redis restart, new cache
+    namespace) doesn't send the first wave of common errors to the LLM.
+
+    Keys that already exist are left alone. An analysis goes back into the
+    namespace it was produced under, so one from an older model, prompt or
+    knowledge base is served stale and refreshed; analyses from before
+    namespaces were recorded count as current. With a vector store, the
+    search cache is refilled for the same errors too.
+    """
+    stats = {"candidates": 0, "analyses_warmed": 0, "searches_warmed": 0, "skipped": 0}
+    if not cache.enabled:
+        logging.info("Cache disabled - nothing to warm up")
+        return stats
+
+    async for session in get_session():
+        rows = await get_frequent_errors(session, hours, top)
+    stats["candidates"] = len(rows)
+
+    namespaces = cache.known_namespaces()
+    queries = set()
+    for start in range(0, len(rows), CACHE_WARMUP_BATCH):
+        batch = rows[start : start + CACHE_WARMUP_BATCH]
+        entries = [
+            (
+                cache.analysis_key(row.fingerprint, row.cache_namespace or namespaces[0]),
+                row.analysis_id,
+                cache.codec.encode_analysis(_cached_payload(row)),
+            )
+            for row in batch
+            if (row.cache_namespace or namespaces[0]) in namespaces
+        ]
+        # the Redis client is synchronous; keep the event loop free for requests
+        written = await asyncio.to_thread(cache.set_analyses_if_absent, entries)
+        stats["analyses_warmed"] += written
+        stats["skipped"] += len(batch) - written
+        operations = len(entries)
+
+        if vector_store is not None:
+            for row in batch:
+                if not (row.error_type and row.error_message):
+                    continue
+                query = f"{row.error_type}: {row.error_message}"
+                key = cache.search_key(query, vector_store.model_version)
+                if query in queries or await asyncio.to_thread(cache.has_key, key):
+                    continue
+                queries.add(query)
+                try:
+                    results = await vector_store.search(query, n_results=3)
+                except Exception as e:
+                    logging.warning(f"Warm-up search failed: {e}")
+                    continue
+                await asyncio.to_thread(
+                    cache.set_search_results,
+                    query,
+                    relevant_results(results),
+                    index_version=vector_store.model_version,
+                )
+                stats["searches_warmed"] += 1
+                operations += 2
+
+        if on_progress:
+            await on_progress(stats)
+        await asyncio.sleep(operations / CACHE_WARMUP_OPS_PER_SECOND)
+
+    logging.info(
+        f"Cache warm-up: {stats['analyses_warmed']} analyses and "
+        f"{stats['searches_warmed']} searches cached from {stats['candidates']} frequent errors"
+    )
+    return stats
+
+
+async def queue_startup_warmup(session: AsyncSession, cache: Optional[CacheService] = None):
+    """Queue one cache_warmup job per lock period, however many workers start"""
+    cache = cache or CacheService()
+    if not CACHE_WARMUP_ON_STARTUP or not cache.enabled:
+        return None
+    if not cache.acquire_lock("cache-warmup", CACHE_WARMUP_LOCK_SECONDS):
+        return None
+    return await job_runner.submit(
+        session,
+        "cache_warmup",
+        {"top": CACHE_WARMUP_TOP, "hours": CACHE_WARMUP_HOURS, "search": CACHE_WARMUP_SEARCH},
+    )
@@ -0,0 +1,84 @@
+import html
+import os
+import re
+from typing import List
+
+# estimate_tokens in rate_limiter uses the same ~4 chars per token
+CHARS_PER_TOKEN = 4
+
+_BLOCK_TAGS = re.compile(r"</?(p|pre|div|li|ul|ol|h[1-6]|blockquote|br|hr)\b[^>]*>", re.I)
+_TAGS = re.compile(r"<[^>]+>")
+_SPACES = re.compile(r"[ \t]+")
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+
+
+def clean_html(value: str) -> str:
+    """Turn a Stack Overflow HTML body into plain text, keeping code and line breaks"""
+    text = _BLOCK_TAGS.sub("\n", value or "")
+    text = html.unescape(_TAGS.sub("", text))
+    text = _SPACES.sub(" ", text)
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+class TextChunker:
+    """
+    Splits text into overlapping chunks of at most `max_tokens` (estimated).
+
+    Chunks break on whitespace, and each one repeats the last
+    `overlap_tokens` of the previous chunk so a fix that straddles a
+    boundary still appears whole in one of them.
+    """
+
+    def __init__(self, max_tokens: int = 300, overlap_tokens: int = 40):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.max_chars = max_tokens * CHARS_PER_TOKEN
+        self.overlap_chars = overlap_tokens * CHARS_PER_TOKEN
+
+    @classmethod
+    def from_env(cls) -> "TextChunker":
+        return cls(
+            max_tokens=int(os.getenv("CHUNK_MAX_TOKENS", 300)),
+            overlap_tokens=int(os.getenv("CHUNK_OVERLAP_TOKENS", 40)),
+        )
+
+    def split(self, text: str) -> List[str]:
+        chunks = []
+        current: List[str] = []
+        length = 0
+        # whether `current` holds words that aren't in an emitted chunk yet
+        fresh = False
+
+        for word in text.split(" "):
+            # a single word longer than a chunk (minified code, base64) is cut up
+            while len(word) > self.max_chars:
+                if fresh:
+                    chunks.append(" ".join(current))
+                chunks.append(word[: self.max_chars])
+                word = word[self.max_chars :]
+                current, length, fresh = [], 0, False
+
+            if fresh and length + len(word) + 1 > self.max_chars:
+                chunks.append(" ".join(current))
+                current, length = self._overlap(current)
+                if length + len(word) + 1 > self.max_chars:
+                    current, length = [], 0
+
+            current.append(word)
+            length += len(word) + 1
+            fresh = True
+
+        if fresh:
+            chunks.append(" ".join(current))
+        return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+    def _overlap(self, words: List[str]):
+        """The trailing words of a finished chunk that start the next one"""
+        tail: List[str] = []
+        length = 0
+        for word in reversed(words):
+            if length + len(word) + 1 > self.overlap_chars:
+                break
+            tail.insert(0, word)
+            length += len(word) + 1
+        return tail, length
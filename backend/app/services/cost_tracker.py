@@ -1,7 +1,17 @@
 import logging
-from app.db.crud import create_cost_record, total_cost, daily_costs, cost_breakdown
+from app.db.crud import (
+    create_cost_record,
+    total_cost,
+    daily_costs,
+    cost_breakdown,
+    routing_breakdown,
+    routing_reasons,
+    recent_routing_decisions,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.services.metrics import TOKENS
+
 
 class CostTracker:
     """
@@ -16,6 +26,7 @@ class CostTracker:
             "prompt": 0.150,  # $0.150 per 1M prompt tokens
             "completion": 0.600,  # $0.600 per 1M completion tokens
         },
+        "gpt-4o": {"prompt": 2.50, "completion": 10.00},
         "gpt-4-turbo-preview": {"prompt": 10.00, "completion": 30.00},
         "text-embedding-3-small": {
             "prompt": 0.020,  # $0.020 per 1M tokens
@@ -36,6 +47,7 @@ class CostTracker:
             prompt_tokens=tokens,
             total_tokens=tokens,
         )
+        TOKENS.labels("embedding", model, "prompt").inc(tokens)
 
         logging.info(f"Analysis cost: ${cost:.6f} ({tokens} tokens)")
 
@@ -46,6 +58,10 @@ class CostTracker:
         prompt_tokens: int,
         completion_tokens: int,
         model: str = "gpt-4o-mini",
+        route_tier: str = None,
+        latency_ms: int = None,
+        route_reason: str = None,
+        route_signals: dict = None,
     ):
         pricing = self.PRICING.get(model, self.PRICING["gpt-4o-mini"])
         prompt_cost = (prompt_tokens / 1_000_000) * pricing["prompt"]
@@ -60,10 +76,17 @@ class CostTracker:
             prompt_tokens=prompt_tokens,
             completion_tokens=completion_tokens,
             total_tokens=prompt_tokens + completion_tokens,
+            route_tier=route_tier,
+            latency_ms=latency_ms,
+            route_reason=route_reason,
+            route_signals=route_signals,
         )
+        TOKENS.labels("analysis", model, "prompt").inc(prompt_tokens)
+        TOKENS.labels("analysis", model, "completion").inc(completion_tokens)
 
         logging.info(
-            f"Analysis cost: ${total_cost:.6f} ({prompt_tokens} prompt + {completion_tokens} completion tokens)"
+            f"Analysis cost: ${total_cost:.6f} ({prompt_tokens} prompt + {completion_tokens} completion tokens, "
+            f"model={model}, tier={route_tier}, {latency_ms}ms)"
         )
 
 async def get_total_cost(session: AsyncSession, days: int = 30) -> float:
@@ -75,4 +98,16 @@ async def get_daily_costs(session: AsyncSession, days: int = 7) -> list:
 
 
 async def get_cost_breakdown(session: AsyncSession, days: int = 30) -> list:
-    return await cost_breakdown(session, days)
\ No newline at end of file
+    return await cost_breakdown(session, days)
+
+
+async def get_routing_breakdown(session: AsyncSession, days: int = 30) -> list:
+    return await routing_breakdown(session, days)
+
+
+async def get_routing_reasons(session: AsyncSession, days: int = 30) -> list:
+    return await routing_reasons(session, days)
+
+
+async def get_recent_routing_decisions(session: AsyncSession, limit: int = 20) -> list:
+    return await recent_routing_decisions(session, limit)
\ No newline at end of file
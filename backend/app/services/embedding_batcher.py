@@ -0,0 +1,103 @@
+import asyncio
+import os
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from app.services.rate_limiter import estimate_tokens
+
+
+class TokenBatchPacker:
+    """
+    Packs documents into embedding requests by estimated token count.
+
+    A batch is closed when the next document would push it over
+    `max_batch_tokens` (the API's per-request token limit) or
+    `max_batch_size` inputs. Single documents longer than
+    `max_input_tokens` (the model's per-input limit) are truncated.
+    """
+
+    def __init__(
+        self,
+        max_batch_tokens: int = 60_000,
+        max_batch_size: int = 2048,
+        max_input_tokens: int = 6000,
+    ):
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_input_tokens = max_input_tokens
+
+        self._batch: List[Dict] = []
+        self._batch_tokens = 0
+
+    @classmethod
+    def from_env(cls) -> "TokenBatchPacker":
+        return cls(
+            max_batch_tokens=int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", 60_000)),
+            max_batch_size=int(os.getenv("EMBEDDING_BATCH_MAX_INPUTS", 2048)),
+            max_input_tokens=int(os.getenv("EMBEDDING_MAX_INPUT_TOKENS", 6000)),
+        )
+
+    def add(self, doc: Dict) -> Optional[List[Dict]]:
+        """
+        Add a document (a dict with a "text" key). Returns the previous batch
+        if this document didn't fit in it, otherwise None.
+        """
+        tokens = estimate_tokens(doc["text"])
+        if tokens > self.max_input_tokens:
+            # estimate_tokens is ~4 chars per token
+            doc["text"] = doc["text"][: self.max_input_tokens * 4]
+            tokens = self.max_input_tokens
+        doc["tokens"] = tokens
+
+        full = None
+        if self._batch and (
+            self._batch_tokens + tokens > self.max_batch_tokens
+            or len(self._batch) >= self.max_batch_size
+        ):
+            full = self.flush()
+
+        self._batch.append(doc)
+        self._batch_tokens += tokens
+        return full
+
+    def flush(self) -> Optional[List[Dict]]:
+        """Return the partly filled batch (if any) and start a new one"""
+        if not self._batch:
+            return None
+        batch = self._batch
+        self._batch = []
+        self._batch_tokens = 0
+        return batch
+
+
+async def run_batches(
+    batches: AsyncIterator[List[Dict]],
+    embed: Callable[[List[Dict]], Awaitable],
+    write: Callable[[List[Dict], object], Awaitable],
+    concurrency: int = 4,
+):
+    """
+    Embed up to `concurrency` batches at once and write them in order.
+
+    While one batch is being written, the next ones are still embedding, so
+    API latency overlaps with database upserts. `write(batch, result)` gets
+    either embed's return value or the exception it raised. Writes happen in
+    submission order, so a watermark saved in `write` only ever moves forward.
+    """
+    in_flight = deque()
+
+    async def drain_oldest():
+        batch, task = in_flight.popleft()
+        try:
+            result = await task
+        except Exception as e:
+            result = e
+        await write(batch, result)
+
+    async for batch in batches:
+        in_flight.append((batch, asyncio.create_task(embed(batch))))
+        if len(in_flight) >= concurrency:
+            await drain_oldest()
+
+    while in_flight:
+        await drain_oldest()
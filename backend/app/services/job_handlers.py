@@ -0,0 +1,84 @@
+from app.services.job_runner import JobContext, JobRunner
+from app.scripts.scrape_stackoverflow import scrape_stackoverflow
+from app.scripts.batch_scrape import scrape_all_tags
+from app.scripts.create_embeddings import create_embeddings
+from app.services.cache import CacheService
+from app.services.cache_warmup import warm_cache
+from app.services.supabase_vector_store import SupabaseVectorStore
+
+
+async def scrape_job(ctx: JobContext) -> dict:
+    """Scrape one tag; the checkpoint is the next page and posts added so far"""
+    tag, limit = ctx.params["tag"], ctx.params["limit"]
+    checkpoint = ctx.checkpoint or {}
+    already_added = checkpoint.get("posts_added", 0)
+
+    async def on_page(page, stats):
+        posts_added = already_added + stats["posts_added"]
+        await ctx.save_checkpoint({"page": page + 1, "posts_added": posts_added})
+        await ctx.update_progress(
+            posts_added=posts_added,
+            posts_skipped=stats["posts_skipped"],
+            target=limit,
+            page=page,
+        )
+
+    stats = await scrape_stackoverflow(
+        tag,
+        limit - already_added,
+        start_page=checkpoint.get("page", 1),
+        on_page=on_page,
+    )
+    stats["posts_added"] += already_added
+    return stats
+
+
+async def scrape_batch_job(ctx: JobContext) -> dict:
+    """Scrape the default tag set; the checkpoint is the tags already finished"""
+    completed = dict((ctx.checkpoint or {}).get("completed", {}))
+
+    async def on_tag_done(tag, posts_added):
+        completed[tag] = posts_added
+        await ctx.save_checkpoint({"completed": completed})
+        await ctx.update_progress(tags_done=len(completed), total_scraped=sum(completed.values()))
+
+    return await scrape_all_tags(completed=completed, on_tag_done=on_tag_done)
+
+
+async def embeddings_job(ctx: JobContext) -> dict:
+    """Embed new/changed posts; create_embeddings resumes from its own watermark"""
+
+    async def on_progress(stats):
+        await ctx.update_progress(
+            embedded=stats["embedded"],
+            failed=stats["failed"],
+            chunks=stats["chunks"],
+            batches=stats["batches"],
+            tokens=stats["tokens"],
+            total_posts=stats["total_posts"],
+        )
+
+    return await create_embeddings(resume=True, on_progress=on_progress)
+
+
+async def cache_warmup_job(ctx: JobContext) -> dict:
+    """Re-cache frequent analyses; existing keys are skipped, so a rerun is cheap"""
+
+    async def on_progress(stats):
+        await ctx.update_progress(**stats)
+
+    return await warm_cache(
+        CacheService(),
+        SupabaseVectorStore() if ctx.params.get("search", True) else None,
+        top=ctx.params["top"],
+        hours=ctx.params["hours"],
+        on_progress=on_progress,
+    )
+
+
+def register_job_handlers(runner: JobRunner):
+    runner.register("scrape", scrape_job)
+    runner.register("scrape_batch", scrape_batch_job)
+    # runs share the create_embeddings watermark and would embed the same posts twice
+    runner.register("embeddings", embeddings_job, single_flight=True)
+    runner.register("cache_warmup", cache_warmup_job)
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Awaitable, Callable, Dict
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import Job, sessionLocal
+from app.db.crud import create_job, claim_next_job, get_active_job, update_job
+
+
+class JobContext:
+    """What a job handler sees: its params, saved checkpoint and progress hooks"""
+
+    def __init__(self, job: Job):
+        self.job_id = job.id
+        self.params = job.params or {}
+        # State saved by a previous, interrupted attempt (None on first run)
+        self.checkpoint = job.checkpoint
+        self.progress = dict(job.progress or {})
+
+    async def update_progress(self, **counters):
+        """Merge counters into the job's progress (visible through the status endpoint)"""
+        self.progress.update(counters)
+        async with sessionLocal() as session:
+            await update_job(session, self.job_id, progress=dict(self.progress))
+
+    async def save_checkpoint(self, checkpoint: Dict):
+        """Persist the state a retry needs to continue where this attempt stopped"""
+        self.checkpoint = checkpoint
+        async with sessionLocal() as session:
+            await update_job(session, self.job_id, checkpoint=checkpoint)
+
+
+class JobRunner:
+    """
+    Runs long operations outside the HTTP request on a pool of worker tasks.
+
+    Jobs live in the `jobs` table. Workers claim them with
+    SELECT ... FOR UPDATE SKIP LOCKED, so any number of worker processes
+    (app/scripts/run_jobs.py) can share the queue. API processes only queue
+    jobs unless JOB_WORKERS is set, which keeps long scrapes and embedding
+    runs off the event loop that serves requests.
+    A running job sends heartbeats; if its process dies, the heartbeat goes
+    stale and another worker picks the job up again from its checkpoint.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        poll_interval: float = 5.0,
+        stale_after_seconds: int = 300,
+        max_attempts: int = 3,
+    ):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_after_seconds = stale_after_seconds
+        self.max_attempts = max_attempts
+
+        self.handlers: Dict[str, Callable[[JobContext], Awaitable[Dict]]] = {}
+        # kinds that may only have one queued or running job at a time
+        self.single_flight = set()
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+
+    @classmethod
+    def from_env(cls) -> "JobRunner":
+        return cls(
+            workers=int(os.getenv("JOB_WORKERS", 0)),
+            poll_interval=float(os.getenv("JOB_POLL_SECONDS", 5)),
+            stale_after_seconds=int(os.getenv("JOB_STALE_SECONDS", 300)),
+            max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", 3)),
+        )
+
+    def register(
+        self,
+        kind: str,
+        handler: Callable[[JobContext], Awaitable[Dict]],
+        single_flight: bool = False,
+    ):
+        self.handlers[kind] = handler
+        if single_flight:
+            self.single_flight.add(kind)
+
+    async def submit(self, session: AsyncSession, kind: str, params: Dict) -> Job:
+        """
+        Queue a job and wake an idle worker; returns the new Job row. For a
+        single-flight kind, the job already queued or running is returned
+        instead of queuing another.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if kind in self.single_flight:
+            # serializes concurrent submits of this kind (released on commit)
+            await session.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext(:kind))"), {"kind": f"job:{kind}"}
+            )
+            active = await get_active_job(session, kind)
+            if active is not None:
+                await session.commit()
+                logging.info(f"Job {active.id} ({kind}) is already {active.status}")
+                return active
+        job = await create_job(session, kind, params)
+        self._wakeup.set()
+        logging.info(f"Queued job {job.id} ({kind})")
+        return job
+
+    def start(self):
+        """Start the worker tasks (call from inside the running event loop)"""
+        for n in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(n)))
+        logging.info(f"Job runner started with {self.workers} workers")
+
+    async def stop(self):
+        """
+        Cancel the workers. Jobs they were running stay 'running' and are
+        resumed from their checkpoint once their heartbeat is stale.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, n: int):
+        while True:
+            try:
+                async with sessionLocal() as session:
+                    job = await claim_next_job(session, self.stale_after_seconds)
+            except Exception as e:
+                logging.error(f"Job worker {n} could not poll for jobs: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(job)
+
+    async def _run(self, job: Job):
+        handler = self.handlers.get(job.kind)
+        if handler is None or job.attempts > self.max_attempts:
+            error = (
+                f"Unknown job kind: {job.kind}"
+                if handler is None
+                else f"Gave up after {job.attempts - 1} attempts"
+            )
+            await self._finish(job.id, "failed", error=error)
+            return
+
+        if job.checkpoint:
+            logging.info(f"Resuming job {job.id} ({job.kind}) from checkpoint {job.checkpoint}")
+        else:
+            logging.info(f"Starting job {job.id} ({job.kind})")
+
+        heartbeat = asyncio.create_task(self._heartbeat(job.id))
+        try:
+            result = await handler(JobContext(job))
+            await self._finish(job.id, "succeeded", result=result)
+            logging.info(f"Job {job.id} ({job.kind}) succeeded")
+        except asyncio.CancelledError:
+            # Shutting down - leave the job 'running' so it is resumed later
+            raise
+        except Exception as e:
+            logging.exception(f"Job {job.id} ({job.kind}) failed")
+            await self._finish(job.id, "failed", error=str(e))
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: int):
+        """Keep the job's heartbeat fresh while a handler is between progress updates"""
+        while True:
+            await asyncio.sleep(self.stale_after_seconds / 3)
+            try:
+                async with sessionLocal() as session:
+                    await update_job(session, job_id)
+            except Exception as e:
+                logging.warning(f"Heartbeat for job {job_id} failed: {e}")
+
+    async def _finish(self, job_id: int, status: str, **fields):
+        async with sessionLocal() as session:
+            await update_job(
+                session, job_id, status=status, finished_at=datetime.utcnow(), **fields
+            )
+
+
+job_runner = JobRunner.from_env()
@@ -1,47 +1,91 @@
+import hashlib
 import json
 import logging
 import os
-from openai import AsyncOpenAI
-from typing import List, Dict
+import time
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, RateLimitError
+from typing import List, Dict, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.services.cost_tracker import CostTracker
+from app.services.metrics import retry_counter, track_upstream
+from app.services.rate_limiter import chat_limiter, estimate_tokens, retry_after
+from app.services.resilience import CircuitBreaker
 
 cost_tracker = CostTracker()
 
 
 class LLMAnalyzer:
 
+    # Completion tokens reserved against the TPM budget for each call
+    COMPLETION_TOKEN_ESTIMATE = 1000
+
     def __init__(self):
         # Initialize OpenAI client for GitHub Models (Azure)
         github_token = os.getenv("GITHUB_TOKEN", "").strip()
         self.client = AsyncOpenAI(
-            base_url="https://models.inference.ai.azure.com",
+            base_url=os.getenv("OPENAI_BASE_URL", "https://models.inference.ai.azure.com"),
             api_key=github_token,
+            http_client=DefaultAsyncHttpxClient(
+                event_hooks={"request": [retry_counter("openai")]}
+            ),
         )
         self.model = "gpt-4o-mini"  # Much faster and cheaper than gpt-4o
 
+        # Opens after repeated upstream failures so callers can degrade fast
+        self.breaker = CircuitBreaker(
+            "llm",
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", 5)),
+            reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", 30)),
+        )
+
     async def analyze_error(
-        self, parsed_error: Dict, search_results: List[Dict], session: AsyncSession
+        self,
+        parsed_error: Dict,
+        search_results: List[Dict],
+        session: AsyncSession,
+        route: Optional[Dict] = None,
     ) -> Dict:
+        # Model, token budget and solution count come from the router (if any)
+        model = route["model"] if route else self.model
+        max_tokens = route["max_tokens"] if route else None
+        max_solutions = route["max_solutions"] if route else 3
+
         # build context from search_results to pass in LLM
         context = self._build_context(search_results)
 
         # system prompt and user prompt
-        system_prompt = self._get_system_prompt()
+        system_prompt = self._get_system_prompt(max_solutions)
         user_prompt = self._create_user_prompt(parsed_error, context)
 
         ## Calling OpenAI with function calling for structured output
 
+        # The caller took a breaker slot (allow()); every way out of here
+        # reports back on it exactly once
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                tools=[self._get_analysis_function()],
-                tool_choice={"type": "function", "function": {"name": "provide_analysis"}},
+            # Wait for RPM/TPM capacity instead of failing with a 429
+            await chat_limiter.acquire(
+                estimate_tokens(system_prompt + user_prompt)
+                + (max_tokens or self.COMPLETION_TOKEN_ESTIMATE)
             )
+        except BaseException:
+            # nothing was sent upstream, so it says nothing about its health
+            self.breaker.release()
+            raise
+
+        try:
+            call_start = time.time()
+            with track_upstream("openai", "chat"):
+                response = await self.client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt},
+                    ],
+                    tools=[self._get_analysis_function(max_solutions)],
+                    tool_choice={"type": "function", "function": {"name": "provide_analysis"}},
+                    **({"max_tokens": max_tokens} if max_tokens else {}),
+                )
+            latency_ms = int((time.time() - call_start) * 1000)
 
             # Debug logging
             logging.info(f"LLM API response type: {type(response)}")
@@ -52,7 +96,11 @@ class LLMAnalyzer:
                     session=session,
                     prompt_tokens=response.usage.prompt_tokens,
                     completion_tokens=response.usage.completion_tokens,
-                    model=self.model,
+                    model=model,
+                    route_tier=route["tier"] if route else None,
+                    latency_ms=latency_ms,
+                    route_reason=route["reason"] if route else None,
+                    route_signals=route["signals"] if route else None,
                 )
 
             if not response.choices or not response.choices[0].message.tool_calls:
@@ -62,19 +110,31 @@ class LLMAnalyzer:
             # Extract the function call result
             tool_call = response.choices[0].message.tool_calls[0]
             analysis = json.loads(tool_call.function.arguments)
-
-            return analysis
+        except RateLimitError as e:
+            self.breaker.record_failure()
+            await chat_limiter.penalize(retry_after(e))
+            logging.error(f"LLM rate limited upstream: {str(e)}")
+            raise
         except Exception as e:
+            self.breaker.record_failure()
             logging.error(f"Error analyzing with LLM: {str(e)}")
             logging.error(f"Error type: {type(e)}")
             raise
+        except BaseException:
+            # cancelled: whoever cancelled the call accounts for it (see /analyze)
+            self.breaker.release()
+            raise
 
-    def _get_system_prompt(self) -> str:
-        prompt = """You are an expert debugging assistant helping developers solve errors.
+        self.breaker.record_success()
+        return analysis
+
+    @staticmethod
+    def _get_system_prompt(max_solutions: int = 3) -> str:
+        prompt = f"""You are an expert debugging assistant helping developers solve errors.
             Your job:
             1. Analyze the error with provided context from Stack Overflow and documentation
             2. Identify the root cause with step-by-step reasoning
-            3. Provide 2-3 ranked solutions with code examples
+            3. Provide {LLMAnalyzer._solution_range(max_solutions)} ranked solutions with code examples
             4. Include confidence scores for each solution
             5. Link to relevant sources
 
@@ -89,7 +149,8 @@ class LLMAnalyzer:
         """
         return prompt
 
-    def _create_user_prompt(self, parsed_error: Dict, context: str) -> str:
+    @staticmethod
+    def _create_user_prompt(parsed_error: Dict, context: str) -> str:
         return f"""Please analyze this error:
 
                 ERROR DETAILS:
@@ -124,7 +185,9 @@ class LLMAnalyzer:
         context_parts = []
 
         for i, result in enumerate(search_results):
-            content = result.get("content")[:400]  # Limit to 400 chars for faster processing
+            # search returns the best-matching chunk of each post, so the
+            # content is already short and relevant (CHUNK_MAX_TOKENS)
+            content = result.get("content")
 
             context_parts.append(
                 f"""--- Source {i} (Votes: {result.get('votes', 0)}, Relevance: {1 - result['distance']:.2f}) ---
@@ -138,7 +201,15 @@ class LLMAnalyzer:
 
     # Function definition for structured output
     # later move the function to tools.py and tool_registry
-    def _get_analysis_function(self) -> Dict:
+    @staticmethod
+    def _solution_range(max_solutions: int) -> str:
+        min_solutions = min(2, max_solutions)
+        if min_solutions == max_solutions:
+            return str(max_solutions)
+        return f"{min_solutions}-{max_solutions}"
+
+    @staticmethod
+    def _get_analysis_function(max_solutions: int = 3) -> Dict:
         return {
             "type": "function",
             "function": {
@@ -192,11 +263,20 @@ class LLMAnalyzer:
                                     "confidence",
                                 ],
                             },
-                            "minItems": 2,
-                            "maxItems": 3,
+                            "minItems": min(2, max_solutions),
+                            "maxItems": max_solutions,
                         },
                     },
                     "required": ["root_cause", "reasoning", "solutions"],
                 },
             },
         }
+
+    @classmethod
+    def prompt_version(cls) -> str:
+        """Short hash of the prompts and tool schema; changes whenever they are edited"""
+        parts = [cls._create_user_prompt({}, "")]
+        for max_solutions in (2, 3):
+            parts.append(cls._get_system_prompt(max_solutions))
+            parts.append(json.dumps(cls._get_analysis_function(max_solutions), sort_keys=True))
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:8]
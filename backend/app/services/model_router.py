@@ -0,0 +1,64 @@
+import logging
+import os
+from typing import Dict, List
+
+
+class ModelRouter:
+    """
+    Route each analysis to a fast/cheap or a thorough LLM configuration.
+
+    An error goes to the fast tier only when it looks easy on every signal:
+    the parser was confident, the knowledge base has a close match and the
+    log is short. Anything else gets the thorough tier.
+    """
+
+    def __init__(self):
+        self.profiles = {
+            "fast": {
+                "model": os.getenv("LLM_FAST_MODEL", "gpt-4o-mini"),
+                "max_tokens": int(os.getenv("LLM_FAST_MAX_TOKENS", 800)),
+                "max_solutions": 2,
+            },
+            "thorough": {
+                "model": os.getenv("LLM_THOROUGH_MODEL", "gpt-4o"),
+                "max_tokens": int(os.getenv("LLM_THOROUGH_MAX_TOKENS", 2000)),
+                "max_solutions": 3,
+            },
+        }
+
+        # Thresholds for the fast tier
+        self.min_confidence = int(os.getenv("ROUTER_MIN_CONFIDENCE", 60))
+        self.max_distance = float(os.getenv("ROUTER_MAX_DISTANCE", 0.35))
+        self.max_log_chars = int(os.getenv("ROUTER_MAX_LOG_CHARS", 2000))
+
+    def route(self, parsed_error: Dict, search_results: List[Dict]) -> Dict:
+        """
+        Returns the chosen profile plus the tier name, the reason and the
+        signals it was based on (so the decision can be logged and tuned)
+        """
+        confidence = parsed_error.get("confidence") or 0
+        best_distance = min((r["distance"] for r in search_results), default=1.0)
+        log_chars = len(parsed_error.get("raw_error_log") or "")
+
+        reasons = []
+        if confidence < self.min_confidence:
+            reasons.append(f"parser confidence {confidence} < {self.min_confidence}")
+        if best_distance > self.max_distance:
+            reasons.append(f"best match distance {best_distance:.2f} > {self.max_distance}")
+        if log_chars > self.max_log_chars:
+            reasons.append(f"log length {log_chars} > {self.max_log_chars} chars")
+
+        tier = "thorough" if reasons else "fast"
+        reason = "; ".join(reasons) or "confident parse with a close knowledge-base match"
+        logging.info(f"Routing analysis to '{tier}' tier: {reason}")
+
+        return {
+            "tier": tier,
+            **self.profiles[tier],
+            "reason": reason,
+            "signals": {
+                "confidence": confidence,
+                "best_distance": best_distance,
+                "log_chars": log_chars,
+            },
+        }
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+
+class QuotaGovernor:
+    """
+    Shared pacing for every concurrent Stack Exchange API caller.
+
+    Requests are spaced at most `max_requests_per_second` apart across all
+    callers. A `backoff` field in a response delays the next call to the
+    same method (the API's rule) for everyone, not just the task that saw
+    it; other methods keep their pace. The lowest `quota_remaining` seen
+    is tracked so callers can stop once the daily quota is spent.
+    """
+
+    def __init__(self, max_requests_per_second: float = 10.0):
+        self.interval = 1 / max_requests_per_second
+        self.quota_remaining: Optional[int] = None
+        self.requests = 0
+        self.backoffs = 0
+
+        self._next_slot = 0.0
+        self._backoff_until: Dict[str, float] = {}
+
+    @classmethod
+    def from_env(cls) -> "QuotaGovernor":
+        return cls(float(os.getenv("STACKEXCHANGE_MAX_RPS", 10)))
+
+    @property
+    def exhausted(self) -> bool:
+        return self.quota_remaining == 0
+
+    async def acquire(self, method: str):
+        """Wait for this caller's request slot (reserved without awaiting, so no lock is needed)"""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        # a method's backoff only holds back callers of that method
+        start = max(slot, self._backoff_until.get(method, 0.0))
+        self.requests += 1
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def record(self, method: str, data: Dict):
+        """Update shared state from a response's quota_remaining and backoff fields"""
+        quota = data.get("quota_remaining")
+        if quota is not None:
+            # responses from concurrent tasks can arrive out of order
+            self.quota_remaining = (
+                quota if self.quota_remaining is None else min(self.quota_remaining, quota)
+            )
+
+        if data.get("backoff"):
+            self.backoffs += 1
+            until = time.monotonic() + data["backoff"]
+            self._backoff_until[method] = max(self._backoff_until.get(method, 0.0), until)
+            logging.warning(f"Stack Exchange asked to back off {data['backoff']}s on /{method}")
+
+    def get_stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "backoffs": self.backoffs,
+            "quota_remaining": self.quota_remaining,
+        }
@@ -0,0 +1,264 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+import redis.asyncio as aioredis
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token for English text and code)"""
+    return max(1, len(text or "") // 4)
+
+
+def retry_after(error: Exception, default: float = 10.0) -> float:
+    """Seconds to back off after an upstream 429, read from its Retry-After header"""
+    try:
+        return float(error.response.headers.get("retry-after", default))
+    except (AttributeError, TypeError, ValueError):
+        return default
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a caller waits longer than the limiter's max queue time"""
+
+
+class TokenBucket:
+    """In-process token bucket that refills its full capacity once per minute"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0  # tokens per second
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)"""
+        self._refill()
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self.tokens -= amount
+
+
+# Takes one request and N tokens from both buckets atomically, or nothing at all.
+# Uses the Redis server clock so every worker refills against the same time.
+# Returns the number of milliseconds to wait (0 = granted).
+_TAKE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local need = tonumber(ARGV[3])
+
+local blocked = redis.call('PTTL', KEYS[3])
+if blocked > 0 then
+    return blocked
+end
+
+local function level(key, capacity)
+    local v = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(v[1]) or capacity
+    local ts = tonumber(v[2]) or now
+    return math.min(capacity, tokens + (now - ts) * capacity / 60000)
+end
+
+local requests = level(KEYS[1], rpm)
+local tokens = level(KEYS[2], tpm)
+local wait = 0
+if requests < 1 then
+    wait = math.max(wait, (1 - requests) * 60000 / rpm)
+end
+if tokens < need then
+    wait = math.max(wait, (need - tokens) * 60000 / tpm)
+end
+if wait == 0 then
+    requests = requests - 1
+    tokens = tokens - need
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(requests), 'ts', now)
+redis.call('HSET', KEYS[2], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+redis.call('PEXPIRE', KEYS[2], 120000)
+return math.ceil(wait)
+"""
+
+
+class RateLimiter:
+    """
+    Client-side limiter for an upstream API with request-per-minute (RPM)
+    and token-per-minute (TPM) limits.
+
+    Callers wait in a FIFO queue (asyncio.Lock wakes waiters in order), so a
+    large request at the head of the queue is not starved by small ones.
+    When REDIS_URL is set the buckets live in Redis and are shared by every
+    worker; otherwise they are kept in-process.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rpm: int,
+        tpm: int,
+        max_queue_seconds: float = 30.0,
+        redis_url: Optional[str] = None,
+    ):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_queue_seconds = max_queue_seconds
+
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+        self.redis = None
+        self._script = None
+        if redis_url:
+            # Connection is opened lazily on first use
+            self.redis = aioredis.from_url(redis_url)
+            self._script = self.redis.register_script(_TAKE_SCRIPT)
+            self._keys = [
+                f"ratelimit:{name}:requests",
+                f"ratelimit:{name}:tokens",
+                f"ratelimit:{name}:blocked",
+            ]
+
+        self.waiting = 0
+        self.stats = {
+            "acquired": 0,
+            "throttled": 0,  # callers that had to wait for capacity
+            "rejected": 0,  # callers that gave up after max_queue_seconds
+            "upstream_429": 0,
+            "queue_wait_seconds_total": 0.0,
+            "queue_wait_seconds_max": 0.0,
+        }
+
+    @classmethod
+    def from_env(cls, name: str, default_rpm: int, default_tpm: int) -> "RateLimiter":
+        """Build a limiter from <NAME>_RPM / <NAME>_TPM environment variables"""
+        prefix = name.upper()
+        return cls(
+            name=name,
+            rpm=int(os.getenv(f"{prefix}_RPM", default_rpm)),
+            tpm=int(os.getenv(f"{prefix}_TPM", default_tpm)),
+            max_queue_seconds=float(os.getenv("RATE_LIMIT_MAX_QUEUE_SECONDS", 30)),
+            redis_url=os.getenv("REDIS_URL"),
+        )
+
+    async def acquire(self, tokens: int = 1) -> float:
+        """
+        Wait until one request and `tokens` tokens are available.
+
+        Returns the time spent queued in seconds. Raises RateLimitTimeout if
+        capacity is not available within max_queue_seconds.
+        """
+        # A single request larger than the whole TPM budget could never run
+        tokens = min(max(tokens, 1), self.tpm)
+        start = time.monotonic()
+        deadline = start + self.max_queue_seconds
+        throttled = False
+
+        self.waiting += 1
+        try:
+            try:
+                await asyncio.wait_for(
+                    self._lock.acquire(), timeout=self.max_queue_seconds
+                )
+            except asyncio.TimeoutError:
+                self._reject(start)
+
+            try:
+                while True:
+                    wait = await self._take(tokens)
+                    if wait <= 0:
+                        break
+                    if not throttled:
+                        throttled = True
+                        self.stats["throttled"] += 1
+                    if time.monotonic() + wait > deadline:
+                        self._reject(start)
+                    await asyncio.sleep(wait)
+            finally:
+                self._lock.release()
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - start
+        self.stats["acquired"] += 1
+        self.stats["queue_wait_seconds_total"] += waited
+        self.stats["queue_wait_seconds_max"] = max(
+            self.stats["queue_wait_seconds_max"], waited
+        )
+        if throttled:
+            logging.info(f"[{self.name}] rate limited: queued {waited:.2f}s")
+        return waited
+
+    async def penalize(self, seconds: float):
+        """Block every caller for `seconds` after an upstream 429"""
+        self.stats["upstream_429"] += 1
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        if self.redis is not None:
+            try:
+                await self.redis.set(self._keys[2], 1, px=int(seconds * 1000))
+            except Exception as e:
+                logging.warning(f"[{self.name}] could not share 429 backoff: {e}")
+
+    def get_stats(self) -> Dict:
+        acquired = self.stats["acquired"]
+        return {
+            "name": self.name,
+            "backend": "redis" if self.redis is not None else "local",
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "waiting": self.waiting,
+            **self.stats,
+            "queue_wait_seconds_avg": (
+                self.stats["queue_wait_seconds_total"] / acquired if acquired else 0.0
+            ),
+        }
+
+    async def _take(self, tokens: int) -> float:
+        """Try to take capacity; returns seconds to wait (0 when granted)"""
+        if self.redis is not None:
+            try:
+                wait_ms = await self._script(
+                    keys=self._keys, args=[self.rpm, self.tpm, tokens]
+                )
+                return int(wait_ms) / 1000
+            except Exception as e:
+                logging.warning(
+                    f"[{self.name}] Redis rate limiter failed: {e} - using local buckets"
+                )
+                self.redis = None
+
+        blocked = self._blocked_until - time.monotonic()
+        if blocked > 0:
+            return blocked
+
+        wait = max(self._requests.wait_time(1), self._tokens.wait_time(tokens))
+        if wait == 0:
+            self._requests.consume(1)
+            self._tokens.consume(tokens)
+        return wait
+
+    def _reject(self, start: float):
+        self.stats["rejected"] += 1
+        raise RateLimitTimeout(
+            f"{self.name} rate limit: no capacity after {time.monotonic() - start:.1f}s"
+        )
+
+
+# Shared limiters for the two upstream paths (GitHub Models free-tier defaults)
+chat_limiter = RateLimiter.from_env("chat", default_rpm=15, default_tpm=150_000)
+embedding_limiter = RateLimiter.from_env("embedding", default_rpm=15, default_tpm=150_000)
@@ -0,0 +1,93 @@
+import logging
+import time
+from typing import Dict
+
+
+class Deadline:
+    """Latency budget for a single request, checked by each pipeline stage"""
+
+    def __init__(self, budget_ms: int):
+        self.budget = budget_ms / 1000
+        self.start = time.monotonic()
+
+    def remaining(self) -> float:
+        """Seconds left in the budget (never negative)"""
+        return max(0.0, self.start + self.budget - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+    def elapsed_ms(self) -> int:
+        return int((time.monotonic() - self.start) * 1000)
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream after repeated failures.
+
+    closed    -> calls allowed; `failure_threshold` consecutive failures open it
+    open      -> calls rejected until `reset_timeout` seconds have passed
+    half_open -> a single trial call is allowed; success closes, failure re-opens
+
+    Every allow() that returned True must be followed by record_success(),
+    record_failure() or, when no call was made after all, release(). A
+    trial nobody reports back on is given up after `reset_timeout`, so a
+    missed report can't keep the breaker half-open for good.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream right now"""
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+            self._trial_in_flight = False
+
+        if self.state == "half_open":
+            now = time.monotonic()
+            if self._trial_in_flight and now - self._trial_started < self.reset_timeout:
+                return False
+            self._trial_in_flight = True
+            self._trial_started = now
+
+        return True
+
+    def release(self):
+        """Give back an allow() that didn't lead to an upstream call"""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        if self.state != "closed":
+            logging.info(f"Circuit breaker '{self.name}' closed")
+        self.state = "closed"
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logging.warning(
+                    f"Circuit breaker '{self.name}' opened after {self.failures} failures"
+                )
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def get_stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self.failures,
+        }
@@ -0,0 +1,87 @@
+import heapq
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# PostTypeId values in Posts.xml
+QUESTION = "1"
+ANSWER = "2"
+
+
+def parse_tags(value: Optional[str]) -> List[str]:
+    """Tags are '<python><list>' in older dumps and '|python|list|' in newer ones"""
+    return re.findall(r"[^<>|]+", value or "")
+
+
+def iter_dump_posts(
+    source,
+    tags: Optional[Iterable[str]] = None,
+    min_score: int = 0,
+    stats: Optional[Dict] = None,
+) -> Iterator[Dict]:
+    """
+    Stream question + accepted answer pairs from a Stack Exchange Posts.xml.
+
+    `source` is a path or a binary file object. Rows are read with
+    iterparse and discarded as soon as they are handled. The only state
+    kept is the selected questions still waiting for their accepted answer.
+    Dumps are ordered by Id, so once the file is past an answer's Id that
+    answer isn't in the dump (deleted) and its question is dropped; memory
+    is bounded by the questions whose answer is still ahead, not by the
+    size of the dump.
+
+    Questions are selected when they have an accepted answer, a score of
+    at least `min_score` and (if `tags` is given) at least one of `tags`.
+    Yields dicts in the shape bulk_create_posts expects. Questions dropped
+    for a missing answer are counted in `stats["missing_answers"]`.
+    """
+    wanted_tags = set(tags) if tags else None
+    stats = stats if stats is not None else {}
+    stats.setdefault("missing_answers", 0)
+    # accepted answer id -> question row waiting for it
+    pending: Dict[int, Dict] = {}
+    # the same answer ids as a min-heap, to find the ones the file has passed
+    due: List[int] = []
+
+    context = ET.iterparse(source, events=("start", "end"))
+    _, root = next(context)
+
+    for event, elem in context:
+        if event != "end" or elem.tag != "row":
+            continue
+
+        attrs = elem.attrib
+        post_type = attrs.get("PostTypeId")
+        row_id = int(attrs["Id"])
+
+        while due and due[0] < row_id:
+            if pending.pop(heapq.heappop(due), None) is not None:
+                stats["missing_answers"] += 1
+
+        if post_type == QUESTION and attrs.get("AcceptedAnswerId"):
+            question_tags = parse_tags(attrs.get("Tags"))
+            if int(attrs.get("Score", 0)) >= min_score and (
+                wanted_tags is None or wanted_tags.intersection(question_tags)
+            ):
+                answer_id = int(attrs["AcceptedAnswerId"])
+                heapq.heappush(due, answer_id)
+                pending[answer_id] = {
+                    "question_id": row_id,
+                    "title": attrs.get("Title"),
+                    "question_body": attrs.get("Body"),
+                    "tags": question_tags,
+                    "votes": int(attrs.get("Score", 0)),
+                    "url": f"https://stackoverflow.com/questions/{attrs['Id']}",
+                    "created_at": datetime.fromisoformat(attrs["CreationDate"]),
+                }
+
+        elif post_type == ANSWER and row_id in pending:
+            post = pending.pop(row_id)
+            post["answer_body"] = attrs.get("Body")
+            yield post
+
+        # drop the handled row (and any already-handled siblings) from the tree
+        root.clear()
+
+    stats["missing_answers"] += len(pending)
@@ -0,0 +1,43 @@
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+# Pipeline stages of /analyze, in the order they run
+STAGES = ["cache", "parse", "embedding", "vector_search", "llm", "db", "serialize"]
+
+
+class StageTimer:
+    """
+    Wall-clock time spent in each stage of a request.
+
+    A stage may be entered more than once (e.g. several cache reads or DB
+    writes); its durations add up. Stages that never ran are left out.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - started) * 1000)
+
+    def add(self, name: str, duration_ms: float):
+        self.stages[name] = self.stages.get(name, 0.0) + duration_ms
+
+    def total_ms(self) -> int:
+        return int((time.perf_counter() - self.start) * 1000)
+
+    def to_dict(self) -> Dict[str, float]:
+        """Milliseconds per stage, as persisted with each Analysis"""
+        return {name: round(duration, 1) for name, duration in self.stages.items()}
+
+    def server_timing(self) -> str:
+        """Value for a Server-Timing response header (shown in browser devtools)"""
+        metrics = [f"{name};dur={duration}" for name, duration in self.to_dict().items()]
+        metrics.append(f"total;dur={self.total_ms()}")
+        return ", ".join(metrics)
@@ -1,19 +1,88 @@
+import asyncio
 import logging
 import os
 import json
-from typing import List, Dict
-from openai import AsyncOpenAI
+from typing import List, Dict, Optional
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, RateLimitError
 from sqlalchemy import text
 from app.db.session import get_session
+from app.schemas.search import SearchResult
 from app.services.cost_tracker import CostTracker
+from app.services.metrics import retry_counter, track_upstream
+from app.services.rate_limiter import embedding_limiter, estimate_tokens, retry_after
+from app.services.stage_timer import StageTimer
 
 cost_tracker = CostTracker()
 
+# Chunks fetched per requested result before keeping the best one per post
+SEARCH_CHUNK_CANDIDATES = int(os.getenv("SEARCH_CHUNK_CANDIDATES", 5))
+
+# text-embedding-3 models return 1536 dimensions and can shorten them on
+# request. The native size lives in `embedding`; other sizes get their own
+# column, embedding_<dims>, added by app.scripts.migrate_embedding_dimensions
+NATIVE_DIMENSIONS = 1536
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", NATIVE_DIMENSIONS))
+# While migrating to another size: also search it in the background and
+# record how well it agrees with the serving column (dual reads)
+EMBEDDING_SHADOW_DIMENSIONS = int(os.getenv("EMBEDDING_SHADOW_DIMENSIONS") or 0) or None
+
+
+# Cosine distance below which a hit is relevant enough to give the LLM
+RELEVANCE_THRESHOLD = 0.6
+
+
+def relevant_results(results: Dict, threshold: float = RELEVANCE_THRESHOLD) -> List[SearchResult]:
+    """Turn a `search` result into SearchResults, keeping only relevant hits"""
+    return [
+        SearchResult(
+            title=meta["title"],
+            url=meta["url"],
+            content=doc,  # best-matching chunk, already token-bounded
+            tags=meta["tags"].split(", ") if isinstance(meta["tags"], str) else meta["tags"],
+            votes=meta["votes"],
+            distance=distance,
+        )
+        for doc, meta, distance in zip(
+            results["documents"][0], results["metadatas"][0], results["distances"][0]
+        )
+        if distance < threshold
+    ]
+
+
+def embedding_column(dimensions: int) -> str:
+    return "embedding" if dimensions == NATIVE_DIMENSIONS else f"embedding_{dimensions}"
+
+
+# Optional quantized indexes over a full-precision embedding column.
+# Candidates come from the (much smaller) quantized index and are then
+# re-ranked by exact cosine distance. Maps mode -> (index expression, index
+# opclass, query operand, distance operator); {column} and {dims} are filled
+# in for the store's embedding size.
+QUANTIZATION_MODES = {
+    "halfvec": (
+        "({column}::halfvec({dims}))",
+        "halfvec_cosine_ops",
+        "CAST(:query_embedding AS halfvec({dims}))",
+        "<=>",
+    ),
+    "binary": (
+        "(binary_quantize({column})::bit({dims}))",
+        "bit_hamming_ops",
+        "binary_quantize(CAST(:query_embedding AS vector))",
+        "<~>",
+    ),
+}
+
+# "none" (exact vectors only), "halfvec" or "binary"
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")
+# Quantized candidates fetched per chunk that is re-ranked exactly
+VECTOR_RERANK_FACTOR = int(os.getenv("VECTOR_RERANK_FACTOR", 4))
+
 
 class SupabaseVectorStore:
     """Vector store using Supabase pgvector for persistent storage"""
 
-    def __init__(self):
+    def __init__(self, dimensions: Optional[int] = None):
         # Initialize OpenAI client for GitHub Models
         github_token = os.getenv("GITHUB_TOKEN", "").strip()
 
@@ -29,11 +98,36 @@ class SupabaseVectorStore:
         logging.info(f"Initializing with GitHub token prefix: {token_prefix}...")
 
         self.embedding_client = AsyncOpenAI(
-            base_url="https://models.inference.ai.azure.com",
+            base_url=os.getenv("OPENAI_BASE_URL", "https://models.inference.ai.azure.com"),
             api_key=github_token,
+            http_client=DefaultAsyncHttpxClient(
+                event_hooks={"request": [retry_counter("openai")]}
+            ),
         )
         self.model_name = "text-embedding-3-small"
-        logging.info(f"Supabase Vector store initialized with model: {self.model_name}")
+        self.dimensions = dimensions or EMBEDDING_DIMENSIONS
+        self.column = embedding_column(self.dimensions)
+        # Stored on each row so a model (or size) change triggers re-embedding
+        self.model_version = (
+            self.model_name
+            if self.dimensions == NATIVE_DIMENSIONS
+            else f"{self.model_name}@{self.dimensions}"
+        )
+        # only the serving store (default size) runs shadow reads
+        self.shadow_dimensions = (
+            EMBEDDING_SHADOW_DIMENSIONS
+            if dimensions is None and EMBEDDING_SHADOW_DIMENSIONS != self.dimensions
+            else None
+        )
+        self.shadow_stats = {"queries": 0, "overlap_total": 0.0, "errors": 0}
+        self._shadow_tasks = set()
+        if VECTOR_QUANTIZATION not in ("none", *QUANTIZATION_MODES):
+            raise ValueError(f"Unknown VECTOR_QUANTIZATION: {VECTOR_QUANTIZATION}")
+        self.quantization = VECTOR_QUANTIZATION
+        logging.info(
+            f"Supabase Vector store initialized with model: {self.model_name} "
+            f"({self.dimensions} dimensions, column {self.column})"
+        )
 
     async def add_document(self, text: str, metadata: Dict, doc_id: str):
         """
@@ -53,13 +147,14 @@ class SupabaseVectorStore:
             embedding_str = f"[{','.join(map(str, embedding))}]"
             metadata_json = json.dumps(metadata)
             query = text(
-                """
-                INSERT INTO embeddings (id, content, embedding, metadata)
-                VALUES (:id, :content, CAST(:embedding AS vector), CAST(:metadata AS jsonb))
+                f"""
+                INSERT INTO embeddings (id, content, {self.column}, metadata, embedding_model)
+                VALUES (:id, :content, CAST(:embedding AS vector), CAST(:metadata AS jsonb), :embedding_model)
                 ON CONFLICT (id) DO UPDATE SET
                     content = EXCLUDED.content,
-                    embedding = EXCLUDED.embedding,
-                    metadata = EXCLUDED.metadata
+                    {self.column} = EXCLUDED.{self.column},
+                    metadata = EXCLUDED.metadata,
+                    embedding_model = EXCLUDED.embedding_model
             """
             )
 
@@ -70,6 +165,7 @@ class SupabaseVectorStore:
                     "content": text,
                     "embedding": embedding_str,
                     "metadata": metadata_json,
+                    "embedding_model": self.model_version,
                 },
             )
             await session.commit()
@@ -77,113 +173,357 @@ class SupabaseVectorStore:
         logging.info(f"Added document {doc_id} to Supabase vector store")
 
     async def add_documents_batch(
-        self, texts: List[str], metadatas: List[Dict], ids: List[str]
+        self,
+        texts: List[str],
+        metadatas: List[Dict],
+        ids: List[str],
+        content_hashes: Optional[List[str]] = None,
     ):
-        """Add multiple documents at once (more efficient)"""
+        """
+        Add multiple documents at once (more efficient)
+
+        content_hashes, if given, are stored per row so unchanged source
+        documents can be skipped by later incremental runs
+        """
         logging.info(f"Generating embeddings for {len(texts)} documents")
+        content_hashes = content_hashes or [None] * len(texts)
 
         # Prepare batch insert
         async for session in get_session():
             # Generate embeddings for all texts in one API call (needs session for cost tracking)
             embeddings = await self._get_embeddings_batch(texts, session)
-            for doc_id, text_content, embedding, metadata in zip(
-                ids, texts, embeddings, metadatas
-            ):
-                embedding_str = f"[{','.join(map(str, embedding))}]"
-                metadata_json = json.dumps(metadata)
-
-                query = text(
-                    """
-                    INSERT INTO embeddings (id, content, embedding, metadata)
-                    VALUES (:id, :content, CAST(:embedding AS vector), CAST(:metadata AS jsonb))
-                    ON CONFLICT (id) DO UPDATE SET
-                        content = EXCLUDED.content,
-                        embedding = EXCLUDED.embedding,
-                        metadata = EXCLUDED.metadata
-                """
+            await self.upsert_embeddings(
+                session, ids, texts, embeddings, metadatas, content_hashes
+            )
+
+        logging.info(f"Added {len(texts)} documents to Supabase vector store")
+
+    async def embed_texts(self, texts: List[str], dimensions: Optional[int] = None):
+        """
+        Embed texts in one API call without touching the database.
+
+        Returns (embeddings, total_tokens); the caller records the cost.
+        Safe to run several of these concurrently. `dimensions` overrides
+        the store's embedding size (used by the dimension migration).
+        """
+        try:
+            await embedding_limiter.acquire(sum(estimate_tokens(t) for t in texts))
+            with track_upstream("openai", "embeddings"):
+                response = await self.embedding_client.embeddings.create(
+                    input=texts, model=self.model_name, **self._dimension_args(dimensions)
                 )
 
-                await session.execute(
-                    query,
-                    {
-                        "id": doc_id,
-                        "content": text_content,
-                        "embedding": embedding_str,
-                        "metadata": metadata_json,
-                    },
+            if response.data is None:
+                logging.error("Batch embedding API returned None for data field")
+                raise ValueError(
+                    "Embedding API returned None - check API key and endpoint"
                 )
 
-            await session.commit()
+            return [item.embedding for item in response.data], response.usage.total_tokens
+        except RateLimitError as e:
+            await embedding_limiter.penalize(retry_after(e))
+            logging.error(f"Batch embedding rate limited upstream: {str(e)}")
+            raise
+        except Exception as e:
+            logging.error(f"Error generating batch embeddings: {str(e)}")
+            raise
 
-        logging.info(f"Added {len(texts)} documents to Supabase vector store")
+    async def upsert_embeddings(
+        self,
+        session,
+        ids: List[str],
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict],
+        content_hashes: Optional[List[str]] = None,
+        parent_ids: Optional[List[str]] = None,
+    ):
+        """
+        Insert or update embedding rows in one executemany round-trip
+
+        parent_ids link chunk rows back to the document they were cut from
+        """
+        if not ids:
+            return
+        content_hashes = content_hashes or [None] * len(texts)
+        parent_ids = parent_ids or [None] * len(texts)
+        query = text(
+            f"""
+            INSERT INTO embeddings (id, content, {self.column}, metadata, content_hash, embedding_model, parent_id)
+            VALUES (
+                :id, :content, CAST(:embedding AS vector), CAST(:metadata AS jsonb),
+                :content_hash, :embedding_model, :parent_id
+            )
+            ON CONFLICT (id) DO UPDATE SET
+                content = EXCLUDED.content,
+                {self.column} = EXCLUDED.{self.column},
+                metadata = EXCLUDED.metadata,
+                content_hash = EXCLUDED.content_hash,
+                embedding_model = EXCLUDED.embedding_model,
+                parent_id = EXCLUDED.parent_id
+        """
+        )
+
+        await session.execute(
+            query,
+            [
+                {
+                    "id": doc_id,
+                    "content": text_content,
+                    "embedding": f"[{','.join(map(str, embedding))}]",
+                    "metadata": json.dumps(metadata),
+                    "content_hash": content_hash,
+                    "embedding_model": self.model_version,
+                    "parent_id": parent_id,
+                }
+                for doc_id, text_content, embedding, metadata, content_hash, parent_id in zip(
+                    ids, texts, embeddings, metadatas, content_hashes, parent_ids
+                )
+            ],
+        )
+        await session.commit()
+
+    async def delete_stale_chunks(self, session, chunk_counts: Dict[str, int]):
+        """
+        Remove rows a document no longer has after being re-chunked:
+        chunks past its new chunk count and its old unchunked row (whose
+        id is the parent id). chunk_counts maps parent_id -> chunk count.
+        """
+        if not chunk_counts:
+            return
+        await session.execute(
+            text(
+                """
+                DELETE FROM embeddings
+                WHERE id = :parent_id
+                   OR (parent_id = :parent_id AND (metadata->>'chunk')::int >= :chunks)
+            """
+            ),
+            [
+                {"parent_id": parent_id, "chunks": chunks}
+                for parent_id, chunks in chunk_counts.items()
+            ],
+        )
+        await session.commit()
 
     async def search(
-        self, query: str, n_results: int = 5, filter_metadata: Dict = None
+        self,
+        query: str,
+        n_results: int = 5,
+        filter_metadata: Dict = None,
+        timer: Optional[StageTimer] = None,
+        session=None,
     ):
         """
         Semantic search using cosine similarity
 
+        Posts are stored as several chunks; the nearest SEARCH_CHUNK_CANDIDATES
+        x n_results chunks are fetched and only the best-scoring chunk of each
+        post is kept, so results are distinct posts and `documents` holds the
+        passage that matched rather than the whole post. With
+        VECTOR_QUANTIZATION set, those chunks come from a quantized index
+        and are re-ranked against the full-precision vectors.
+
         Args:
             query: Search query (e.g., error message)
             n_results: Number of results to return
             filter_metadata: Optional metadata filters (not implemented yet)
+            timer: Optional StageTimer that records the embedding and
+                vector_search stages
+            session: The caller's session (e.g. a request's unit of work);
+                a new one is opened when omitted
 
         Returns:
             Dict with documents, metadatas, and distances (compatible with ChromaDB format)
         """
         # Search using cosine distance (1 - cosine_similarity)
         # Lower distance = more similar
-        async for session in get_session():
-            # Generate embedding for query (needs session for cost tracking)
+        timer = timer or StageTimer()
+        if session is None:
+            async for session in get_session():
+                return await self.search(query, n_results, filter_metadata, timer, session)
+
+        # Generate embedding for query (needs session for cost tracking)
+        with timer.stage("embedding"):
             query_embedding = await self._get_embedding(query, session)
-            embedding_str = f"[{','.join(map(str, query_embedding))}]"
-            query_sql = text(
-                """
-                SELECT
-                    id,
-                    content,
-                    metadata,
-                    1 - (embedding <=> CAST(:query_embedding AS vector)) as similarity,
-                    embedding <=> CAST(:query_embedding AS vector) as distance
+        embedding_str = f"[{','.join(map(str, query_embedding))}]"
+        with timer.stage("vector_search"):
+            rows = await self.search_by_embedding(session, embedding_str, n_results)
+
+        if self.shadow_dimensions:
+            task = asyncio.create_task(
+                self._shadow_search(query, [row.document_id for row in rows], n_results)
+            )
+            self._shadow_tasks.add(task)
+            task.add_done_callback(self._shadow_tasks.discard)
+
+        # Format results to match ChromaDB format for compatibility
+        documents = [[row.content for row in rows]]
+        metadatas = [[row.metadata for row in rows]]
+        distances = [[row.distance for row in rows]]
+        ids = [[row.id for row in rows]]
+
+        return {
+            "documents": documents,
+            "metadatas": metadatas,
+            "distances": distances,
+            "ids": ids,
+        }
+
+    async def search_by_embedding(
+        self,
+        session,
+        embedding_str: str,
+        n_results: int = 5,
+        quantization: Optional[str] = None,
+        dimensions: Optional[int] = None,
+    ):
+        """
+        Best-matching chunk of the n_results nearest posts for a query vector.
+
+        `quantization` overrides VECTOR_QUANTIZATION and `dimensions` the
+        embedding size searched (used by benchmarks and shadow reads).
+        Returns rows with id, document_id (the post), content, metadata,
+        similarity and distance.
+        """
+        nearest_chunks = self._nearest_chunks_sql(
+            quantization or self.quantization, dimensions or self.dimensions
+        )
+        query_sql = text(
+            f"""
+            SELECT id, document_id, content, metadata, 1 - distance as similarity, distance
+            FROM (
+                SELECT DISTINCT ON (coalesce(parent_id, id))
+                    id, coalesce(parent_id, id) as document_id, content, metadata, distance
+                FROM ({nearest_chunks}) nearest_chunks
+                ORDER BY coalesce(parent_id, id), distance
+            ) best_chunk_per_post
+            ORDER BY distance
+            LIMIT :limit
+        """
+        )
+
+        candidates = n_results * SEARCH_CHUNK_CANDIDATES
+        result = await session.execute(
+            query_sql,
+            {
+                "query_embedding": embedding_str,
+                "candidates": candidates,
+                "quantized_candidates": candidates * VECTOR_RERANK_FACTOR,
+                "limit": n_results,
+            },
+        )
+        return result.fetchall()
+
+    def _nearest_chunks_sql(self, quantization: str, dimensions: int) -> str:
+        """The :candidates nearest chunks by exact cosine distance"""
+        column = embedding_column(dimensions)
+        exact_distance = f"{column} <=> CAST(:query_embedding AS vector)"
+        if quantization not in QUANTIZATION_MODES:
+            # scan (or HNSW-index) the full-precision vectors directly
+            return f"""
+                SELECT id, parent_id, content, metadata, {exact_distance} as distance
                 FROM embeddings
-                ORDER BY embedding <=> CAST(:query_embedding AS vector)
-                LIMIT :limit
+                WHERE {column} IS NOT NULL
+                ORDER BY {exact_distance}
+                LIMIT :candidates
             """
-            )
 
-            result = await session.execute(
-                query_sql, {"query_embedding": embedding_str, "limit": n_results}
-            )
+        expression, _, operand, operator = QUANTIZATION_MODES[quantization]
+        expression = expression.format(column=column, dims=dimensions)
+        operand = operand.format(dims=dimensions)
+        # the inner ORDER BY matches the quantized index expression, so it is
+        # an index scan; only its few candidates are compared at full precision
+        return f"""
+            SELECT id, parent_id, content, metadata, {exact_distance} as distance
+            FROM (
+                SELECT id, parent_id, content, metadata, {column}
+                FROM embeddings
+                WHERE {column} IS NOT NULL
+                ORDER BY {expression} {operator} {operand}
+                LIMIT :quantized_candidates
+            ) quantized_candidates
+            ORDER BY distance
+            LIMIT :candidates
+        """
 
-            rows = result.fetchall()
+    def quantized_index_name(self, quantization: str, dimensions: Optional[int] = None) -> str:
+        dimensions = dimensions or self.dimensions
+        if dimensions == NATIVE_DIMENSIONS:
+            return f"embeddings_{quantization}_idx"
+        return f"embeddings_{dimensions}_{quantization}_idx"
 
-            # Format results to match ChromaDB format for compatibility
-            documents = [[row.content for row in rows]]
-            metadatas = [[row.metadata for row in rows]]
-            distances = [[row.distance for row in rows]]
-            ids = [[row.id for row in rows]]
+    async def create_quantized_index(
+        self, session, quantization: str, dimensions: Optional[int] = None
+    ):
+        """Build the HNSW index a quantization mode searches (no-op if it exists)"""
+        dimensions = dimensions or self.dimensions
+        expression, opclass, _, _ = QUANTIZATION_MODES[quantization]
+        expression = expression.format(column=embedding_column(dimensions), dims=dimensions)
+        await session.execute(
+            text(
+                f"CREATE INDEX IF NOT EXISTS {self.quantized_index_name(quantization, dimensions)} "
+                f"ON embeddings USING hnsw ({expression} {opclass})"
+            )
+        )
+        await session.commit()
 
-            return {
-                "documents": documents,
-                "metadatas": metadatas,
-                "distances": distances,
-                "ids": ids,
-            }
+    async def _shadow_search(self, query: str, primary_ids: List[str], n_results: int):
+        """
+        Dual read during a dimension migration: run the same search on the
+        new column and record how many of the served posts it also found.
+        Never affects the response.
+        """
+        try:
+            async for session in get_session():
+                embedding = await self._get_embedding(query, session, self.shadow_dimensions)
+                rows = await self.search_by_embedding(
+                    session,
+                    f"[{','.join(map(str, embedding))}]",
+                    n_results,
+                    dimensions=self.shadow_dimensions,
+                )
+            shadow_ids = {row.document_id for row in rows}
+            self.shadow_stats["queries"] += 1
+            self.shadow_stats["overlap_total"] += len(shadow_ids & set(primary_ids)) / max(
+                len(primary_ids), 1
+            )
+        except Exception as e:
+            self.shadow_stats["errors"] += 1
+            logging.warning(f"Shadow search at {self.shadow_dimensions} dimensions failed: {e}")
 
     async def get_stats(self):
         """Get statistics about the vector store"""
         async for session in get_session():
-            result = await session.execute(text("SELECT COUNT(*) FROM embeddings"))
-            count = result.scalar()
-
-            return {"total_documents": count, "store_type": "supabase_pgvector"}
+            result = await session.execute(
+                text("SELECT COUNT(DISTINCT coalesce(parent_id, id)), COUNT(*) FROM embeddings")
+            )
+            documents, chunks = result.one()
 
-    async def _get_embedding(self, text: str, session):
+            stats = {
+                "total_documents": documents,
+                "total_chunks": chunks,
+                "store_type": "supabase_pgvector",
+                "dimensions": self.dimensions,
+            }
+            if self.shadow_dimensions:
+                queries = self.shadow_stats["queries"]
+                stats["shadow"] = {
+                    "dimensions": self.shadow_dimensions,
+                    "queries": queries,
+                    "errors": self.shadow_stats["errors"],
+                    "mean_overlap": round(self.shadow_stats["overlap_total"] / max(queries, 1), 3),
+                }
+            return stats
+
+    async def _get_embedding(self, text: str, session, dimensions: Optional[int] = None):
         """Generate embedding using GitHub Models (OpenAI-compatible)"""
         try:
-            response = await self.embedding_client.embeddings.create(
-                input=[text], model=self.model_name
-            )
+            await embedding_limiter.acquire(estimate_tokens(text))
+            with track_upstream("openai", "embeddings"):
+                response = await self.embedding_client.embeddings.create(
+                    input=[text], model=self.model_name, **self._dimension_args(dimensions)
+                )
 
             # Debug logging
             logging.info(f"Embedding API response type: {type(response)}")
@@ -201,30 +541,39 @@ class SupabaseVectorStore:
                 )
 
             return response.data[0].embedding
+        except RateLimitError as e:
+            await embedding_limiter.penalize(retry_after(e))
+            logging.error(f"Embedding rate limited upstream: {str(e)}")
+            raise
         except Exception as e:
             logging.error(f"Error generating embedding: {str(e)}")
             logging.error(f"Error type: {type(e)}")
             raise
 
+    def _dimension_args(self, dimensions: Optional[int] = None) -> Dict:
+        """Ask the API for shortened embeddings unless the native size is wanted"""
+        dimensions = dimensions or self.dimensions
+        return {} if dimensions == NATIVE_DIMENSIONS else {"dimensions": dimensions}
+
     async def _get_embeddings_batch(self, texts: List[str], session):
         """Generate embeddings for multiple texts in a single API call"""
-        try:
-            response = await self.embedding_client.embeddings.create(
-                input=texts, model=self.model_name
-            )
+        embeddings, total_tokens = await self.embed_texts(texts)
 
-            if response:
-                # batch embeddings cost tracking
-                actual_tokens = response.usage.total_tokens
-                await cost_tracker.track_embedding(session, actual_tokens)
+        # batch embeddings cost tracking
+        await cost_tracker.track_embedding(session, total_tokens)
 
-            if response.data is None:
-                logging.error("Batch embedding API returned None for data field")
-                raise ValueError(
-                    "Embedding API returned None - check API key and endpoint"
-                )
+        return embeddings
 
-            return [item.embedding for item in response.data]
-        except Exception as e:
-            logging.error(f"Error generating batch embeddings: {str(e)}")
-            raise
+
+_vector_store: Optional[SupabaseVectorStore] = None
+
+
+def get_vector_store() -> SupabaseVectorStore:
+    """
+    The store the API routers share, created on first use; one instance
+    keeps a single client and the shadow-read statistics in one place
+    """
+    global _vector_store
+    if _vector_store is None:
+        _vector_store = SupabaseVectorStore()
+    return _vector_store
@@ -10,18 +10,26 @@ class VectorStore:
         # Initialize OpenAI client for GitHub Models
         github_token = os.getenv("GITHUB_TOKEN", "").strip()
         self.embedding_client = OpenAI(
-            base_url="https://models.inference.ai.azure.com",
+            base_url=os.getenv("OPENAI_BASE_URL", "https://models.inference.ai.azure.com"),
             api_key=github_token,
         )
         self.model_name = "text-embedding-3-small"
+        # same setting as SupabaseVectorStore; 1536 is the model's native size
+        self.dimensions = int(os.getenv("EMBEDDING_DIMENSIONS", 1536))
+        self.dimension_args = {} if self.dimensions == 1536 else {"dimensions": self.dimensions}
 
         # initializing chromadb
         # PersistentClient creates chroma_db file and the vector data lives on our Disk
         self.chroma_client = chromadb.PersistentClient(path="./chroma_db")
 
         # Get or create collection
+        # a collection holds vectors of one size, so each size gets its own
         self.collection = self.chroma_client.get_or_create_collection(
-            name="debug_knowledge",
+            name=(
+                "debug_knowledge"
+                if self.dimensions == 1536
+                else f"debug_knowledge_{self.dimensions}"
+            ),
             metadata={"description": "Stack Overflow posts and GitHub issues"},
         )
 
@@ -101,7 +109,7 @@ class VectorStore:
         # Generate embedding using GitHub Models (OpenAI-compatible)
         try:
             response = self.embedding_client.embeddings.create(
-                input=[text], model=self.model_name
+                input=[text], model=self.model_name, **self.dimension_args
             )
 
             if response.data is None:
@@ -118,7 +126,7 @@ class VectorStore:
         try:
             # The API accepts up to 2048 texts at once, but we'll process all at once for now
             response = self.embedding_client.embeddings.create(
-                input=texts, model=self.model_name
+                input=texts, model=self.model_name, **self.dimension_args
             )
 
             if response.data is None:
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from app.services.cache_codec import CODEC_VERSION, CacheCodec, CacheCodecError
+
+ANALYSIS = {
+    "error_type": "KeyError",
+    "error_message": "'user_id'",
+    "language": "python",
+    "file_path": "app/views.py",
+    "line_number": 12,
+    "root_cause": "The request body has no user_id. " * 20,
+    "reasoning": "The lookup uses square brackets on an optional field.",
+    "solutions": [
+        {
+            "title": "Use .get()",
+            "explanation": "Fall back to None when the key is missing.",
+            "code": "user_id = body.get('user_id')",
+            "confidence": 0.9,
+            "source_urls": ["https://stackoverflow.com/questions/1"],
+        }
+    ],
+    "sources_used": 1,
+    "analysis_id": 7,
+}
+
+
+class FakeSearchResult:
+    def __init__(self, **fields):
+        self.fields = fields
+
+    def model_dump(self):
+        return dict(self.fields)
+
+
+def test_analysis_round_trip_is_compressed_above_threshold():
+    codec = CacheCodec(serializer="json", compression="zlib", compress_min_bytes=256)
+    data = codec.encode_analysis(ANALYSIS)
+
+    assert data[0] == CODEC_VERSION
+    assert data[1] & 0x0F == 1  # zlib
+    assert len(data) < len(json.dumps(ANALYSIS))
+    assert codec.decode_analysis(data) == ANALYSIS
+
+
+def test_small_values_are_not_compressed():
+    codec = CacheCodec(serializer="json", compression="zlib", compress_min_bytes=4096)
+    data = codec.encode_analysis(ANALYSIS)
+    assert data[1] & 0x0F == 0
+    assert codec.decode_analysis(data) == ANALYSIS
+
+
+def test_search_results_accept_models():
+    codec = CacheCodec(serializer="json", compression="none")
+    result = {
+        "title": "KeyError in dict",
+        "url": "https://stackoverflow.com/questions/2",
+        "content": "Use dict.get",
+        "tags": ["python"],
+        "votes": 3,
+        "distance": 0.25,
+    }
+    data = codec.encode_search_results([FakeSearchResult(**result)])
+    assert codec.decode_search_results(data) == [result]
+
+
+def test_legacy_json_and_unknown_versions():
+    codec = CacheCodec(serializer="json", compression="zlib")
+    assert codec.decode_analysis(json.dumps(ANALYSIS).encode()) == ANALYSIS
+
+    with pytest.raises(CacheCodecError):
+        codec.decode(bytes((CODEC_VERSION + 1, 0)) + b"[]")
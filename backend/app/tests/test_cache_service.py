@@ -0,0 +1,222 @@
+import pytest
+
+pytest.importorskip("redis")
+pytest.importorskip("openai")
+pytest.importorskip("sqlalchemy")
+
+from app.services import cache as cache_module
+from app.services.cache import CacheService
+
+ERROR_LOG = "KeyError: 'user_id'"
+
+
+def _analysis(root_cause: str, analysis_id: int = 1) -> dict:
+    return {
+        "error_type": "KeyError",
+        "error_message": "'user_id'",
+        "language": "python",
+        "file_path": None,
+        "line_number": None,
+        "root_cause": root_cause,
+        "reasoning": "",
+        "solutions": [],
+        "sources_used": 0,
+        "analysis_id": analysis_id,
+    }
+
+
+def _encode(value) -> bytes:
+    return value if isinstance(value, bytes) else str(value).encode()
+
+
+class FakeRedis:
+    """The redis-py commands CacheService uses, with a clock tests can move"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.data = {}  # key -> (value, expires_at or None)
+        self.lists = {}
+        self.mget_calls = []
+
+    def _live(self, key):
+        entry = self.data.get(key)
+        if entry and entry[1] is not None and entry[1] <= self.now:
+            del self.data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        entry = self._live(key)
+        return entry[0] if entry else None
+
+    def mget(self, keys):
+        self.mget_calls.append(list(keys))
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and self._live(key):
+            return None
+        self.data[key] = (_encode(value), None if ex is None else self.now + ex)
+        return True
+
+    def expire(self, key, seconds):
+        entry = self._live(key)
+        if not entry:
+            return False
+        self.data[key] = (entry[0], self.now + seconds)
+        return True
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def exists(self, key):
+        return int(self._live(key) is not None)
+
+    def incr(self, key):
+        value = int(self.get(key) or 0) + 1
+        self.data[key] = (_encode(value), None)
+        return value
+
+    def lrem(self, key, count, value):
+        self.lists[key] = [item for item in self.lists.get(key, []) if item != _encode(value)]
+
+    def lpush(self, key, value):
+        self.lists.setdefault(key, []).insert(0, _encode(value))
+
+    def ltrim(self, key, start, end):
+        self.lists[key] = self.lists.get(key, [])[start : end + 1]
+
+    def lrange(self, key, start, end):
+        items = self.lists.get(key, [])
+        return items[start:] if end == -1 else items[start : end + 1]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.delenv("REDIS_URL", raising=False)
+    service = CacheService()
+    service.client = FakeRedis()
+    service.enabled = True
+    return service
+
+
+def test_kb_bump_starts_a_new_namespace(cache):
+    first = cache.namespace()
+    assert first == f"{cache.config_version}.kb0"
+
+    assert cache.bump_kb_generation() == 1
+    assert cache.namespace() == f"{cache.config_version}.kb1"
+    assert cache.known_namespaces() == [f"{cache.config_version}.kb1", first]
+
+
+def test_namespaces_older_than_the_stale_window_are_dropped(cache, monkeypatch):
+    monkeypatch.setattr(cache_module, "CACHE_STALE_NAMESPACES", 1)
+    for _ in range(2):
+        cache.namespace()
+        cache.bump_kb_generation()
+
+    assert cache.known_namespaces() == [
+        f"{cache.config_version}.kb2",
+        f"{cache.config_version}.kb1",
+    ]
+
+
+def test_lookup_order_is_current_then_stale_then_legacy(cache):
+    fingerprint = cache.fingerprint(ERROR_LOG)
+    old = cache.namespace()
+    cache.bump_kb_generation()
+    current = cache.namespace()
+
+    cache.client.set(f"analysis:{fingerprint}", cache.codec.encode_analysis(_analysis("legacy")))
+    cache.client.set(
+        cache.analysis_key(fingerprint, old), cache.codec.encode_analysis(_analysis("stale"))
+    )
+    cache.client.set(
+        cache.analysis_key(fingerprint, current), cache.codec.encode_analysis(_analysis("fresh"))
+    )
+
+    analysis, stale = cache.get_analysis(ERROR_LOG)
+    assert (analysis["root_cause"], stale) == ("fresh", False)
+    # every candidate is read in one MGET, newest first
+    assert cache.client.mget_calls[-1] == [
+        cache.analysis_key(fingerprint, current),
+        cache.analysis_key(fingerprint, old),
+        f"analysis:{fingerprint}",
+    ]
+
+    cache.client.delete(cache.analysis_key(fingerprint, current))
+    analysis, stale = cache.get_analysis(ERROR_LOG)
+    assert (analysis["root_cause"], stale) == ("stale", True)
+
+    cache.client.delete(cache.analysis_key(fingerprint, old))
+    analysis, stale = cache.get_analysis(ERROR_LOG)
+    assert (analysis["root_cause"], stale) == ("legacy", True)
+
+    cache.client.delete(f"analysis:{fingerprint}")
+    assert cache.get_analysis(ERROR_LOG) == (None, False)
+
+
+def test_stale_entry_is_served_until_refreshed(cache):
+    cache.set_analysis(ERROR_LOG, _analysis("before the embeddings run"))
+    cache.bump_kb_generation()
+
+    analysis, stale = cache.get_analysis(ERROR_LOG)
+    assert stale
+    assert analysis["root_cause"] == "before the embeddings run"
+
+    # what the background revalidation writes
+    cache.set_analysis(ERROR_LOG, _analysis("with the new knowledge base", analysis_id=2))
+    analysis, stale = cache.get_analysis(ERROR_LOG)
+    assert not stale
+    assert analysis["root_cause"] == "with the new knowledge base"
+
+
+def test_negative_feedback_evicts_the_entry_and_its_index_key(cache):
+    fingerprint = cache.fingerprint(ERROR_LOG)
+    cache.set_analysis(ERROR_LOG, _analysis("stale copy", analysis_id=1))
+    cache.bump_kb_generation()
+    cache.set_analysis(ERROR_LOG, _analysis("wrong answer", analysis_id=2))
+    assert cache.client.get("analysis-id:2") == cache.analysis_key(fingerprint).encode()
+
+    assert cache.apply_feedback(2, worked=False) == "evicted"
+
+    assert cache.client.get("analysis-id:2") is None
+    # the older namespace's copy goes too, so the next request recomputes
+    assert cache.get_analysis(ERROR_LOG) == (None, False)
+
+
+def test_positive_feedback_pins_past_the_normal_ttl(cache):
+    cache.set_analysis(ERROR_LOG, _analysis("worked", analysis_id=3), ttl=60)
+    cache.set_analysis("TypeError: x", _analysis("not rated", analysis_id=4), ttl=60)
+
+    assert cache.apply_feedback(3, worked=True) == "pinned"
+    cache.client.now += 3600
+
+    analysis, stale = cache.get_analysis(ERROR_LOG)
+    assert (analysis["root_cause"], stale) == ("worked", False)
+    assert cache.client.get("analysis-id:3") is not None
+    assert cache.get_analysis("TypeError: x") == (None, False)
+    assert cache.apply_feedback(4, worked=True) is None
+
+
+def test_feedback_on_an_uncached_analysis_is_a_no_op(cache):
+    assert cache.apply_feedback(99, worked=False) is None
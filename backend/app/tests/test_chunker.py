@@ -0,0 +1,29 @@
+from app.services.chunker import TextChunker, clean_html
+
+
+def test_chunks_are_bounded_and_overlap():
+    chunker = TextChunker(max_tokens=10, overlap_tokens=3)  # 40 / 12 chars
+    text = " ".join(f"w{i:02d}" for i in range(40))
+
+    chunks = chunker.split(text)
+
+    assert all(len(chunk) <= 40 for chunk in chunks)
+    # every word is kept, and each chunk starts with the previous one's tail
+    assert chunks[0].startswith("w00") and chunks[-1].endswith("w39")
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous.split()[-1] in chunk.split()[:3]
+
+
+def test_short_text_is_one_chunk_and_long_words_are_cut():
+    chunker = TextChunker(max_tokens=10, overlap_tokens=3)
+
+    assert chunker.split("KeyError: 'x'") == ["KeyError: 'x'"]
+    assert chunker.split("") == []
+    assert [len(chunk) for chunk in chunker.split("x" * 100)] == [40, 40, 20]
+
+
+def test_clean_html_keeps_code_and_unescapes():
+    body = "<p>Use <code>d.get(&quot;x&quot;)</code></p><pre><code>a = 1\nb = 2</code></pre>"
+
+    assert clean_html(body) == 'Use d.get("x")\n\na = 1\nb = 2'
+    assert clean_html(None) == ""
@@ -0,0 +1,63 @@
+import asyncio
+import random
+
+from app.services.embedding_batcher import TokenBatchPacker, run_batches
+
+
+def _pack(packer, texts):
+    batches = []
+    for text in texts:
+        batch = packer.add({"text": text})
+        if batch:
+            batches.append(batch)
+    last = packer.flush()
+    if last:
+        batches.append(last)
+    return batches
+
+
+def test_packer_closes_batches_at_token_limit():
+    packer = TokenBatchPacker(max_batch_tokens=100, max_batch_size=50, max_input_tokens=100)
+
+    batches = _pack(packer, ["x" * 160] * 5)  # 40 tokens each
+
+    assert [len(b) for b in batches] == [2, 2, 1]
+    assert all(sum(doc["tokens"] for doc in b) <= 100 for b in batches)
+
+
+def test_packer_closes_batches_at_input_count():
+    packer = TokenBatchPacker(max_batch_tokens=10_000, max_batch_size=3, max_input_tokens=100)
+
+    batches = _pack(packer, ["short text"] * 7)
+
+    assert [len(b) for b in batches] == [3, 3, 1]
+
+
+def test_packer_truncates_oversized_inputs():
+    packer = TokenBatchPacker(max_batch_tokens=1000, max_batch_size=10, max_input_tokens=10)
+
+    [batch] = _pack(packer, ["y" * 400])
+
+    assert batch[0]["text"] == "y" * 40
+    assert batch[0]["tokens"] == 10
+
+
+def test_run_batches_writes_in_order_and_reports_failures():
+    written = []
+
+    async def source():
+        for i in range(6):
+            yield [{"id": i}]
+
+    async def embed(batch):
+        await asyncio.sleep(random.uniform(0, 0.02))  # finish out of order
+        if batch[0]["id"] == 3:
+            raise RuntimeError("upstream error")
+        return batch[0]["id"] * 10
+
+    async def write(batch, result):
+        written.append((batch[0]["id"], result if not isinstance(result, Exception) else "failed"))
+
+    asyncio.run(run_batches(source(), embed, write, concurrency=3))
+
+    assert written == [(0, 0), (1, 10), (2, 20), (3, "failed"), (4, 40), (5, 50)]
@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import feedback
+from app.db import get_session
+
+
+async def _no_session():
+    yield None
+
+
+def test_feedback_stats(monkeypatch):
+    async def fake_stats(session):
+        return {
+            "total": 4,
+            "successful": 3,
+            "solutions": [{"solution_index": 0, "total_feedback": 4, "successful": 3}],
+        }
+
+    monkeypatch.setattr(feedback, "get_feedback_stats", fake_stats)
+    app = FastAPI()
+    app.include_router(feedback.router, prefix="/api")
+    app.dependency_overrides[get_session] = _no_session
+
+    response = TestClient(app).get("/api/analytics/feedback-stats")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["overall_success_rate"] == 0.75
+    assert body["solution_breakdown"][0]["success_rate"] == 0.75
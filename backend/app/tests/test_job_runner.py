@@ -0,0 +1,49 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from app.services.job_runner import JobRunner
+
+
+def _job(kind="embeddings", attempts=1):
+    return SimpleNamespace(
+        id=7, kind=kind, attempts=attempts, params={}, checkpoint=None, progress={}
+    )
+
+
+def _runner(monkeypatch):
+    runner = JobRunner(workers=0)
+    finished = []
+
+    async def fake_finish(job_id, status, **fields):
+        finished.append((job_id, status, fields))
+
+    monkeypatch.setattr(runner, "_finish", fake_finish)
+    return runner, finished
+
+
+def test_failing_handler_leaves_job_failed(monkeypatch):
+    runner, finished = _runner(monkeypatch)
+
+    async def crash(ctx):
+        raise RuntimeError("embedding API unreachable")
+
+    runner.register("embeddings", crash)
+    asyncio.run(runner._run(_job()))
+
+    assert finished == [(7, "failed", {"error": "embedding API unreachable"})]
+
+
+def test_successful_handler_records_result(monkeypatch):
+    runner, finished = _runner(monkeypatch)
+
+    async def embed(ctx):
+        return {"embedded": 3}
+
+    runner.register("embeddings", embed)
+    asyncio.run(runner._run(_job()))
+
+    assert finished == [(7, "succeeded", {"result": {"embedded": 3}})]
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from app.services.metrics import (
+    REQUEST_LATENCY,
+    UPSTREAM_ERRORS,
+    MetricsMiddleware,
+    MetricsRegistry,
+    track_upstream,
+)
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", ["route"], buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.7, 3):
+        latency.labels("/api/analyze").observe(value)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{route="/api/analyze",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/api/analyze",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{route="/api/analyze",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{route="/api/analyze"} 4' in lines
+
+
+def test_counters_gauges_and_collectors():
+    registry = MetricsRegistry()
+    hits = registry.counter("cache_requests_total", "Lookups", ["namespace", "result"])
+    pool = registry.gauge("pool_connections", "Pool", ["state"])
+    registry.add_collector(lambda: pool.labels("checked_out").set(3))
+
+    hits.labels("search", "hit").inc()
+    hits.labels("search", "hit").inc(2)
+    output = registry.render()
+
+    assert 'cache_requests_total{namespace="search",result="hit"} 3' in output
+    assert 'pool_connections{state="checked_out"} 3' in output
+
+
+def test_wrong_label_count_is_rejected():
+    registry = MetricsRegistry()
+    hits = registry.counter("hits_total", "Hits", ["namespace"])
+    with pytest.raises(ValueError):
+        hits.labels("search", "extra")
+
+
+def test_track_upstream_counts_errors():
+    errors = UPSTREAM_ERRORS.labels("test-upstream", "TimeoutError")
+    before = errors.value
+    with pytest.raises(TimeoutError):
+        with track_upstream("test-upstream", "get"):
+            raise TimeoutError
+    assert errors.value == before + 1
+
+
+def test_middleware_labels_by_route_template():
+    class Route:
+        path = "/api/jobs/{job_id}"
+
+    async def app(scope, receive, send):
+        scope["route"] = Route()
+        await send({"type": "http.response.start", "status": 404})
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/api/jobs/7"}
+    asyncio.run(MetricsMiddleware(app)(scope, None, send))
+
+    assert REQUEST_LATENCY.labels("GET", "/api/jobs/{job_id}", "404").count == 1
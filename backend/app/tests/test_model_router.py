@@ -0,0 +1,28 @@
+from app.services.model_router import ModelRouter
+
+
+def _parsed(confidence, log="ModuleNotFoundError: No module named 'flask'"):
+    return {"confidence": confidence, "raw_error_log": log}
+
+
+def test_easy_error_with_close_match_goes_to_fast_tier():
+    route = ModelRouter().route(_parsed(100), [{"distance": 0.2}, {"distance": 0.5}])
+
+    assert route["tier"] == "fast"
+    assert route["max_solutions"] == 2
+
+
+def test_any_hard_signal_goes_to_thorough_tier():
+    router = ModelRouter()
+
+    assert router.route(_parsed(30), [{"distance": 0.2}])["tier"] == "thorough"
+    assert router.route(_parsed(100), [{"distance": 0.5}])["tier"] == "thorough"
+    assert router.route(_parsed(100), [])["tier"] == "thorough"
+    assert router.route(_parsed(100, "x" * 5000), [{"distance": 0.2}])["tier"] == "thorough"
+
+
+def test_route_reports_its_signals():
+    route = ModelRouter().route(_parsed(30), [{"distance": 0.2}])
+
+    assert route["signals"] == {"confidence": 30, "best_distance": 0.2, "log_chars": 44}
+    assert "confidence" in route["reason"]
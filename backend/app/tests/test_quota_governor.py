@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+from app.services.quota_governor import QuotaGovernor
+
+
+def test_requests_are_spaced_across_concurrent_callers():
+    governor = QuotaGovernor(max_requests_per_second=100)
+
+    async def run():
+        start = time.monotonic()
+        await asyncio.gather(*(governor.acquire("questions") for _ in range(6)))
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(run())
+
+    assert governor.requests == 6
+    # first slot is immediate, the other five are 10ms apart
+    assert 0.045 <= elapsed < 0.5
+
+
+def test_backoff_delays_only_the_same_method():
+    governor = QuotaGovernor(max_requests_per_second=1000)
+    governor.record("answers", {"backoff": 0.1, "quota_remaining": 500})
+
+    async def timed(method):
+        start = time.monotonic()
+        await governor.acquire(method)
+        return time.monotonic() - start
+
+    assert asyncio.run(timed("questions")) < 0.05
+    assert asyncio.run(timed("answers")) >= 0.08
+
+
+def test_backed_off_caller_does_not_hold_up_other_methods():
+    governor = QuotaGovernor(max_requests_per_second=1000)
+    governor.record("answers", {"backoff": 0.2, "quota_remaining": 500})
+
+    async def run():
+        start = time.monotonic()
+        answers = asyncio.ensure_future(governor.acquire("answers"))
+        await asyncio.sleep(0)  # let /answers reserve its slot first
+        await governor.acquire("questions")
+        elapsed = time.monotonic() - start
+        await answers
+        return elapsed
+
+    assert asyncio.run(run()) < 0.1
+
+
+def test_quota_keeps_lowest_value_seen():
+    governor = QuotaGovernor()
+
+    governor.record("questions", {"quota_remaining": 120})
+    governor.record("answers", {"quota_remaining": 150})  # arrived late
+    assert governor.quota_remaining == 120
+    assert not governor.exhausted
+
+    governor.record("questions", {"quota_remaining": 0})
+    assert governor.exhausted
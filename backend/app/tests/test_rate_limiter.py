@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from app.services.rate_limiter import RateLimiter, RateLimitTimeout, TokenBucket
+
+
+def test_token_bucket_reports_wait_time():
+    bucket = TokenBucket(per_minute=60)  # refills 1 token per second
+
+    assert bucket.wait_time(60) == 0.0
+    bucket.consume(60)
+    assert bucket.wait_time(2) == pytest.approx(2.0, abs=0.05)
+
+
+def test_limiter_throttles_on_token_budget():
+    limiter = RateLimiter("test", rpm=600, tpm=600, max_queue_seconds=5)
+
+    async def run():
+        await limiter.acquire(600)  # drains the TPM bucket
+        return await limiter.acquire(10)  # needs ~1s of refill
+
+    waited = asyncio.run(run())
+
+    assert waited == pytest.approx(1.0, abs=0.3)
+    assert limiter.stats["acquired"] == 2
+    assert limiter.stats["throttled"] == 1
+
+
+def test_limiter_rejects_after_max_queue_time():
+    limiter = RateLimiter("test", rpm=1, tpm=1000, max_queue_seconds=0.2)
+
+    async def run():
+        await limiter.acquire(1)
+        await limiter.acquire(1)  # next request slot is 60s away
+
+    with pytest.raises(RateLimitTimeout):
+        asyncio.run(run())
+    assert limiter.stats["rejected"] == 1
+
+
+def test_limiter_serves_waiters_in_arrival_order():
+    limiter = RateLimiter("test", rpm=60000, tpm=60000, max_queue_seconds=5)
+    order = []
+
+    async def caller(name, tokens):
+        await limiter.acquire(tokens)
+        order.append(name)
+
+    async def run():
+        await limiter.acquire(60000)
+        # The big request arrives first and must not be overtaken by small ones
+        await asyncio.gather(caller("big", 300), caller("small-1", 1), caller("small-2", 1))
+
+    asyncio.run(run())
+
+    assert order == ["big", "small-1", "small-2"]
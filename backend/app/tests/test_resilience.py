@@ -0,0 +1,55 @@
+import time
+
+from app.services.resilience import CircuitBreaker, Deadline
+
+
+def test_deadline_counts_down():
+    deadline = Deadline(budget_ms=50)
+
+    assert 0 < deadline.remaining() <= 0.05
+    time.sleep(0.06)
+    assert deadline.expired()
+    assert deadline.remaining() == 0.0
+
+
+def test_breaker_opens_after_threshold_and_half_opens_after_reset():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()  # single trial call
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_released_or_abandoned_trial_allows_another():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.release()  # e.g. the deadline left no time for the call
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    time.sleep(0.06)  # the trial never reported back
+    assert breaker.allow()
@@ -0,0 +1,46 @@
+from datetime import datetime
+from pathlib import Path
+
+from app.services.stackexchange_dump import iter_dump_posts, parse_tags
+
+FIXTURE = Path(__file__).parent / "fixtures" / "Posts.xml"
+
+
+def test_joins_questions_to_accepted_answers():
+    posts = list(iter_dump_posts(str(FIXTURE)))
+
+    assert [post["question_id"] for post in posts] == [1, 5, 4, 11]
+    keyerror = posts[0]
+    assert keyerror["title"] == "KeyError when reading a dict"
+    assert keyerror["answer_body"] == "<p>Use d.get('x')</p>"
+    assert keyerror["tags"] == ["python", "dictionary"]
+    assert keyerror["votes"] == 12
+    assert keyerror["url"] == "https://stackoverflow.com/questions/1"
+    assert keyerror["created_at"] == datetime(2008, 7, 31, 21, 42, 52, 667000)
+
+
+def test_question_with_missing_answer_is_dropped_once_passed():
+    stats = {}
+    posts = iter_dump_posts(str(FIXTURE), stats=stats)
+
+    assert [next(posts)["question_id"] for _ in range(3)] == [1, 5, 4]
+    assert stats["missing_answers"] == 0
+    # reaching row 11 passes answer 10, which isn't in the dump
+    assert next(posts)["question_id"] == 11
+    assert stats["missing_answers"] == 1
+    assert list(posts) == []
+    assert stats["missing_answers"] == 1
+
+
+def test_filters_by_tag_and_score():
+    posts = list(iter_dump_posts(str(FIXTURE), tags=["python"], min_score=5))
+    assert [post["question_id"] for post in posts] == [1]
+
+    posts = list(iter_dump_posts(str(FIXTURE), tags=["javascript"]))
+    assert [post["answer_body"] for post in posts] == ["<p>call it on an object</p>"]
+
+
+def test_parse_tags_handles_both_dump_formats():
+    assert parse_tags("<python><list>") == ["python", "list"]
+    assert parse_tags("|node.js|express|") == ["node.js", "express"]
+    assert parse_tags(None) == []
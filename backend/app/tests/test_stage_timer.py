@@ -0,0 +1,35 @@
+import time
+
+from app.services.stage_timer import StageTimer
+
+
+def test_repeated_stages_add_up():
+    timer = StageTimer()
+    timer.add("cache", 1.25)
+    with timer.stage("parse"):
+        time.sleep(0.01)
+    timer.add("cache", 2.0)
+
+    timings = timer.to_dict()
+    assert list(timings) == ["cache", "parse"]
+    assert timings["cache"] == 3.2
+    assert timings["parse"] >= 10
+
+
+def test_stage_is_recorded_when_it_raises():
+    timer = StageTimer()
+    try:
+        with timer.stage("llm"):
+            raise TimeoutError
+    except TimeoutError:
+        pass
+    assert "llm" in timer.to_dict()
+
+
+def test_server_timing_header():
+    timer = StageTimer()
+    timer.add("embedding", 180.44)
+    timer.add("vector_search", 12)
+
+    header = timer.server_timing()
+    assert header.startswith("embedding;dur=180.4, vector_search;dur=12.0, total;dur=")
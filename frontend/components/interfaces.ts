@@ -29,4 +29,6 @@ export interface AnalysisResult {
   sources_used: number;
   analysis_id: number;
   analysis_time_ms?: number;
+  degraded?: boolean;
+  degraded_reason?: string;
 }
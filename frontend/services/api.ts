@@ -22,6 +22,8 @@ export interface AnalysisResult {
   solutions: Solution[];
   sources_used: number;
   analysis_id: number;
+  degraded?: boolean;
+  degraded_reason?: string;
 }
 
 // Feedback API Types